@@ -5,6 +5,7 @@ Modular architecture with service-based backend and route blueprints.
 import os
 from flask import Flask
 from core.routes import register_blueprints
+from core.services.reconciliation_service import start_deferred_worker
 
 app = Flask(__name__)
 
@@ -14,6 +15,9 @@ os.makedirs('uploads', exist_ok=True)
 # Register all route blueprints (UI + API)
 register_blueprints(app)
 
+# Background thread finishing reconciles deferred past their time budget
+start_deferred_worker()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
     
\ No newline at end of file
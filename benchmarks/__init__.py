@@ -0,0 +1,5 @@
+"""
+Benchmarks for the matching engine. Run from the project root, e.g.
+python -m benchmarks.bench_extraction
+python -m benchmarks.bench_matching --sizes 1000,10000
+"""
@@ -0,0 +1,77 @@
+"""
+Per-record feature extraction microbenchmark.
+
+Times each extractor in core/matching.py, and the combined
+extract_record_features() pass, over a fixed set of narrations shaped like
+real Tally ledgers. Prints microseconds per record.
+
+Usage:
+    python -m benchmarks.bench_extraction [--repeat N]
+"""
+import argparse
+import time
+
+from core import matching
+
+SAMPLE_NARRATIONS = [
+    "Payment against ABC/PO/123/456 for supply of raw materials",
+    "Retirement of L/C-127/24 margin and acceptance commission",
+    "Amount being paid as Principal & Interest repayment of Time Loan LD-2435445106 MDBL",
+    "Loan settlement ID 1045 adjustment",
+    "Amount paid as Inter Unit Loan for staff (Md. Karim-ID : 10234)",
+    "Payable to Md. Karim-ID:10234 final settlement",
+    "Salary of Mrs. Salma for January 2024",
+    "Midland Bank PLC-CD-A/C-0011-1050011026 Interbank Fund transfer as Interunit Loan A/C-Steel Unit, PBL#1833",
+    "Dhaka Bank-STD-2051501833-CIL Inter unit fund transfer as Interunit Loan A/C-Geo Textile Unit., MTBL#11026",
+    "Fund transfer MDBL#11026 for working capital",
+    "being the amount paid for insurance premium of vehicle registration dhaka metro ga 11-2233 chassis no "
+    "mh4kc1234 engine no 4d56 policy no pbl/ins/2024/0098 certificate issued by pragati insurance ltd for the "
+    "period from 01-01-2024 to 31-12-2024 including vat and stamp duty as per bill",
+    "Misc adjustment voucher 488929 bank charges",
+]
+
+EXTRACTORS = [
+    'extract_po',
+    'extract_lc',
+    'extract_loan_id',
+    'has_time_loan_phrase',
+    'extract_normalized_loan_id_after_time_loan_phrase',
+    'extract_account_number',
+    'extract_final_settlement_details',
+    'extract_salary_details',
+    'jaccard_tokens',
+    'scan_narration',
+]
+
+
+def time_per_record(func, items, repeat):
+    """Return the mean cost of func(item) in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(items)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000, help='passes over the sample narrations')
+    args = parser.parse_args()
+
+    records = [
+        {'uid': f"bench_{i}", 'Debit': 1000, 'Credit': 1000, 'Particulars': text, 'entered_by': 'bench'}
+        for i, text in enumerate(SAMPLE_NARRATIONS)
+    ]
+
+    print(f"{'extractor':<52}{'us/record':>10}")
+    for name in EXTRACTORS:
+        cost = time_per_record(getattr(matching, name), SAMPLE_NARRATIONS, args.repeat)
+        print(f"{name:<52}{cost:>10.2f}")
+    for role in ('lender', 'borrower'):
+        cost = time_per_record(lambda record: matching.extract_record_features(record, role), records, args.repeat)
+        print(f"{'extract_record_features (' + role + ')':<52}{cost:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
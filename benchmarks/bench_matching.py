@@ -0,0 +1,135 @@
+"""
+End-to-end matching benchmark over synthetic ledgers.
+
+Generates lender/borrower record sets with benchmarks/synthetic_ledger.py
+at each size and runs find_matches() over them, reporting throughput
+(rows/s) and peak Python memory (tracemalloc, measured in a separate run
+so it doesn't slow the timed one). With --xlsx the generated ledgers are
+also written as Tally workbooks and parse_tally_file() is timed on them.
+
+Results can be saved as a baseline and later runs compared against it;
+the run exits non-zero when throughput drops or peak memory grows by more
+than --tolerance against the baseline, when a size finds a different
+number of matches than the baseline did, or when there is no baseline to
+compare against, so it can gate a change.
+
+Usage:
+    python -m benchmarks.bench_matching [--sizes 1000,10000,100000] [--xlsx]
+        [--baseline PATH] [--save-baseline] [--tolerance 0.2]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic_ledger import generate_records, write_ledger_files
+from core.matching import find_matches
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'matching_baseline.json')
+
+
+def bench_matching(rows, seed):
+    """Time find_matches() on `rows` synthetic records, then measure its peak memory."""
+    records = generate_records(rows, seed)
+
+    start = time.perf_counter()
+    matches = find_matches(records)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    find_matches(records)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'rows': len(records),
+        'matches': len(matches),
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(len(records) / elapsed, 1) if elapsed else None,
+        'peak_mb': round(peak / (1024 * 1024), 2),
+    }
+
+
+def bench_parsing(rows, seed):
+    """Write synthetic ledgers as xlsx and time parse_tally_file() on both."""
+    from parser.tally_parser_interunit_loan_recon import parse_tally_file
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        paths = write_ledger_files(rows, out_dir, seed)
+        start = time.perf_counter()
+        parsed = sum(len(parse_tally_file(path, 'Sheet1')) for path in paths)
+        elapsed = time.perf_counter() - start
+    return {
+        'parsed_rows': parsed,
+        'parse_seconds': round(elapsed, 3),
+        'parse_rows_per_sec': round(parsed / elapsed, 1) if elapsed else None,
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    """Compare results with a saved baseline; returns a list of regression messages."""
+    regressions = []
+    for size, result in results.items():
+        reference = baseline.get(size)
+        if not reference:
+            continue
+        for key in ('rows_per_sec', 'parse_rows_per_sec'):
+            if result.get(key) and reference.get(key) and result[key] < reference[key] * (1 - tolerance):
+                regressions.append(f"{size} rows: {key} {result[key]} < baseline {reference[key]}")
+        if reference.get('peak_mb') and result['peak_mb'] > reference['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{size} rows: peak_mb {result['peak_mb']} > baseline {reference['peak_mb']}")
+        if reference.get('matches') is not None and result['matches'] != reference['matches']:
+            # A faster run that matches differently isn't an improvement
+            regressions.append(f"{size} rows: matches {result['matches']} != baseline {reference['matches']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma-separated row counts')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--xlsx', action='store_true', help='also time parse_tally_file() on generated workbooks')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown / memory growth')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = {}
+
+    print(f"{'rows':>8}{'matches':>9}{'seconds':>10}{'rows/s':>12}{'peak MB':>10}{'parse rows/s':>14}")
+    for rows in sizes:
+        result = bench_matching(rows, args.seed)
+        if args.xlsx:
+            result.update(bench_parsing(rows, args.seed))
+        results[str(rows)] = result
+        parse_rate = result.get('parse_rows_per_sec')
+        print(f"{result['rows']:>8}{result['matches']:>9}{result['seconds']:>10.3f}"
+              f"{result['rows_per_sec']:>12.1f}{result['peak_mb']:>10.2f}"
+              f"{parse_rate if parse_rate is not None else '-':>14}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 1
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION: {message}")
+    if not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
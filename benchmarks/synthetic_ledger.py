@@ -0,0 +1,219 @@
+"""
+Synthetic Tally ledger generator.
+
+Produces lender/borrower transaction sets shaped like real interunit loan
+ledgers - PO numbers, L/C numbers, Time Loan repayments, #NNNN account
+cross-references, "Payable to ...-ID:" final settlements, salary lines,
+long insurance narrations and unrelated noise - so the matcher can be
+measured at scale without sharing real books.
+
+generate_records() returns rows in the shape find_matches() reads from
+tally_data; write_ledger_files() writes the two companies' ledgers as
+Tally-style xlsx workbooks that parse_tally_file() accepts.
+
+Usage:
+    python -m benchmarks.synthetic_ledger ROWS OUT_DIR [--seed N]
+"""
+import argparse
+import calendar
+import datetime
+import os
+import random
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from openpyxl import Workbook
+
+PERSON_NAMES = [
+    'Md. Karim', 'Mr. Rahim', 'Mrs. Salma', 'Md. Rafiqul Islam', 'Mr. Habibur Rahman',
+    'Mrs. Nasrin Akter', 'Md. Jahangir Alam', 'Mr. Anisur Rahman', 'Md. Shafiqul Haque', 'Mrs. Rokeya Begum'
+]
+ENTERED_BY = ['accounts1', 'accounts2', 'treasury', 'payroll', 'audit']
+VOUCHER_TYPES = {'Lender': 'Payment', 'Borrower': 'Receipt'}
+
+INSURANCE_TEXT = (
+    "being the amount paid for insurance premium of vehicle registration dhaka metro ga {reg} chassis no "
+    "mh4kc{chassis} engine no 4d56 policy no pbl/ins/{year}/{policy:04d} certificate issued by pragati insurance "
+    "ltd for the period from 01-01-{year} to 31-12-{year} including vat and stamp duty as per bill"
+)
+
+# Relative frequency of each narration shape; 'noise' rows have no counterpart
+TRANSACTION_MIX = [
+    ('po', 12), ('lc', 8), ('time_loan', 8), ('loan_id', 6), ('interunit', 12),
+    ('final_settlement', 6), ('salary', 12), ('insurance', 6), ('manual', 10), ('noise', 20),
+]
+
+
+def _narrations(kind: str, rng: random.Random, lender: str, borrower: str,
+                month: str, year: int) -> Tuple[str, str]:
+    """Return (lender narration, borrower narration) for one transaction of the given kind."""
+    if kind == 'po':
+        po = f"{rng.choice(['ABC', 'GTL', 'SPL'])}/PO/{rng.randint(1, 99999)}/{rng.randint(1, 999)}"
+        return f"Payment against {po} for supply of raw materials", f"Received against {po} for goods"
+    if kind == 'lc':
+        lc = f"{rng.randint(100, 99999)}/{str(year)[-2:]}"
+        return f"Retirement of L/C-{lc} margin and acceptance commission", f"Margin received for LC-{lc}"
+    if kind == 'time_loan':
+        loan_id = rng.randint(10 ** 6, 10 ** 10)
+        phrase = 'Amount being paid as Principal & Interest repayment of Time Loan'
+        return f"{phrase} LD-{loan_id} MDBL", f"{phrase} LD{loan_id} received"
+    if kind == 'loan_id':
+        loan_id = rng.randint(100, 10 ** 6)
+        return f"Loan settlement ID {loan_id} adjustment", f"Adjustment of loan ID-{loan_id}"
+    if kind == 'interunit':
+        lender_digits = f"{rng.randint(10000, 99999)}"
+        borrower_digits = f"{rng.randint(1000, 9999)}"
+        return (
+            f"Midland Bank PLC-CD-A/C-0011-10500{lender_digits} Interbank Fund transfer as Interunit Loan "
+            f"A/C-{borrower} Unit, PBL#{borrower_digits}",
+            f"Dhaka Bank-STD-205150{borrower_digits}-CIL Inter unit fund transfer as Interunit Loan "
+            f"A/C-{lender} Unit., MTBL#{lender_digits}"
+        )
+    if kind == 'final_settlement':
+        name = rng.choice(PERSON_NAMES)
+        person_id = rng.randint(1000, 99999)
+        return (f"Amount paid as Inter Unit Loan for staff ({name}-ID : {person_id})",
+                f"Payable to {name}-ID:{person_id} final settlement")
+    if kind == 'salary':
+        name = rng.choice(PERSON_NAMES)
+        return f"Salary of {name} for {month} {year}", f"Salary payable to {name} for {month} {year}"
+    if kind == 'insurance':
+        text = INSURANCE_TEXT.format(reg=f"{rng.randint(11, 99)}-{rng.randint(1000, 9999)}",
+                                     chassis=rng.randint(1000, 9999), year=year, policy=rng.randint(1, 9999))
+        return text, text + f" ref {rng.randint(1, 99)}"
+    if kind == 'manual':
+        return (f"Fund transfer for working capital voucher {rng.randint(1, 10 ** 6)}",
+                f"Fund received for operational expenses {rng.randint(1, 10 ** 6)}")
+    return (f"Misc adjustment voucher {rng.randint(1, 10 ** 6)} bank charges",
+            f"Bank charges adjustment {rng.randint(1, 10 ** 6)}")
+
+
+def generate_records(rows: int, seed: int = 0, company1: str = 'GeoTex', company2: str = 'Steel',
+                     month: str = 'January', year: int = 2024,
+                     input_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Generate about `rows` tally_data rows (two per transaction) for one company pair and month.
+
+    Each transaction is a Debit row in the lending company's books and a
+    Credit row in the borrowing company's books; direction alternates
+    randomly. 'noise' transactions get unrelated narrations and amounts on
+    the two sides, so roughly a fifth of the rows stay unmatched.
+    """
+    rng = random.Random(seed)
+    kinds = [kind for kind, _ in TRANSACTION_MIX]
+    weights = [weight for _, weight in TRANSACTION_MIX]
+    month_number = list(calendar.month_name).index(month)
+    days_in_month = calendar.monthrange(year, month_number)[1]
+    input_date = input_date or datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    records = []
+    for transaction in range(max(1, rows // 2)):
+        kind = rng.choices(kinds, weights)[0]
+        lender, borrower = (company1, company2) if rng.random() < 0.5 else (company2, company1)
+        lender_text, borrower_text = _narrations(kind, rng, lender, borrower, month, year)
+        amount = Decimal(rng.randint(1000, 5000000)) + Decimal(rng.choice(['0', '0.50', '0.25']))
+        lender_date = datetime.date(year, month_number, rng.randint(1, days_in_month))
+        borrower_date = min(lender_date + datetime.timedelta(days=rng.randint(0, 3)),
+                            datetime.date(year, month_number, days_in_month))
+        # Only 'manual' vouchers share a clerk across both books, so the
+        # entered_by fallback doesn't swallow the other shapes
+        lender_clerk = rng.choice(ENTERED_BY)
+        borrower_clerk = lender_clerk if kind == 'manual' else rng.choice(
+            [clerk for clerk in ENTERED_BY if clerk != lender_clerk])
+
+        sides = [
+            ('Lender', lender, lender_text, amount, lender_date, lender_clerk),
+            ('Borrower', borrower, borrower_text,
+             amount + rng.randint(1, 999) if kind == 'noise' else amount, borrower_date, borrower_clerk),
+        ]
+        for role, book, text, side_amount, date, entered_by in sides:
+            records.append({
+                'uid': f"{book}_{transaction:07d}_{role[0]}",
+                'lender': lender,
+                'borrower': borrower,
+                'statement_month': month,
+                'statement_year': year,
+                'role': role,
+                'Date': date,
+                'dr_cr': 'To' if role == 'Lender' else 'By',
+                'Particulars': text,
+                'Vch_Type': VOUCHER_TYPES[role],
+                'Vch_No': str(transaction + 1),
+                'Debit': side_amount if role == 'Lender' else None,
+                'Credit': side_amount if role == 'Borrower' else None,
+                'entered_by': entered_by,
+                'input_date': input_date,
+            })
+    return records
+
+
+def write_tally_workbook(records: List[Dict[str, Any]], company: str, counterparty: str,
+                         path: str, sheet_name: str = 'Sheet1') -> None:
+    """Write one company's side of the records as a Tally ledger export.
+
+    Layout follows what parse_tally_file() expects: company / counterparty /
+    period metadata, a Date | Particulars | | Vch Type | Vch No. | Debit |
+    Credit header, the ledger line with the narration on the next row, and
+    an "Entered By :" line after each voucher.
+    """
+    own_rows = [
+        record for record in records
+        if (record['role'] == 'Lender' and record['lender'] == company) or
+           (record['role'] == 'Borrower' and record['borrower'] == company)
+    ]
+    own_rows.sort(key=lambda record: record['Date'])
+    dates = [record['Date'] for record in own_rows] or [datetime.date.today()]
+    first, last = min(dates), max(dates)
+    first = first.replace(day=1)
+    last = last.replace(day=calendar.monthrange(last.year, last.month)[1])
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = sheet_name
+    ws.append([f"{company} Unit"])
+    ws.append([f"Inter Unit Loan A/C-{counterparty}"])
+    ws.append([f"{first.day}-{first.strftime('%b-%Y')} to {last.day}-{last.strftime('%b-%Y')}"])
+    ws.append(['Date', 'Particulars', None, 'Vch Type', 'Vch No.', 'Debit', 'Credit'])
+    for record in own_rows:
+        is_debit = record['role'] == 'Lender'
+        amount = float(record['Debit'] if is_debit else record['Credit'])
+        ws.append([
+            datetime.datetime.combine(record['Date'], datetime.time()),
+            'To' if is_debit else 'By',
+            f"Inter Unit Loan A/C-{counterparty}",
+            record['Vch_Type'],
+            record['Vch_No'],
+            amount if is_debit else None,
+            None if is_debit else amount,
+        ])
+        ws.append([None, None, record['Particulars'], None, None, None, None])
+        ws.append([None, 'Entered By :', record['entered_by'], None, None, None, None])
+    wb.save(path)
+    wb.close()
+
+
+def write_ledger_files(rows: int, out_dir: str, seed: int = 0, company1: str = 'GeoTex',
+                       company2: str = 'Steel', month: str = 'January', year: int = 2024) -> Tuple[str, str]:
+    """Generate a transaction set and write both companies' ledgers; returns the two xlsx paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    records = generate_records(rows, seed, company1, company2, month, year)
+    paths = []
+    for company, counterparty in ((company1, company2), (company2, company1)):
+        path = os.path.join(out_dir, f"Interunit {company} {month} {year}.xlsx")
+        write_tally_workbook(records, company, counterparty, path)
+        paths.append(path)
+    return paths[0], paths[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('rows', type=int, help='approximate number of ledger rows across both files')
+    parser.add_argument('out_dir', help='directory for the two xlsx files')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for path in write_ledger_files(args.rows, args.out_dir, args.seed):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
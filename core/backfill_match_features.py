@@ -0,0 +1,14 @@
+"""
+Backfill persisted match features for existing tally_data rows.
+
+Usage: python -m core.backfill_match_features [batch_size]
+"""
+import sys
+from core import database
+
+
+if __name__ == '__main__':
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    result = database.backfill_match_features(batch_size)
+    print(result.get('message') or result.get('error'))
+    sys.exit(0 if result.get('success') else 1)
@@ -3,6 +3,9 @@ Bank Configuration Module
 Contains bank mappings and configurations for the Interunit Loan Reconciliation system.
 Update this file to add new banks or modify existing mappings.
 """
+import re
+
+from core.keyword_scanner import KeywordAutomaton, whole_word_pattern
 
 # Bank Code to Full Name Mapping
 # Format: 'SHORT_CODE': 'FULL_BANK_NAME'
@@ -77,6 +80,12 @@ ACCOUNT_REFERENCE_PATTERNS = [
     r'#(\d{4,6})\b',  # #11026 (fallback, 4-6 digits)
 ]
 
+# Compiled once at import so matching never recompiles or copies these per record.
+# Reference patterns keep their priority order: an alternation would return the
+# leftmost hit of any pattern and change which bank code wins.
+COMPILED_ACCOUNT_PATTERNS = {name: re.compile(pattern) for name, pattern in BANK_ACCOUNT_PATTERNS.items()}
+COMPILED_ACCOUNT_REFERENCE_PATTERNS = tuple(re.compile(pattern) for pattern in ACCOUNT_REFERENCE_PATTERNS)
+
 # Bank-Specific Account Patterns (if needed in the future)
 # Format: 'BANK_NAME': {'pattern': regex_pattern, 'description': 'explanation'}
 BANK_SPECIFIC_PATTERNS = {
@@ -87,6 +96,54 @@ BANK_SPECIFIC_PATTERNS = {
     # }
 }
 
+# Alias scanner over every BANK_MAPPING key, rebuilt lazily whenever the
+# mapping changes. BANK_MAPPING_VERSION lets scanners built elsewhere from
+# the aliases (core/matching.py) notice edits made through the functions below.
+BANK_MAPPING_VERSION = 0
+_bank_alias_scanner = None
+
+def get_bank_aliases():
+    """Lowercase BANK_MAPPING aliases, each with its compiled whole-word pattern and bank name."""
+    return {alias.lower(): (whole_word_pattern(alias.lower()), name) for alias, name in BANK_MAPPING.items()}
+
+def get_bank_alias_scanner():
+    """Get the (KeywordAutomaton, aliases) pair for the current BANK_MAPPING."""
+    global _bank_alias_scanner
+    if _bank_alias_scanner is None:
+        aliases = get_bank_aliases()
+        _bank_alias_scanner = (KeywordAutomaton(aliases), aliases)
+    return _bank_alias_scanner
+
+def _bank_mapping_changed():
+    global BANK_MAPPING_VERSION, _bank_alias_scanner
+    BANK_MAPPING_VERSION += 1
+    _bank_alias_scanner = None
+
+def find_bank_names(text, aliases_found=None):
+    """Return the bank names whose aliases appear as whole words in text, in order of appearance.
+
+    aliases_found optionally passes the aliases an earlier keyword scan
+    already saw in the text, skipping the scan here.
+    """
+    if not text:
+        return []
+    text_lower = text.lower()
+    scanner, aliases = get_bank_alias_scanner()
+    if aliases_found is None:
+        aliases_found = scanner.found(scanner.scan(text_lower))
+
+    hits = []
+    for alias in aliases_found:
+        pattern, name = aliases[alias]
+        match = pattern.search(text_lower)
+        if match:
+            hits.append((match.start(), -len(alias), name))
+    names = []
+    for _, _, name in sorted(hits):
+        if name not in names:
+            names.append(name)
+    return names
+
 def get_bank_mapping():
     """Get the current bank mapping dictionary."""
     return BANK_MAPPING.copy()
@@ -95,16 +152,24 @@ def get_bank_name(bank_code):
     """Get normalized bank name from bank code."""
     if not bank_code:
         return None
-    return BANK_MAPPING.get(bank_code.upper(), bank_code)
+    name = BANK_MAPPING.get(bank_code.upper())
+    if name:
+        return name
+    # Longer references ("Midland Bank PLC-CD", "Fund transfer MDBL") carry
+    # an alias somewhere inside them
+    names = find_bank_names(bank_code)
+    return names[0] if names else bank_code
 
 def add_bank_mapping(short_code, full_name):
     """Add a new bank mapping."""
     BANK_MAPPING[short_code.upper()] = full_name.upper()
+    _bank_mapping_changed()
 
 def update_bank_mapping(short_code, new_full_name):
     """Update an existing bank mapping."""
     if short_code.upper() in BANK_MAPPING:
         BANK_MAPPING[short_code.upper()] = new_full_name.upper()
+        _bank_mapping_changed()
         return True
     return False
 
@@ -112,6 +177,7 @@ def remove_bank_mapping(short_code):
     """Remove a bank mapping."""
     if short_code.upper() in BANK_MAPPING:
         del BANK_MAPPING[short_code.upper()]
+        _bank_mapping_changed()
         return True
     return False
 
@@ -123,6 +189,14 @@ def get_account_reference_patterns():
     """Get the account reference patterns for #BBL#121001 format."""
     return ACCOUNT_REFERENCE_PATTERNS.copy()
 
+def get_compiled_account_patterns():
+    """Get the precompiled account number patterns."""
+    return COMPILED_ACCOUNT_PATTERNS
+
+def get_compiled_account_reference_patterns():
+    """Get the precompiled account reference patterns, in priority order."""
+    return COMPILED_ACCOUNT_REFERENCE_PATTERNS
+
 def add_bank_specific_pattern(bank_name, pattern, description):
     """Add a bank-specific account pattern."""
     BANK_SPECIFIC_PATTERNS[bank_name.upper()] = {
@@ -15,4 +15,164 @@ MANUAL_COMPANY_PAIRS = {
     'Steel': 'Geo Textile',
     # Add more pairs as needed
     # The system will automatically create opposite pairs
-} 
\ No newline at end of file
+} 
+
+# COMMON_TEXT candidate filter (MinHash signatures + LSH banding)
+# extract_common_text only runs on lender/borrower pairs whose signatures share
+# at least one band. A pair whose token shingles have Jaccard similarity s
+# becomes a candidate with probability 1 - (1 - s**ROWS)**BANDS, so more bands
+# or fewer rows per band raise recall at the cost of more candidate pairs.
+# The filter is lossy (a pair sharing a 20-word phrase can still miss every
+# band), so it is off by default; enable it only where a small COMMON_TEXT
+# recall loss is acceptable in exchange for speed.
+COMMON_TEXT_LSH_ENABLED = False
+COMMON_TEXT_LSH_BANDS = 32
+COMMON_TEXT_LSH_ROWS = 1
+COMMON_TEXT_SHINGLE_SIZE = 5
+
+# Sharded reconciliation (full "reconcile everything" runs)
+# Unmatched rows are split into (company pair, statement month, statement year)
+# shards which are matched in a process pool. Shards smaller than
+# RECONCILE_SHARD_MIN_ROWS are packed together into one pool task, and runs
+# below RECONCILE_PARALLEL_MIN_ROWS stay in-process. RECONCILE_MAX_WORKERS of
+# None uses every CPU core.
+RECONCILE_SHARDING_ENABLED = True
+RECONCILE_MAX_WORKERS = None
+RECONCILE_PARALLEL_MIN_ROWS = 2000
+RECONCILE_SHARD_MIN_ROWS = 500
+
+# Match scoring mode
+# 'greedy' runs the staged rule passes; 'optimal' solves each amount group as a
+# max-weight assignment scored by rule strength, Jaccard score and date
+# distance (score stored as match_score in audit_info). Groups with more than
+# MATCH_ASSIGNMENT_MAX_GROUP_SIZE lenders or borrowers fall back to greedy;
+# groups are solved in a process pool once the run has at least
+# MATCH_ASSIGNMENT_PARALLEL_MIN_PAIRS candidate pairs.
+MATCH_SCORING_MODE = 'greedy'
+MATCH_ASSIGNMENT_MAX_GROUP_SIZE = 150
+MATCH_ASSIGNMENT_WORKERS = None
+MATCH_ASSIGNMENT_PARALLEL_MIN_PAIRS = 50000
+
+# Incremental matching
+# Each run records a per pair-period high-water mark (latest input_date
+# reconciled, table match_watermarks). The next run only evaluates pairs where
+# at least one record was uploaded after the mark; old-vs-old pairs already
+# failed. Resets and rejections clear the affected marks.
+RECONCILE_INCREMENTAL_ENABLED = True
+
+# SQL pushdown of exact reference rules (PO, final-settlement person, LC, Loan ID)
+# When enabled, reconcile first resolves these inside MySQL with set-based
+# INSERT ... SELECT / UPDATE ... JOIN statements on the persisted feature
+# columns, so only the remainder is loaded into Python for the fuzzy rules.
+# The date windows below (MATCH_DATE_WINDOW_*) apply to these rules here too.
+# Requires MySQL 8 and the feature columns (db_migration_match_features.sql).
+RECONCILE_SQL_PUSHDOWN_ENABLED = False
+
+# Matcher instrumentation
+# When enabled (or when a /api/reconcile request sends "stats": true) the
+# response and the server log include a matching.MatchStats summary: pairs
+# examined, pairs passing the amount check, per-rule time / evaluations / hits
+# and extraction time.
+RECONCILE_STATS_ENABLED = False
+
+# Amount tolerance matching (opt-in)
+# Interunit transfers sometimes land with bank charges or VAT deducted, so the
+# Debit and Credit differ slightly. When a tolerance applies to a company pair,
+# records still unmatched after the exact-amount passes are tried against
+# counterparts whose amount differs by at most max(absolute, percent of the
+# lender amount), closest amount first, with the reference and identity rules
+# only (not SALARY, FINAL_SETTLEMENT, MANUAL_VERIFICATION or COMMON_TEXT).
+# Such matches always go to review and record the difference in audit_info.
+MATCH_AMOUNT_TOLERANCE_ENABLED = False     # default tolerance for every company pair
+MATCH_AMOUNT_TOLERANCE_ABSOLUTE = 0        # currency units, e.g. 500 for fixed bank charges
+MATCH_AMOUNT_TOLERANCE_PERCENT = 0.0       # percent of the lender amount, e.g. 0.5
+# Per company pair (either order); an entry enables tolerance for that pair
+# even when the default is off, e.g. {('GeoTex', 'Steel'): {'absolute': 500, 'percent': 0.5}}
+MATCH_AMOUNT_TOLERANCE_BY_PAIR = {}
+
+# Date-window candidate generation (opt-in)
+# A matching borrower entry almost always lands within a few days of the
+# lender entry. With a window set, a pass only pairs records whose Dates are
+# at most that many days apart: within each amount bucket borrowers are kept
+# sorted by date and each lender binary-searches its window. Records without
+# a Date are not constrained. MATCH_DATE_WINDOW_DAYS applies to every pass
+# (None = off); MATCH_DATE_WINDOW_BY_RULE overrides it per pass name from
+# matching.MATCH_PASSES, e.g. {'SALARY': 7, 'COMMON_TEXT': 3, 'PO': None}.
+MATCH_DATE_WINDOW_DAYS = None
+MATCH_DATE_WINDOW_BY_RULE = {}
+
+# Split-settlement matching
+# A lender often pays in one transfer what the counterparty books as principal
+# and interest in two or three lines, or the reverse. After the 1:1 passes,
+# one unmatched entry is matched to 2..MATCH_SPLIT_MAX_PARTS unmatched entries
+# on the other side that share its PO / L/C / Loan ID / person, are dated at
+# most MATCH_SPLIT_DATE_WINDOW_DAYS from it (None = no bound) and sum exactly
+# to its amount. Candidates are capped at MATCH_SPLIT_MAX_CANDIDATES per entry
+# so the subset search stays bounded. Split matches always go to review.
+MATCH_SPLIT_ENABLED = True
+MATCH_SPLIT_MAX_PARTS = 3
+MATCH_SPLIT_DATE_WINDOW_DAYS = 7
+MATCH_SPLIT_MAX_CANDIDATES = 40
+
+# Cross-period carry-forward
+# A transfer booked on 31 March by one unit is often booked on 1 April by the
+# other. With N > 0, a company-pair or pair-ID reconcile also loads the
+# unmatched residue of the N statement periods before each period it covers,
+# through the open_items index (pair, side, period, amount), limited to
+# amounts that can pair on exact amount with the current unmatched set.
+# Residue is indexed by each run over its period. 0 = off; a /api/reconcile
+# request can override it with "carry_forward": N.
+RECONCILE_CARRY_FORWARD_PERIODS = 0
+
+# Reconcile result cache
+# Reconciling a scope that already came up empty, with nothing uploaded,
+# matched, confirmed or reset since and the same matching settings, finds
+# nothing again. Before loading anything a run computes a fingerprint of its
+# scope inside MySQL (row count, latest input_date, checksum of uids and
+# match statuses); if it equals that of the scope's last empty run under
+# the same rule-set version (matching.rule_set_version) the run returns 0
+# straight away. Empty runs are recorded in the reconcile_runs table, so the
+# cache is shared by all gunicorn workers. Runs requested as full
+# (incremental=False) and pair-ID runs with carry-forward always run.
+RECONCILE_RESULT_CACHE_ENABLED = True
+
+# Streaming reconcile writes
+# Matches are written while matching continues: each finished pass's matches
+# go through a queue of at most RECONCILE_WRITE_QUEUE_SIZE batches (matching
+# waits when the database falls behind) to a writer thread, which stores
+# them with one multi-row UPDATE per MATCH_WRITE_BATCH_SIZE rows (whole
+# matches only, so a split settlement's rows are never committed apart).
+# /api/reconcile?stream=1 reports progress as NDJSON lines, with a heartbeat
+# line every RECONCILE_STREAM_HEARTBEAT_SECONDS while nothing else happens.
+RECONCILE_WRITE_QUEUE_SIZE = 4
+MATCH_WRITE_BATCH_SIZE = 500
+RECONCILE_STREAM_HEARTBEAT_SECONDS = 5
+
+# Time-budgeted reconcile with deferred fuzzy passes
+# The fuzzy rules (matching.FUZZY_PASSES: SALARY Jaccard, COMMON_TEXT) cost
+# far more than the reference rules and find far fewer matches. A reconcile
+# given a time budget (seconds; a /api/reconcile request can send
+# "time_budget": N) always runs every other pass, tolerance and split
+# matching included. It runs a fuzzy pass only while its estimated cost
+# (RECONCILE_FUZZY_SECONDS_PER_PAIR per same-amount candidate pair) still
+# fits. Otherwise that fuzzy pass and any later one are deferred: they are
+# queued for the scope in the deferred_reconciles table and a background
+# thread in each app process runs just those passes over what is still
+# unmatched, polling every RECONCILE_DEFERRED_POLL_SECONDS. The exact passes
+# after a deferred SALARY pass therefore also see rows it would have matched,
+# so a budgeted run can differ from an unbudgeted one. A job left
+# 'running' longer than RECONCILE_DEFERRED_STALE_SECONDS (its process died)
+# is picked up again. None = no budget.
+RECONCILE_TIME_BUDGET_SECONDS = None
+RECONCILE_FUZZY_SECONDS_PER_PAIR = 0.0001
+RECONCILE_DEFERRED_POLL_SECONDS = 5
+RECONCILE_DEFERRED_STALE_SECONDS = 1800
+
+# Reconcile preview
+# A /api/reconcile request with "preview": true runs the matcher over a
+# read-only connection and returns the proposed matches with per-rule counts
+# and timings instead of writing them (SQL pushdown is skipped; the same
+# rules run in Python). The proposal is stored in reconcile_previews and can
+# be committed by its preview_id for RECONCILE_PREVIEW_TTL_SECONDS, as long
+# as every row it pairs is still unmatched.
+RECONCILE_PREVIEW_TTL_SECONDS = 3600
@@ -1,7 +1,7 @@
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import bindparam, create_engine, event, inspect, text
 import pandas as pd
 import json
-from core.config import MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_DB
+from core.config import MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_DB, MATCH_WRITE_BATCH_SIZE
 import re
 from core import matching
 
@@ -9,6 +9,22 @@ engine = create_engine(
     f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}'
 )
 
+# Read-only connections for reconcile previews: every session is put in
+# READ ONLY transaction mode, so MySQL rejects any write made through them
+readonly_engine = create_engine(
+    f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}'
+)
+
+@event.listens_for(readonly_engine, 'connect')
+def _set_session_read_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('SET SESSION TRANSACTION READ ONLY')
+    cursor.close()
+
+def _engine_for(read_only):
+    """The read-only engine for previews, the regular one otherwise."""
+    return readonly_engine if read_only else engine
+
 def ensure_table_exists(table_name):
     inspector = inspect(engine)
     if table_name not in inspector.get_table_names():
@@ -16,6 +32,18 @@ def ensure_table_exists(table_name):
             f"Table '{table_name}' does not exist. Please create it manually in MySQL before uploading."
         )
 
+def has_feature_columns():
+    """Check whether tally_data has the persisted match-feature columns (feature_version and friends)."""
+    inspector = inspect(engine)
+    columns = {column['name'] for column in inspector.get_columns('tally_data')}
+    return set(matching.FEATURE_COLUMNS).issubset(columns)
+
+def has_current_feature_columns(df):
+    """Check whether a DataFrame already carries feature columns of the current MATCH_FEATURE_VERSION."""
+    if not set(matching.FEATURE_COLUMNS).issubset(df.columns):
+        return False
+    return bool((df['feature_version'] == matching.MATCH_FEATURE_VERSION).all())
+
 def save_data(df):
     """Save DataFrame to database, with user-friendly duplicate UID error."""
     try:
@@ -24,6 +52,13 @@ def save_data(df):
         df = df.replace({pd.NA: None, pd.NaT: None})
         df = df.where(pd.notnull(df), None)
         
+        # Extract match features once at ingest so reconcile can read them back;
+        # parse_tally_file already adds them, so only fill in frames without them
+        if not has_feature_columns():
+            df = df.drop(columns=[c for c in matching.FEATURE_COLUMNS if c in df.columns])
+        elif not has_current_feature_columns(df):
+            df = matching.add_feature_columns(df)
+        
         # Use chunked insertion for better performance
         chunk_size = 1000
         for i in range(0, len(df), chunk_size):
@@ -106,8 +141,8 @@ def get_filters():
     
     return filters
 
-def get_unmatched_data():
-    """Get all unmatched transactions"""
+def get_unmatched_data(read_only=False):
+    """Get all unmatched transactions (through the read-only engine with read_only)"""
     try:
         ensure_table_exists('tally_data')
         
@@ -117,7 +152,7 @@ def get_unmatched_data():
         ORDER BY lender ASC, Date DESC
         """
         
-        df = pd.read_sql(sql, engine)
+        df = pd.read_sql(sql, _engine_for(read_only))
         
         # If no data in database, return empty list
         if len(df) == 0:
@@ -146,6 +181,7 @@ def update_matches(matches):
     Auto-acceptance logic:
     - PO, LC, LOAN_ID, FINAL_SETTLEMENT, and INTERUNIT_LOAN matches are automatically confirmed (high confidence)
     - SALARY and COMMON_TEXT matches require manual review
+    - Amount tolerance and split-settlement (group) matches require manual review
     
     Stores match information in three columns:
     1. match_method: 'exact' or 'jaccard'
@@ -157,174 +193,281 @@ def update_matches(matches):
        - jaccard_score: similarity score (when applicable)
     
     This structure provides both quick filtering (match_method)
-    and detailed audit information (audit_info JSON)."""
-    engine = create_engine(
-        f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}'
-    )
+    and detailed audit information (audit_info JSON).
     
+    Only rows that are still unmatched are written: each batch first locks
+    its rows, and a match with any row matched meanwhile (by a concurrent
+    or background run) is skipped whole. Returns the matches written."""
+    written = []
+    # One multi-row UPDATE per batch, each its own short transaction, instead
+    # of two statements per match in one
     with engine.connect() as conn:
-        for i, match in enumerate(matches):
-            # Prepare match information and determine auto-acceptance
-            # PO, LC, LOAN_ID, FINAL_SETTLEMENT, and INTERUNIT_LOAN matches are auto-accepted due to high confidence
-            auto_accept = match['match_type'] in ['PO', 'LC', 'LOAN_ID', 'FINAL_SETTLEMENT', 'INTERUNIT_LOAN']
-            
-            if match['match_type'] == 'PO':
-                match_method = 'reference_match'
-            elif match['match_type'] == 'LC':
-                match_method = 'reference_match'
-            elif match['match_type'] == 'LOAN_ID':
-                match_method = 'reference_match'
-            elif match['match_type'] == 'SALARY':
-                # For salary matches, use the audit trail
-                match_method = 'similarity_match'
-                jaccard_score = match['audit_trail'].get('jaccard_score', 0)
-            elif match['match_type'] == 'FINAL_SETTLEMENT':
-                # For final settlement matches, use the audit trail
-                match_method = 'reference_match'
-            elif match['match_type'] == 'COMMON_TEXT':
-                # For COMMON_TEXT matches, use the actual matching text and store in all relevant fields
-                common_text = match.get('common_text', '')
-                match_method = 'similarity_match'
-            elif match['match_type'] == 'INTERUNIT_LOAN':
-                # For INTERUNIT_LOAN matches, extract keywords from audit trail
-                match_method = 'cross_reference'
-            else:
-                match_method = 'fallback_match'
+        for batch in _match_write_batches(matches):
+            available = _lock_unmatched_uids(conn, [row['uid'] for _, rows in batch for row in rows])
+            kept = [(match, rows) for match, rows in batch if all(row['uid'] in available for row in rows)]
+            if kept:
+                _write_match_rows(conn, [row for _, rows in kept for row in rows])
+            conn.commit()
+            written.extend(match for match, _ in kept)
+    skipped = len(matches) - len(written)
+    if skipped:
+        print(f"Skipped {skipped} matches whose rows were matched by another run")
+    return written
 
-            # Store audit information as JSON
-            audit_info = {
-                'match_type': match['match_type'],
-                'match_method': match_method
-            }
-            
-            # Prepare keywords for database storage
-            keywords = ''
-            if match['match_type'] == 'PO':
-                keywords = match.get('po', '')
-            elif match['match_type'] == 'LC':
-                keywords = match.get('lc', '')
-            elif match['match_type'] == 'LOAN_ID':
-                keywords = match.get('loan_id', '')
-            elif match['match_type'] == 'SALARY':
-                keywords = f"person:{match.get('person', '')},period:{match.get('period', '')}"
-            elif match['match_type'] == 'FINAL_SETTLEMENT':
-                keywords = f"person:{match.get('person', '')}"
-            elif match['match_type'] == 'COMMON_TEXT':
-                keywords = match.get('common_text', '')
-            elif match['match_type'] == 'INTERUNIT_LOAN':
-                if 'audit_trail' in match and 'keywords' in match['audit_trail']:
-                    keywords_dict = match['audit_trail']['keywords']
-                    keywords = f"Lender: {', '.join(keywords_dict.get('lender_interunit_keywords', []))}, Borrower: {', '.join(keywords_dict.get('borrower_interunit_keywords', []))}"
-                else:
-                    keywords = 'Interunit loan keywords'
-
-            # Add match-specific details to audit trail
-            if match['match_type'] == 'PO':
-                # Store PO specific audit information
-                audit_info['po_number'] = match.get('po', '')
-                audit_info['lender_amount'] = match.get('amount', '')
-                audit_info['borrower_amount'] = match.get('amount', '')
-            elif match['match_type'] == 'LC':
-                # Store LC specific audit information
-                audit_info['lc_number'] = match.get('lc', '')
-                audit_info['lender_amount'] = match.get('amount', '')
-                audit_info['borrower_amount'] = match.get('amount', '')
-            elif match['match_type'] == 'LOAN_ID':
-                # Store LOAN_ID specific audit information
-                audit_info['loan_id'] = match.get('loan_id', '')
-                audit_info['lender_amount'] = match.get('amount', '')
-                audit_info['borrower_amount'] = match.get('amount', '')
-            elif match['match_type'] == 'SALARY':
-                # Store SALARY specific audit information
-                audit_info['person'] = match.get('person', '')
-                audit_info['period'] = match.get('period', '')
-                audit_info['lender_amount'] = match.get('amount', '')
-                audit_info['borrower_amount'] = match.get('amount', '')
-                if 'audit_trail' in match and 'jaccard_score' in match['audit_trail']:
-                    audit_info['jaccard_score'] = match['audit_trail']['jaccard_score']
-            elif match['match_type'] == 'FINAL_SETTLEMENT':
-                # Store FINAL_SETTLEMENT specific audit information
-                audit_info['person'] = match.get('person', '')
-                audit_info['lender_amount'] = match.get('amount', '')
-                audit_info['borrower_amount'] = match.get('amount', '')
-                if 'audit_trail' in match:
-                    audit_info.update(match['audit_trail'])
-            elif match['match_type'] == 'COMMON_TEXT':
-                # Store COMMON_TEXT specific audit information
-                audit_info['common_text'] = common_text
-                audit_info['matched_text'] = common_text
-                audit_info['matched_phrase'] = common_text
-                audit_info['lender_amount'] = match.get('amount', '')
-                audit_info['borrower_amount'] = match.get('amount', '')
-                if 'audit_trail' in match and 'jaccard_score' in match['audit_trail']:
-                    audit_info['jaccard_score'] = match['audit_trail']['jaccard_score']
-            elif match['match_type'] == 'INTERUNIT_LOAN':
-                # Store INTERUNIT_LOAN specific audit information
-                if 'audit_trail' in match:
-                    audit_info.update(match['audit_trail'])
-                    # Store amount information
-                    audit_info['lender_amount'] = match.get('amount', '')
-                    audit_info['borrower_amount'] = match.get('amount', '')
-                    # Store keywords as string, not object
-                    if 'keywords' in match['audit_trail']:
-                        keywords_dict = match['audit_trail']['keywords']
-                        audit_info['keywords'] = f"Lender: {', '.join(keywords_dict.get('lender_interunit_keywords', []))}, Borrower: {', '.join(keywords_dict.get('borrower_interunit_keywords', []))}"
-            elif 'audit_trail' in match and 'jaccard_score' in match['audit_trail']:
-                audit_info['jaccard_score'] = match['audit_trail']['jaccard_score']
-
-            # Convert to JSON string (handle Decimal objects)
-            def convert_decimal(obj):
-                if hasattr(obj, '__str__'):
-                    return str(obj)
-                return obj
-            
-            # Convert any Decimal objects to strings
-            audit_info_serializable = {}
-            for key, value in audit_info.items():
-                audit_info_serializable[key] = convert_decimal(value)
-            
-            audit_json = json.dumps(audit_info_serializable)
-            
-            # Determine match status: auto-accept PO and LC matches, manual verification for MANUAL_VERIFICATION
-            if match['match_type'] == 'MANUAL_VERIFICATION':
-                match_status = 'pending_verification'
-            else:
-                match_status = 'confirmed' if auto_accept else 'matched'
-            
-            # Update the borrower (Credit) record - point to lender
-            result1 = conn.execute(text("""
-                UPDATE tally_data 
-                SET matched_with = :matched_with, 
-                    match_status = :match_status, 
-                    match_method = :match_method,
-                    audit_info = :audit_info,
-                    date_matched = NOW()
-                WHERE uid = :borrower_uid
-            """), {
-                'matched_with': match['lender_uid'],
-                'match_status': match_status,
-                'match_method': match_method,
-                'audit_info': audit_json,
-                'borrower_uid': match['borrower_uid']
-            })
-            
-            # Update the lender (Debit) record - point to borrower
-            result2 = conn.execute(text("""
-                UPDATE tally_data 
-                SET matched_with = :matched_with, 
-                    match_status = :match_status, 
-                    match_method = :match_method,
-                    audit_info = :audit_info,
-                    date_matched = NOW()
-                WHERE uid = :lender_uid
-            """), {
-                'matched_with': match['borrower_uid'],
-                'match_status': match_status,
-                'match_method': match_method,
-                'audit_info': audit_json,
-                'lender_uid': match['lender_uid']
-            })
+def update_matches_atomically(matches):
+    """Write matches as update_matches does, but all or nothing in one transaction.
+
+    Every row must still be unmatched: when the conditional UPDATEs touch
+    fewer rows than the matches have, the transaction is rolled back and
+    False is returned. True once everything is committed.
+    """
+    expected = 0
+    updated = 0
+    with engine.connect() as conn:
+        for batch in _match_write_batches(matches):
+            rows = [row for _, match_rows in batch for row in match_rows]
+            expected += len(rows)
+            updated += _write_match_rows(conn, rows)
+        if updated != expected:
+            conn.rollback()
+            return False
         conn.commit()
+    return True
+
+def _match_write_batches(matches):
+    """Group matches with their update rows into batches of about MATCH_WRITE_BATCH_SIZE rows.
+
+    Batches are built from whole matches, so the rows of one match (a split
+    settlement has several) are always committed together. A match with
+    more rows than the batch size gets a batch of its own. Each batch is a
+    list of (match, rows).
+    """
+    batch = []
+    batch_rows = 0
+    for match in matches:
+        rows = _match_update_rows(match)
+        if batch and batch_rows + len(rows) > MATCH_WRITE_BATCH_SIZE:
+            yield batch
+            batch = []
+            batch_rows = 0
+        batch.append((match, rows))
+        batch_rows += len(rows)
+    if batch:
+        yield batch
+
+def _lock_unmatched_uids(conn, uids):
+    """Lock the uids' tally_data rows for this transaction; returns those still unmatched."""
+    result = conn.execute(text("""
+        SELECT uid FROM tally_data
+        WHERE uid IN :uids AND (match_status = 'unmatched' OR match_status IS NULL)
+        FOR UPDATE
+    """).bindparams(bindparam('uids', expanding=True)), {'uids': list(uids)})
+    return {row.uid for row in result}
+
+def _write_match_rows(conn, rows):
+    """Apply tally_data update rows (see _match_update_rows) with one multi-row UPDATE; returns the rows updated."""
+    selects = []
+    params = {}
+    for index, row in enumerate(rows):
+        selects.append(f"SELECT :uid_{index} AS uid, :matched_with_{index} AS matched_with, "
+                       f":match_status_{index} AS match_status, :match_method_{index} AS match_method, "
+                       f":audit_info_{index} AS audit_info")
+        for key, value in row.items():
+            params[f"{key}_{index}"] = value
+    result = conn.execute(text(f"""
+        UPDATE tally_data t
+        JOIN ({' UNION ALL '.join(selects)}) m ON t.uid = m.uid
+        SET t.matched_with = m.matched_with,
+            t.match_status = m.match_status,
+            t.match_method = m.match_method,
+            t.audit_info = m.audit_info,
+            t.date_matched = NOW()
+        WHERE t.match_status = 'unmatched' OR t.match_status IS NULL
+    """), params)
+    return result.rowcount
+
+def _match_update_rows(match):
+    """tally_data updates for one match: uid, matched_with, match_status, match_method, audit_info per row."""
+    # Prepare match information and determine auto-acceptance
+    # PO, LC, LOAN_ID, FINAL_SETTLEMENT, and INTERUNIT_LOAN matches are auto-accepted due to high confidence
+    auto_accept = match['match_type'] in ['PO', 'LC', 'LOAN_ID', 'FINAL_SETTLEMENT', 'INTERUNIT_LOAN']
+    # Amount tolerance and split-settlement matches always go to review
+    if match.get('amount_tolerance') or match.get('split'):
+        auto_accept = False
+
+    if match['match_type'] == 'PO':
+        match_method = 'reference_match'
+    elif match['match_type'] == 'LC':
+        match_method = 'reference_match'
+    elif match['match_type'] == 'LOAN_ID':
+        match_method = 'reference_match'
+    elif match['match_type'] == 'SALARY':
+        # For salary matches, use the audit trail
+        match_method = 'similarity_match'
+        jaccard_score = match['audit_trail'].get('jaccard_score', 0)
+    elif match['match_type'] == 'FINAL_SETTLEMENT':
+        # For final settlement matches, use the audit trail
+        match_method = 'reference_match'
+    elif match['match_type'] == 'COMMON_TEXT':
+        # For COMMON_TEXT matches, use the actual matching text and store in all relevant fields
+        common_text = match.get('common_text', '')
+        match_method = 'similarity_match'
+    elif match['match_type'] == 'INTERUNIT_LOAN':
+        # For INTERUNIT_LOAN matches, extract keywords from audit trail
+        match_method = 'cross_reference'
+    else:
+        match_method = 'fallback_match'
+
+    # Matches carry the amount in integer paisa; audit_info shows it as a
+    # two-place decimal string, the same as the DECIMAL column reads
+    amount = matching.from_minor_units(match['amount']) if match.get('amount') is not None else ''
+    # Tolerance matches carry the borrower's own (different) amount
+    borrower_amount = (matching.from_minor_units(match['borrower_amount'])
+                       if match.get('borrower_amount') is not None else amount)
+
+    # Store audit information as JSON
+    audit_info = {
+        'match_type': match['match_type'],
+        'match_method': match_method
+    }
+
+    # Prepare keywords for database storage
+    keywords = ''
+    if match['match_type'] == 'PO':
+        keywords = match.get('po', '')
+    elif match['match_type'] == 'LC':
+        keywords = match.get('lc', '')
+    elif match['match_type'] == 'LOAN_ID':
+        keywords = match.get('loan_id', '')
+    elif match['match_type'] == 'SALARY':
+        keywords = f"person:{match.get('person', '')},period:{match.get('period', '')}"
+    elif match['match_type'] == 'FINAL_SETTLEMENT':
+        keywords = f"person:{match.get('person', '')}"
+    elif match['match_type'] == 'COMMON_TEXT':
+        keywords = match.get('common_text', '')
+    elif match['match_type'] == 'INTERUNIT_LOAN':
+        if 'audit_trail' in match and 'keywords' in match['audit_trail']:
+            keywords_dict = match['audit_trail']['keywords']
+            keywords = f"Lender: {', '.join(keywords_dict.get('lender_interunit_keywords', []))}, Borrower: {', '.join(keywords_dict.get('borrower_interunit_keywords', []))}"
+        else:
+            keywords = 'Interunit loan keywords'
+
+    # Add match-specific details to audit trail
+    if match['match_type'] == 'PO':
+        # Store PO specific audit information
+        audit_info['po_number'] = match.get('po', '')
+        audit_info['lender_amount'] = amount
+        audit_info['borrower_amount'] = borrower_amount
+    elif match['match_type'] == 'LC':
+        # Store LC specific audit information
+        audit_info['lc_number'] = match.get('lc', '')
+        audit_info['lender_amount'] = amount
+        audit_info['borrower_amount'] = borrower_amount
+    elif match['match_type'] == 'LOAN_ID':
+        # Store LOAN_ID specific audit information
+        audit_info['loan_id'] = match.get('loan_id', '')
+        audit_info['lender_amount'] = amount
+        audit_info['borrower_amount'] = borrower_amount
+    elif match['match_type'] == 'SALARY':
+        # Store SALARY specific audit information
+        audit_info['person'] = match.get('person', '')
+        audit_info['period'] = match.get('period', '')
+        audit_info['lender_amount'] = amount
+        audit_info['borrower_amount'] = borrower_amount
+        if 'audit_trail' in match and 'jaccard_score' in match['audit_trail']:
+            audit_info['jaccard_score'] = match['audit_trail']['jaccard_score']
+    elif match['match_type'] == 'FINAL_SETTLEMENT':
+        # Store FINAL_SETTLEMENT specific audit information
+        audit_info['person'] = match.get('person', '')
+        audit_info['lender_amount'] = amount
+        audit_info['borrower_amount'] = borrower_amount
+        if 'audit_trail' in match:
+            audit_info.update(match['audit_trail'])
+    elif match['match_type'] == 'COMMON_TEXT':
+        # Store COMMON_TEXT specific audit information
+        audit_info['common_text'] = common_text
+        audit_info['matched_text'] = common_text
+        audit_info['matched_phrase'] = common_text
+        audit_info['lender_amount'] = amount
+        audit_info['borrower_amount'] = borrower_amount
+        if 'audit_trail' in match and 'jaccard_score' in match['audit_trail']:
+            audit_info['jaccard_score'] = match['audit_trail']['jaccard_score']
+    elif match['match_type'] == 'INTERUNIT_LOAN':
+        # Store INTERUNIT_LOAN specific audit information
+        if 'audit_trail' in match:
+            audit_info.update(match['audit_trail'])
+            # Store amount information
+            audit_info['lender_amount'] = amount
+            audit_info['borrower_amount'] = borrower_amount
+            # Store keywords as string, not object
+            if 'keywords' in match['audit_trail']:
+                keywords_dict = match['audit_trail']['keywords']
+                audit_info['keywords'] = f"Lender: {', '.join(keywords_dict.get('lender_interunit_keywords', []))}, Borrower: {', '.join(keywords_dict.get('borrower_interunit_keywords', []))}"
+    elif 'audit_trail' in match and 'jaccard_score' in match['audit_trail']:
+        audit_info['jaccard_score'] = match['audit_trail']['jaccard_score']
+
+    # Assignment score from the optimal scoring mode
+    if 'match_score' in match:
+        audit_info['match_score'] = match['match_score']
+
+    # Amount tolerance: record the actual Debit - Credit difference
+    if match.get('amount_tolerance'):
+        audit_info['amount_tolerance'] = True
+        audit_info['amount_difference'] = matching.from_minor_units(match['amount_difference'])
+        audit_info['lender_amount'] = amount
+        audit_info['borrower_amount'] = borrower_amount
+        audit_info['requires_verification'] = True
+
+    # Split settlement: one entry matched to several on the other side.
+    # Every member row carries the whole group; the single entry points
+    # at the first part and each part points at the single entry.
+    if match.get('split'):
+        audit_info['split_group'] = {
+            'lender_uids': match['lender_uids'],
+            'borrower_uids': match['borrower_uids'],
+            'lender_amounts': [str(matching.from_minor_units(units)) for units in match['lender_amounts']],
+            'borrower_amounts': [str(matching.from_minor_units(units)) for units in match['borrower_amounts']]
+        }
+        audit_info['lender_amount'] = amount
+        audit_info['borrower_amount'] = amount
+        audit_info['requires_verification'] = True
+
+    # Convert to JSON string (handle Decimal objects)
+    def convert_decimal(obj):
+        if hasattr(obj, '__str__'):
+            return str(obj)
+        return obj
+
+    # Convert any Decimal objects to strings
+    audit_info_serializable = {}
+    for key, value in audit_info.items():
+        audit_info_serializable[key] = convert_decimal(value)
+
+    audit_json = json.dumps(audit_info_serializable)
+
+    # Determine match status: auto-accept PO and LC matches, manual verification for MANUAL_VERIFICATION
+    if match['match_type'] == 'MANUAL_VERIFICATION':
+        match_status = 'pending_verification'
+    else:
+        match_status = 'confirmed' if auto_accept else 'matched'
+
+    # Borrower (Credit) record points to the lender, lender (Debit) record to the borrower
+    rows = [
+        {'uid': match['borrower_uid'], 'matched_with': match['lender_uid']},
+        {'uid': match['lender_uid'], 'matched_with': match['borrower_uid']}
+    ]
+
+    # Remaining parts of a split group point at the single entry
+    if match.get('split'):
+        single_uid, part_uids = ((match['lender_uid'], match['borrower_uids'][1:])
+                                 if len(match['lender_uids']) == 1 else
+                                 (match['borrower_uid'], match['lender_uids'][1:]))
+        rows.extend({'uid': part_uid, 'matched_with': single_uid} for part_uid in part_uids)
+
+    for row in rows:
+        row.update({'match_status': match_status, 'match_method': match_method, 'audit_info': audit_json})
+    return rows
+
 
 def get_matched_data():
     """Get matched transactions with all matching details.
@@ -474,10 +617,31 @@ def get_auto_matched_data_by_companies(lender_company, borrower_company, month=N
         
         return records
 
+def _split_group_members(conn, uid):
+    """UIDs of a split-settlement group that uid belongs to, other than uid and its matched_with record."""
+    row = conn.execute(text("""
+        SELECT matched_with, audit_info FROM tally_data WHERE uid = :uid
+    """), {'uid': uid}).fetchone()
+    if not row or not row[1]:
+        return []
+    try:
+        audit_info = json.loads(row[1]) if isinstance(row[1], str) else row[1]
+    except (TypeError, ValueError):
+        return []
+    group = audit_info.get('split_group') if isinstance(audit_info, dict) else None
+    if not group:
+        return []
+    members = group.get('lender_uids', []) + group.get('borrower_uids', [])
+    return [member for member in members if member not in (uid, row[0])]
+
 def update_match_status(uid, status, confirmed_by=None):
     """Update match status (accepted/rejected)"""
     try:
         with engine.connect() as conn:
+            # Split-settlement members other than uid and its matched_with
+            # record, which follow the same status change
+            group_uids = _split_group_members(conn, uid)
+
             if status == 'rejected':
                 # First, get the matched_with value
                 sql_get_matched = """
@@ -486,6 +650,14 @@ def update_match_status(uid, status, confirmed_by=None):
                 result = conn.execute(text(sql_get_matched), {'uid': uid})
                 matched_record = result.fetchone()
                 
+                for group_uid in group_uids:
+                    conn.execute(text("""
+                    UPDATE tally_data 
+                    SET match_status = 'unmatched', 
+                        matched_with = NULL
+                    WHERE uid = :uid
+                    """), {'uid': group_uid})
+                
                 if matched_record and matched_record[0]:
                     matched_with_uid = matched_record[0]
                     
@@ -517,6 +689,16 @@ def update_match_status(uid, status, confirmed_by=None):
                     """
                     conn.execute(text(sql_reset_main), {'uid': uid})
                 
+                conn.commit()
+                # The rejected records are open again for pairs the last run never tried.
+                # A carry-forward match can span statement periods, so every reopened
+                # record's pair-period loses its watermark, not just uid's
+                reopened = [uid] + group_uids + ([matched_record[0]] if matched_record and matched_record[0] else [])
+                for reopened_uid in dict.fromkeys(reopened):
+                    clear_match_watermark_for_uid(reopened_uid)
+                reopen_items(reopened)
+                return True
+                
             else:
                 # For confirmed status, first get the matched_with value
                 sql_get_matched = """
@@ -525,6 +707,14 @@ def update_match_status(uid, status, confirmed_by=None):
                 result = conn.execute(text(sql_get_matched), {'uid': uid})
                 matched_record = result.fetchone()
                 
+                for group_uid in group_uids:
+                    conn.execute(text("""
+                    UPDATE tally_data 
+                    SET match_status = :status, 
+                        date_matched = NOW()
+                    WHERE uid = :uid
+                    """), {'status': status, 'uid': group_uid})
+                
                 if matched_record and matched_record[0]:
                     matched_with_uid = matched_record[0]
                     
@@ -637,7 +827,8 @@ def reset_match_status():
             """)
             conn.execute(reset_query)
             conn.commit()
-            return True
+        clear_match_watermarks()
+        return True
     except Exception as e:
         print(f"Error resetting match status: {e}")
         return False
@@ -671,7 +862,8 @@ def reset_match_status_for_companies(lender_company, borrower_company, month=Non
             
             conn.execute(text(query), params)
             conn.commit()
-            return True
+        clear_match_watermarks(lender_company, borrower_company, month, year)
+        return True
     except Exception as e:
         print(f"Error resetting match status for companies: {e}")
         return False
@@ -842,9 +1034,9 @@ def get_manual_company_pairs():
         
         return pairs
 
-def get_unmatched_data_by_companies(lender_company, borrower_company, month=None, year=None):
+def get_unmatched_data_by_companies(lender_company, borrower_company, month=None, year=None, read_only=False):
     """Get unmatched transactions filtered by company names and optionally by statement period"""
-    engine = create_engine(
+    engine = readonly_engine if read_only else create_engine(
         f'mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}'
     )
     
@@ -963,7 +1155,7 @@ def get_all_pair_ids():
         print(f"Error getting pair IDs: {e}")
         return []
 
-def get_unmatched_data_by_pair_id(pair_id):
+def get_unmatched_data_by_pair_id(pair_id, read_only=False):
     """Get unmatched transactions for a specific pair ID"""
     try:
         ensure_table_exists('tally_data')
@@ -975,7 +1167,7 @@ def get_unmatched_data_by_pair_id(pair_id):
         ORDER BY Date DESC
         """
         
-        df = pd.read_sql(sql, engine, params={'pair_id': pair_id})
+        df = pd.read_sql(sql, _engine_for(read_only), params={'pair_id': pair_id})
         
         # Convert to records and handle NaN values
         records = df.to_dict('records')
@@ -1267,6 +1459,7 @@ def truncate_table():
             # Truncate the table
             conn.execute(text("TRUNCATE TABLE tally_data"))
             conn.commit()
+            clear_open_items()
             
             # Get count after truncate
             result = conn.execute(text("SELECT COUNT(*) FROM tally_data"))
@@ -1313,6 +1506,8 @@ def reset_all_matches():
             result = conn.execute(text("SELECT COUNT(*) FROM tally_data WHERE match_status IS NOT NULL"))
             remaining_matched = result.fetchone()[0]
             
+            clear_match_watermarks()
+            
             return {
                 'success': True,
                 'message': f'All matches reset successfully. Reset {matched_count} matched records.',
@@ -1324,4 +1519,722 @@ def reset_all_matches():
         return {
             'success': False,
             'error': str(e)
-        } 
\ No newline at end of file
+        } 
+
+def get_match_watermarks(read_only=False):
+    """Get the incremental-matching high-water marks, keyed like matching.shard_key.
+
+    Each value is the latest input_date already reconciled for that company
+    pair and statement period. Marks reached under a different rule-set
+    version (matching.rule_set_version) are left out, so that pair-period
+    gets a full run. Returns None when the match_watermarks table is
+    unavailable so callers fall back to a full run.
+    """
+    try:
+        ensure_table_exists('match_watermarks')
+        with _engine_for(read_only).connect() as conn:
+            result = conn.execute(text("""
+                SELECT company1, company2, statement_month, statement_year, last_input_date
+                FROM match_watermarks
+                WHERE rule_version = :rule_version
+            """), {'rule_version': matching.rule_set_version()})
+            watermarks = {}
+            for row in result:
+                key = (row.company1, row.company2, row.statement_month, row.statement_year)
+                watermarks[key] = row.last_input_date
+            return watermarks
+    except Exception as e:
+        print(f"Error getting match watermarks: {e}")
+        return None
+
+def update_match_watermarks(watermarks):
+    """Advance the high-water mark of each reconciled pair-period under the current rule-set version.
+
+    A mark never moves backwards within one version; a mark left by another
+    version is replaced outright.
+    """
+    if not watermarks:
+        return
+    try:
+        ensure_table_exists('match_watermarks')
+        rule_version = matching.rule_set_version()
+        with engine.connect() as conn:
+            for (company1, company2, month, year), last_input_date in watermarks.items():
+                # last_input_date is assigned before rule_version, so the IF still sees the stored version
+                conn.execute(text("""
+                    INSERT INTO match_watermarks
+                        (company1, company2, statement_month, statement_year, last_input_date, rule_version, last_run)
+                    VALUES (:company1, :company2, :month, :year, :last_input_date, :rule_version, NOW())
+                    ON DUPLICATE KEY UPDATE
+                        last_input_date = IF(rule_version <=> VALUES(rule_version),
+                                             GREATEST(last_input_date, VALUES(last_input_date)),
+                                             VALUES(last_input_date)),
+                        rule_version = VALUES(rule_version),
+                        last_run = NOW()
+                """), {
+                    'company1': company1,
+                    'company2': company2,
+                    'month': month,
+                    'year': year,
+                    'last_input_date': str(last_input_date),
+                    'rule_version': rule_version
+                })
+            conn.commit()
+    except Exception as e:
+        print(f"Error updating match watermarks: {e}")
+
+def clear_match_watermarks(lender_company=None, borrower_company=None, month=None, year=None):
+    """Drop high-water marks (all, or one company pair and optional period) so the next run is a full one."""
+    try:
+        ensure_table_exists('match_watermarks')
+        with engine.connect() as conn:
+            query = "DELETE FROM match_watermarks"
+            params = {}
+            if lender_company and borrower_company:
+                query += """
+                    WHERE (
+                        (company1 = :lender_company AND company2 = :borrower_company)
+                        OR (company1 = :borrower_company AND company2 = :lender_company)
+                    )
+                """
+                params = {
+                    'lender_company': lender_company,
+                    'borrower_company': borrower_company
+                }
+                if month:
+                    query += ' AND statement_month = :month'
+                    params['month'] = month
+                if year:
+                    query += ' AND statement_year = :year'
+                    params['year'] = year
+            conn.execute(text(query), params)
+            conn.commit()
+    except Exception as e:
+        print(f"Error clearing match watermarks: {e}")
+
+def clear_match_watermark_for_uid(uid):
+    """Drop the high-water mark of the pair-period a transaction belongs to."""
+    try:
+        ensure_table_exists('match_watermarks')
+        with engine.connect() as conn:
+            conn.execute(text("""
+                DELETE w FROM match_watermarks w
+                JOIN tally_data t
+                    ON ((w.company1 = t.lender AND w.company2 = t.borrower)
+                        OR (w.company1 = t.borrower AND w.company2 = t.lender))
+                    AND w.statement_month = t.statement_month
+                    AND w.statement_year = t.statement_year
+                WHERE t.uid = :uid
+            """), {'uid': uid})
+            conn.commit()
+    except Exception as e:
+        print(f"Error clearing match watermark: {e}")
+
+# Open-items index: each reconciled period's unmatched residue keyed by
+# company pair (either direction), side, statement period and amount, so a
+# carry-forward run reaches earlier periods' residue through the index
+# instead of scanning tally_data. Entries are refreshed by every run over
+# their period; rows matched or removed since are filtered out on read.
+OPEN_ITEMS_CHUNK_SIZE = 1000
+
+def _open_item_params(records):
+    """open_items rows for unmatched tally_data records (skipping rows without a period or amount)."""
+    params = []
+    for record in records:
+        company1, company2, month, year = matching.shard_key(record)
+        period = matching.period_index(month, year)
+        debit = matching.to_minor_units(record.get('Debit'))
+        credit = matching.to_minor_units(record.get('Credit'))
+        if period is None:
+            continue
+        if debit and debit > 0:
+            side, units = 'D', debit
+        elif credit and credit > 0:
+            side, units = 'C', credit
+        else:
+            continue
+        params.append({
+            'uid': record['uid'],
+            'company1': company1,
+            'company2': company2,
+            'side': side,
+            'period': period,
+            'amount': matching.from_minor_units(units)
+        })
+    return params
+
+def update_open_items(records, matches):
+    """Refresh the open-items index after a run over records: drop what matched, (re)add what is still open."""
+    if not records:
+        return
+    try:
+        ensure_table_exists('open_items')
+        matched = set()
+        for match in matches:
+            matched.update(match.get('lender_uids') or [match['lender_uid']])
+            matched.update(match.get('borrower_uids') or [match['borrower_uid']])
+        
+        with engine.connect() as conn:
+            if matched:
+                conn.execute(text("DELETE FROM open_items WHERE uid = :uid"), [{'uid': uid} for uid in matched])
+            
+            params = _open_item_params([record for record in records if record['uid'] not in matched])
+            for start in range(0, len(params), OPEN_ITEMS_CHUNK_SIZE):
+                conn.execute(text("""
+                    INSERT INTO open_items (uid, company1, company2, side, period, amount)
+                    VALUES (:uid, :company1, :company2, :side, :period, :amount)
+                    ON DUPLICATE KEY UPDATE
+                        company1 = VALUES(company1), company2 = VALUES(company2), side = VALUES(side),
+                        period = VALUES(period), amount = VALUES(amount)
+                """), params[start:start + OPEN_ITEMS_CHUNK_SIZE])
+            
+            # Entries of these periods matched outside this run (SQL pushdown, manual
+            # review, a concurrent run) - after the insert, so rows another run took
+            # while this one was writing are not left behind as open
+            for company1, company2, month, year in matching.partition_by_pair_period(records):
+                period = matching.period_index(month, year)
+                if period is None:
+                    continue
+                conn.execute(text("""
+                    DELETE o FROM open_items o
+                    JOIN tally_data t ON t.uid = o.uid
+                    WHERE o.company1 = :company1 AND o.company2 = :company2 AND o.period = :period
+                    AND t.match_status IS NOT NULL AND t.match_status <> 'unmatched'
+                """), {'company1': company1, 'company2': company2, 'period': period})
+            conn.commit()
+    except Exception as e:
+        print(f"Error updating open items: {e}")
+
+def reopen_items(uids):
+    """Add rows that became unmatched again (a rejected match) back to the open-items index."""
+    if not uids:
+        return
+    try:
+        ensure_table_exists('open_items')
+        with engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT uid, lender, borrower, statement_month, statement_year, Debit, Credit
+                FROM tally_data WHERE uid IN :uids
+            """).bindparams(bindparam('uids', expanding=True)), {'uids': list(uids)})
+            params = _open_item_params([dict(row._mapping) for row in result])
+            if params:
+                conn.execute(text("""
+                    INSERT INTO open_items (uid, company1, company2, side, period, amount)
+                    VALUES (:uid, :company1, :company2, :side, :period, :amount)
+                    ON DUPLICATE KEY UPDATE amount = VALUES(amount)
+                """), params)
+            conn.commit()
+    except Exception as e:
+        print(f"Error reopening items: {e}")
+
+def clear_open_items():
+    """Empty the open-items index (after tally_data is truncated)."""
+    try:
+        ensure_table_exists('open_items')
+        with engine.connect() as conn:
+            conn.execute(text("DELETE FROM open_items"))
+            conn.commit()
+    except Exception as e:
+        print(f"Error clearing open items: {e}")
+
+def get_carry_forward_items(company1, company2, periods, debit_amounts, credit_amounts, read_only=False):
+    """Unmatched residue of earlier periods for a company pair, read through the open-items index.
+    
+    company1/company2 are the pair in sorted order and periods are
+    matching.period_index values. Only Debit rows whose amount (paisa) is in
+    debit_amounts and Credit rows whose amount is in credit_amounts are
+    returned - the ones that can pair on exact amount.
+    """
+    if not periods:
+        return []
+    try:
+        ensure_table_exists('open_items')
+        records = []
+        with _engine_for(read_only).connect() as conn:
+            for side, amounts in (('D', debit_amounts), ('C', credit_amounts)):
+                amounts = sorted(matching.from_minor_units(units) for units in amounts)
+                for start in range(0, len(amounts), OPEN_ITEMS_CHUNK_SIZE):
+                    result = conn.execute(text("""
+                        SELECT t.* FROM open_items o
+                        JOIN tally_data t ON t.uid = o.uid
+                        WHERE o.company1 = :company1 AND o.company2 = :company2 AND o.side = :side
+                        AND o.period IN :periods
+                        AND o.amount IN :amounts
+                        AND (t.match_status = 'unmatched' OR t.match_status IS NULL)
+                    """).bindparams(bindparam('periods', expanding=True), bindparam('amounts', expanding=True)), {
+                        'company1': company1,
+                        'company2': company2,
+                        'side': side,
+                        'periods': list(periods),
+                        'amounts': amounts[start:start + OPEN_ITEMS_CHUNK_SIZE]
+                    })
+                    records.extend(dict(row._mapping) for row in result)
+        # Same order as get_unmatched_data_by_companies
+        records.sort(key=lambda record: record['Date'].toordinal() if record.get('Date') else 0, reverse=True)
+        records.sort(key=lambda record: record.get('lender') or '')
+        return records
+    except Exception as e:
+        print(f"Error getting carry-forward items: {e}")
+        return []
+
+# Reconcile result cache: the input fingerprint of each scope's last run
+# that matched nothing. Kept in MySQL so every gunicorn worker sees it.
+def get_input_fingerprint(lender_company=None, borrower_company=None, month=None, year=None,
+                          pair_id=None, earlier_periods=None):
+    """Cheap fingerprint of the rows a reconcile over this scope reads, computed inside MySQL.
+    
+    Row count, latest input_date and a checksum of every uid with its
+    match_status - any upload, match, confirmation, rejection or reset in
+    scope changes it. earlier_periods adds (month, year) periods a
+    carry-forward run reaches back into. Returns None on error.
+    """
+    try:
+        ensure_table_exists('tally_data')
+        query = """
+            SELECT COUNT(*) AS row_count, MAX(input_date) AS last_input_date,
+                COALESCE(SUM(CRC32(CONCAT(uid, ':', COALESCE(match_status, 'unmatched')))), 0) AS checksum
+            FROM tally_data WHERE 1 = 1
+        """
+        params = {}
+        if pair_id:
+            query += ' AND pair_id = :pair_id'
+            params['pair_id'] = pair_id
+        elif lender_company and borrower_company:
+            query += """
+                AND (
+                    (lender = :lender_company AND borrower = :borrower_company)
+                    OR (lender = :borrower_company AND borrower = :lender_company)
+                )
+            """
+            params['lender_company'] = lender_company
+            params['borrower_company'] = borrower_company
+            periods = []
+            if month:
+                periods.append('statement_month = :month')
+                params['month'] = month
+            if year:
+                periods.append('statement_year = :year')
+                params['year'] = year
+            if periods:
+                conditions = ['(' + ' AND '.join(periods) + ')']
+                for index, (earlier_month, earlier_year) in enumerate(earlier_periods or []):
+                    conditions.append(f'(statement_month = :month_{index} AND statement_year = :year_{index})')
+                    params[f'month_{index}'] = earlier_month
+                    params[f'year_{index}'] = earlier_year
+                query += ' AND (' + ' OR '.join(conditions) + ')'
+        
+        with engine.connect() as conn:
+            row = conn.execute(text(query), params).fetchone()
+            fingerprint = f"{row.row_count}:{row.last_input_date}:{row.checksum}"
+            if earlier_periods:
+                # Residue is carried through the open-items index, which runs over
+                # the earlier periods refresh without touching their rows
+                company1, company2 = sorted((lender_company, borrower_company))
+                indexed = conn.execute(text("""
+                    SELECT COUNT(*) AS row_count, COALESCE(SUM(CRC32(uid)), 0) AS checksum
+                    FROM open_items
+                    WHERE company1 = :company1 AND company2 = :company2 AND period IN :periods
+                """).bindparams(bindparam('periods', expanding=True)), {
+                    'company1': company1,
+                    'company2': company2,
+                    'periods': [matching.period_index(*period) for period in earlier_periods]
+                }).fetchone()
+                fingerprint += f":{indexed.row_count}:{indexed.checksum}"
+            return fingerprint
+    except Exception as e:
+        print(f"Error computing input fingerprint: {e}")
+        return None
+
+def is_known_empty_run(scope_key, fingerprint, rule_version):
+    """Whether the last run over scope_key, on this exact input and rule set, matched nothing."""
+    if not fingerprint:
+        return False
+    try:
+        ensure_table_exists('reconcile_runs')
+        with engine.connect() as conn:
+            row = conn.execute(text("""
+                SELECT fingerprint, rule_version FROM reconcile_runs WHERE scope_key = :scope_key
+            """), {'scope_key': scope_key}).fetchone()
+            return row is not None and row.fingerprint == fingerprint and row.rule_version == rule_version
+    except Exception as e:
+        print(f"Error reading reconcile runs: {e}")
+        return False
+
+def record_empty_run(scope_key, fingerprint, rule_version):
+    """Remember that a run over scope_key matched nothing on this input and rule set."""
+    if not fingerprint:
+        return
+    try:
+        ensure_table_exists('reconcile_runs')
+        with engine.connect() as conn:
+            conn.execute(text("""
+                INSERT INTO reconcile_runs (scope_key, fingerprint, rule_version, last_run)
+                VALUES (:scope_key, :fingerprint, :rule_version, NOW())
+                ON DUPLICATE KEY UPDATE
+                    fingerprint = VALUES(fingerprint),
+                    rule_version = VALUES(rule_version),
+                    last_run = NOW()
+            """), {'scope_key': scope_key, 'fingerprint': fingerprint, 'rule_version': rule_version})
+            conn.commit()
+    except Exception as e:
+        print(f"Error recording reconcile run: {e}")
+
+# Deferred reconciles: scopes whose fuzzy passes did not fit a reconcile's
+# time budget, finished later by a background thread (claimed with a
+# conditional UPDATE so only one app process runs each job)
+def _deferred_reconcile_row(row):
+    """deferred_reconciles row as a JSON-friendly dict."""
+    job = dict(row._mapping)
+    if isinstance(job.get('params'), str):
+        job['params'] = json.loads(job['params'])
+    for key in ('created_at', 'started_at', 'finished_at'):
+        if job.get(key) is not None:
+            job[key] = str(job[key])
+    return job
+
+def enqueue_deferred_reconcile(scope_key, params, deferred_pass):
+    """Queue a reconcile scope for the background worker; returns the job id (an already queued one for the same scope is reused)."""
+    try:
+        ensure_table_exists('deferred_reconciles')
+        with engine.connect() as conn:
+            row = conn.execute(text("""
+                SELECT id FROM deferred_reconciles
+                WHERE scope_key = :scope_key AND status = 'queued'
+                ORDER BY id LIMIT 1
+            """), {'scope_key': scope_key}).fetchone()
+            if row is not None:
+                return row.id
+            result = conn.execute(text("""
+                INSERT INTO deferred_reconciles (scope_key, params, status, deferred_pass, created_at)
+                VALUES (:scope_key, :params, 'queued', :deferred_pass, NOW())
+            """), {'scope_key': scope_key, 'params': json.dumps(params), 'deferred_pass': deferred_pass})
+            conn.commit()
+            return result.lastrowid
+    except Exception as e:
+        print(f"Error queueing deferred reconcile: {e}")
+        return None
+
+def claim_deferred_reconcile(stale_seconds):
+    """Take the oldest queued job (or one left running for over stale_seconds) and mark it running; None when there is none."""
+    try:
+        ensure_table_exists('deferred_reconciles')
+        with engine.connect() as conn:
+            candidates = conn.execute(text("""
+                SELECT id FROM deferred_reconciles
+                WHERE status = 'queued'
+                OR (status = 'running' AND started_at < NOW() - INTERVAL :stale_seconds SECOND)
+                ORDER BY id LIMIT 5
+            """), {'stale_seconds': stale_seconds}).fetchall()
+            for candidate in candidates:
+                claimed = conn.execute(text("""
+                    UPDATE deferred_reconciles
+                    SET status = 'running', started_at = NOW()
+                    WHERE id = :id
+                    AND (status = 'queued'
+                         OR (status = 'running' AND started_at < NOW() - INTERVAL :stale_seconds SECOND))
+                """), {'id': candidate.id, 'stale_seconds': stale_seconds})
+                conn.commit()
+                if claimed.rowcount == 1:
+                    row = conn.execute(text("SELECT * FROM deferred_reconciles WHERE id = :id"),
+                                       {'id': candidate.id}).fetchone()
+                    return _deferred_reconcile_row(row)
+            return None
+    except Exception as e:
+        print(f"Error claiming deferred reconcile: {e}")
+        return None
+
+def finish_deferred_reconcile(job_id, matches_found=None, error=None):
+    """Mark a deferred reconcile done (with its match count) or failed (with the error)."""
+    try:
+        ensure_table_exists('deferred_reconciles')
+        with engine.connect() as conn:
+            conn.execute(text("""
+                UPDATE deferred_reconciles
+                SET status = :status, matches_found = :matches_found, error = :error, finished_at = NOW()
+                WHERE id = :id
+            """), {
+                'id': job_id,
+                'status': 'failed' if error else 'done',
+                'matches_found': matches_found,
+                'error': error
+            })
+            conn.commit()
+    except Exception as e:
+        print(f"Error finishing deferred reconcile: {e}")
+
+def get_deferred_reconcile(job_id):
+    """One deferred reconcile job, or None."""
+    try:
+        ensure_table_exists('deferred_reconciles')
+        with engine.connect() as conn:
+            row = conn.execute(text("SELECT * FROM deferred_reconciles WHERE id = :id"), {'id': job_id}).fetchone()
+            return _deferred_reconcile_row(row) if row is not None else None
+    except Exception as e:
+        print(f"Error getting deferred reconcile: {e}")
+        return None
+
+def get_deferred_reconciles(limit=50):
+    """Most recent deferred reconcile jobs, newest first."""
+    try:
+        ensure_table_exists('deferred_reconciles')
+        with engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT * FROM deferred_reconciles ORDER BY id DESC LIMIT :limit
+            """), {'limit': int(limit)})
+            return [_deferred_reconcile_row(row) for row in result]
+    except Exception as e:
+        print(f"Error getting deferred reconciles: {e}")
+        return []
+
+# Reconcile previews: proposed matches computed without touching tally_data,
+# kept (in MySQL, so any app process can commit them) until committed or
+# older than RECONCILE_PREVIEW_TTL_SECONDS
+def save_reconcile_preview(preview_id, params, matches, watermarks, ttl_seconds):
+    """Store a preview's proposed matches and watermarks (JSON strings), dropping expired previews."""
+    ensure_table_exists('reconcile_previews')
+    with engine.connect() as conn:
+        conn.execute(text("""
+            DELETE FROM reconcile_previews WHERE created_at < NOW() - INTERVAL :ttl_seconds SECOND
+        """), {'ttl_seconds': ttl_seconds})
+        conn.execute(text("""
+            INSERT INTO reconcile_previews (preview_id, params, matches, watermarks, created_at)
+            VALUES (:preview_id, :params, :matches, :watermarks, NOW())
+        """), {
+            'preview_id': preview_id,
+            'params': json.dumps(params),
+            'matches': matches,
+            'watermarks': watermarks
+        })
+        conn.commit()
+
+def get_reconcile_preview(preview_id, ttl_seconds):
+    """A stored preview (params, matches and watermarks decoded), or None when unknown or expired."""
+    try:
+        ensure_table_exists('reconcile_previews')
+        with engine.connect() as conn:
+            row = conn.execute(text("""
+                SELECT preview_id, params, matches, watermarks, created_at FROM reconcile_previews
+                WHERE preview_id = :preview_id AND created_at >= NOW() - INTERVAL :ttl_seconds SECOND
+            """), {'preview_id': preview_id, 'ttl_seconds': ttl_seconds}).fetchone()
+            if row is None:
+                return None
+            return {
+                'preview_id': row.preview_id,
+                'params': json.loads(row.params) if isinstance(row.params, str) else row.params,
+                'matches': json.loads(row.matches),
+                'watermarks': json.loads(row.watermarks) if row.watermarks else [],
+                'created_at': str(row.created_at)
+            }
+    except Exception as e:
+        print(f"Error getting reconcile preview: {e}")
+        return None
+
+def delete_reconcile_preview(preview_id):
+    """Drop a preview once its matches are committed."""
+    try:
+        ensure_table_exists('reconcile_previews')
+        with engine.connect() as conn:
+            conn.execute(text("DELETE FROM reconcile_previews WHERE preview_id = :preview_id"),
+                         {'preview_id': preview_id})
+            conn.commit()
+    except Exception as e:
+        print(f"Error deleting reconcile preview: {e}")
+
+def backfill_match_features(batch_size=1000):
+    """Compute and store match features for rows saved without them (or with an older feature_version)."""
+    try:
+        ensure_table_exists('tally_data')
+        if not has_feature_columns():
+            return {
+                'success': False,
+                'error': 'tally_data has no match-feature columns. Run db_migration_match_features.sql first.'
+            }
+        
+        updated = 0
+        with engine.connect() as conn:
+            while True:
+                result = conn.execute(text("""
+                    SELECT uid, Debit, Credit, Particulars, entered_by FROM tally_data
+                    WHERE feature_version IS NULL OR feature_version <> :version
+                    LIMIT :batch_size
+                """), {'version': matching.MATCH_FEATURE_VERSION, 'batch_size': batch_size})
+                rows = [dict(row._mapping) for row in result]
+                if not rows:
+                    break
+                
+                particulars = pd.Series([row['Particulars'] or '' for row in rows], dtype=object)
+                references = matching.reference_rows(matching.extract_reference_columns(particulars))
+                params = []
+                for row, row_references in zip(rows, references):
+                    values = matching.compute_feature_columns(row, row_references)
+                    values['uid'] = row['uid']
+                    params.append(values)
+                
+                assignments = ', '.join(f"{column} = :{column}" for column in matching.FEATURE_COLUMNS)
+                conn.execute(text(f"UPDATE tally_data SET {assignments} WHERE uid = :uid"), params)
+                conn.commit()
+                updated += len(rows)
+        
+        return {
+            'success': True,
+            'message': f'Match features backfilled for {updated} records.',
+            'records_updated': updated
+        }
+    except Exception as e:
+        print(f"Error backfilling match features: {e}")
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+# Exact reference rules pushed down to MySQL, strongest first (same order as
+# matching.MATCH_PASSES). Each entry is (match type, key column, extra audit_info
+# fields as (name, SQL expression over the lender row l / borrower row b)).
+# (pass name from matching.MATCH_PASSES, match type, key column, audit fields)
+REFERENCE_PUSHDOWN_RULES = [
+    ('PO', 'PO', 'feat_po', [('po_number', 'l.ref_key')]),
+    ('FINAL_SETTLEMENT_PERSON', 'FINAL_SETTLEMENT', 'feat_person_name', [
+        ('person', "JSON_EXTRACT(l.match_features, '$.final_settlement.person_combined')"),
+        ('match_reason', "'Final settlement match'"),
+        ('lender_person', "JSON_EXTRACT(l.match_features, '$.final_settlement.person_combined')"),
+        ('borrower_person', "JSON_EXTRACT(b.match_features, '$.final_settlement.person_combined')"),
+        ('person_name', 'l.ref_key'),
+        ('person_id', "JSON_EXTRACT(l.match_features, '$.final_settlement.person_id')")
+    ]),
+    ('LC', 'LC', 'feat_lc_norm', [('lc_number', 'l.feat_lc')]),
+    ('TIME_LOAN_ID', 'LOAN_ID', 'feat_time_loan_id', [('loan_id', 'l.ref_key')]),
+    ('LOAN_ID', 'LOAN_ID', 'feat_loan_id', [('loan_id', 'l.ref_key')]),
+]
+
+def match_references_in_sql(lender_company=None, borrower_company=None, month=None, year=None,
+                            pair_id=None, by_period=False):
+    """Resolve exact PO / final-settlement person / LC / Loan ID matches inside MySQL.
+    
+    Each rule is one INSERT ... SELECT that self-joins unmatched Debit and
+    Credit rows on (company pair, reference key, amount) into a temporary
+    pair table, followed by two UPDATE ... JOINs that mark both sides
+    confirmed. Rows are numbered within each (key, amount) group with
+    ROW_NUMBER() and paired rank-to-rank, which gives the same one-to-one
+    pairing as the in-memory index pass. Only rows whose stored
+    feature_version is current take part; the Python matcher handles the
+    rest, and the fuzzy rules, afterwards. Requires MySQL 8 (window functions).
+    
+    by_period also requires the same statement month and year, matching
+    sharded reconciliation. A rule with a date window
+    (matching.date_window_for its pass) only pairs rows at most that many
+    days apart; rows without a Date are not constrained, and rank-paired
+    rows outside the window are left to the Python matcher. Returns the
+    number of matches written.
+    """
+    try:
+        ensure_table_exists('tally_data')
+        if not has_feature_columns():
+            return 0
+        
+        scope = ""
+        params = {'version': matching.MATCH_FEATURE_VERSION}
+        if pair_id:
+            scope += " AND pair_id = :pair_id"
+            params['pair_id'] = pair_id
+        if lender_company and borrower_company:
+            scope += """
+                AND ((lender = :lender_company AND borrower = :borrower_company)
+                     OR (lender = :borrower_company AND borrower = :lender_company))
+            """
+            params['lender_company'] = lender_company
+            params['borrower_company'] = borrower_company
+        if month:
+            scope += " AND statement_month = :month"
+            params['month'] = month
+        if year:
+            scope += " AND statement_year = :year"
+            params['year'] = year
+        
+        group_columns = ["company1", "company2"] + (["statement_month", "statement_year"] if by_period else [])
+        
+        def side(amount_column, key_column):
+            # Unmatched rows of one side with their rank inside the (group, key, amount) bucket
+            return f"""
+                SELECT uid, {amount_column} AS amount, {key_column} AS ref_key, feat_lc, match_features, Date,
+                       LEAST(COALESCE(lender, ''), COALESCE(borrower, '')) AS company1,
+                       GREATEST(COALESCE(lender, ''), COALESCE(borrower, '')) AS company2,
+                       statement_month, statement_year,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY LEAST(COALESCE(lender, ''), COALESCE(borrower, '')),
+                                        GREATEST(COALESCE(lender, ''), COALESCE(borrower, '')),
+                                        {'statement_month, statement_year, ' if by_period else ''}{key_column}, {amount_column}
+                           ORDER BY lender ASC, Date DESC, id ASC
+                       ) AS rank_in_key
+                FROM tally_data
+                WHERE (match_status = 'unmatched' OR match_status IS NULL)
+                AND {amount_column} > 0
+                AND {key_column} IS NOT NULL
+                AND feature_version = :version
+                {scope}
+            """
+        
+        total = 0
+        with engine.connect() as conn:
+            conn.execute(text("""
+                CREATE TEMPORARY TABLE IF NOT EXISTS reference_pairs (
+                    lender_uid VARCHAR(50) PRIMARY KEY,
+                    borrower_uid VARCHAR(50) NOT NULL UNIQUE,
+                    audit_info JSON
+                )
+            """))
+            
+            for pass_name, match_type, key_column, audit_fields in REFERENCE_PUSHDOWN_RULES:
+                conn.execute(text("DELETE FROM reference_pairs"))
+                
+                window = matching.date_window_for(pass_name)
+                date_condition = ""
+                rule_params = params
+                if window is not None:
+                    date_condition = """
+                        AND (l.Date IS NULL OR b.Date IS NULL OR ABS(DATEDIFF(l.Date, b.Date)) <= :window)
+                    """
+                    rule_params = dict(params, window=window)
+                
+                audit_pairs = [
+                    ("'match_type'", f"'{match_type}'"),
+                    ("'match_method'", "'reference_match'"),
+                    ("'lender_amount'", "CAST(l.amount AS CHAR)"),
+                    ("'borrower_amount'", "CAST(b.amount AS CHAR)")
+                ] + [(f"'{name}'", expression) for name, expression in audit_fields]
+                audit_json = "JSON_OBJECT(" + ", ".join(f"{name}, {expression}" for name, expression in audit_pairs) + ")"
+                join_condition = " AND ".join(f"l.{column} = b.{column}" for column in group_columns)
+                
+                result = conn.execute(text(f"""
+                    INSERT INTO reference_pairs (lender_uid, borrower_uid, audit_info)
+                    SELECT l.uid, b.uid, {audit_json}
+                    FROM ({side('Debit', key_column)}) l
+                    JOIN ({side('Credit', key_column)}) b
+                        ON {join_condition}
+                        AND l.ref_key = b.ref_key
+                        AND l.amount = b.amount
+                        AND l.rank_in_key = b.rank_in_key
+                        {date_condition}
+                """), rule_params)
+                if not result.rowcount:
+                    continue
+                total += result.rowcount
+                
+                # Borrower points to lender, lender points to borrower
+                for own_uid, other_uid in (('borrower_uid', 'lender_uid'), ('lender_uid', 'borrower_uid')):
+                    conn.execute(text(f"""
+                        UPDATE tally_data t
+                        JOIN reference_pairs p ON t.uid = p.{own_uid}
+                        SET t.matched_with = p.{other_uid},
+                            t.match_status = 'confirmed',
+                            t.match_method = 'reference_match',
+                            t.audit_info = p.audit_info,
+                            t.date_matched = NOW()
+                    """))
+            
+            conn.execute(text("DROP TEMPORARY TABLE IF EXISTS reference_pairs"))
+            conn.commit()
+        
+        return total
+    except Exception as e:
+        print(f"Error in SQL reference matching, leaving it to the Python matcher: {e}")
+        return 0
@@ -0,0 +1,84 @@
+"""
+Keyword Scanner Module - multi-keyword substring search in one pass.
+
+An Aho-Corasick automaton over a fixed keyword list: scan() walks the text
+once and returns a bitmask with one bit per keyword found anywhere in it
+(plain substring semantics, the same as `keyword in text`). Callers build
+masks for the keyword groups they care about and test them with `&`
+instead of running one `in` check per keyword.
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton compiled to a flat byte transition table.
+
+    Keywords are matched case-sensitively, so build it from lowercase
+    keywords and scan lowercased text. Matching runs over UTF-8 bytes,
+    which finds exactly the same substrings as matching characters.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+        self.bits: Dict[str, int] = {keyword: 1 << index for index, keyword in enumerate(self.keywords)}
+
+        # Trie of the keywords; outputs[state] is the mask of keywords ending there
+        goto: List[Dict[int, int]] = [{}]
+        outputs: List[int] = [0]
+        for keyword in self.keywords:
+            state = 0
+            for byte in keyword.encode('utf-8'):
+                next_state = goto[state].get(byte)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][byte] = next_state
+                    goto.append({})
+                    outputs.append(0)
+                state = next_state
+            outputs[state] |= self.bits[keyword]
+
+        # Breadth-first failure links, folded into the transition table so the
+        # scan loop never follows them: each state starts from its failure
+        # state's row and inherits its outputs. Rows are laid out flat, 256
+        # entries per state, and hold the next state's row offset.
+        fail = [0] * len(goto)
+        table = [0] * (256 * len(goto))
+        for byte, next_state in goto[0].items():
+            table[byte] = next_state * 256
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            row = state * 256
+            fail_row = fail[state] * 256
+            table[row:row + 256] = table[fail_row:fail_row + 256]
+            for byte, next_state in goto[state].items():
+                fail[next_state] = table[fail_row + byte] // 256
+                table[row + byte] = next_state * 256
+                queue.append(next_state)
+
+        self._table = table
+        # Output masks indexed by row offset, so the scan loop needs no division
+        self._outputs = [outputs[offset // 256] for offset in range(len(table))]
+
+    def scan(self, text: str) -> int:
+        """Return the bitmask of every keyword occurring in text."""
+        table = self._table
+        outputs = self._outputs
+        offset = 0
+        mask = 0
+        for byte in text.encode('utf-8'):
+            offset = table[offset + byte]
+            mask |= outputs[offset]
+        return mask
+
+    def found(self, mask: int, keywords: Optional[Iterable[str]] = None) -> List[str]:
+        """Keywords whose bit is set in mask, in the given (or build) order."""
+        return [keyword for keyword in (self.keywords if keywords is None else keywords) if mask & self.bits[keyword]]
+
+
+def whole_word_pattern(keyword: str) -> re.Pattern:
+    """Regex finding keyword only where it isn't part of a longer word or number."""
+    return re.compile(r'(?<![a-z0-9])' + re.escape(keyword) + r'(?![a-z0-9])')
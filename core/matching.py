@@ -2,34 +2,279 @@
 Matching Module - Contains all matching algorithms and logic.
 Extracted from core/database.py to separate concerns.
 """
+import bisect
+import calendar
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import random
 import re
-from typing import List, Dict, Any, Optional, Tuple
-from core.bank_config import get_bank_name, get_account_reference_patterns
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+from functools import partial
+from itertools import chain
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple, Callable, Iterator
+import pandas as pd
+from core import bank_config
+from core.bank_config import COMPILED_ACCOUNT_PATTERNS, find_bank_names, get_bank_name, get_compiled_account_reference_patterns
+from core.keyword_scanner import KeywordAutomaton
+from core.config import (
+    COMMON_TEXT_LSH_ENABLED, COMMON_TEXT_LSH_BANDS, COMMON_TEXT_LSH_ROWS, COMMON_TEXT_SHINGLE_SIZE,
+    MATCH_SCORING_MODE, MATCH_ASSIGNMENT_MAX_GROUP_SIZE, MATCH_ASSIGNMENT_WORKERS,
+    MATCH_ASSIGNMENT_PARALLEL_MIN_PAIRS, MATCH_AMOUNT_TOLERANCE_ENABLED, MATCH_AMOUNT_TOLERANCE_ABSOLUTE,
+    MATCH_AMOUNT_TOLERANCE_PERCENT, MATCH_AMOUNT_TOLERANCE_BY_PAIR, MATCH_DATE_WINDOW_DAYS, MATCH_DATE_WINDOW_BY_RULE,
+    MATCH_SPLIT_ENABLED, MATCH_SPLIT_MAX_PARTS, MATCH_SPLIT_DATE_WINDOW_DAYS, MATCH_SPLIT_MAX_CANDIDATES,
+    RECONCILE_FUZZY_SECONDS_PER_PAIR
+)
 
 
-def extract_po(particulars: str) -> Optional[str]:
+# ---------------------------------------------------------------------------
+# Compiled pattern registry. Built once at import (or gunicorn --preload), so
+# the extractors below never go through re's pattern cache per call.
+# ---------------------------------------------------------------------------
+
+# PO numbers: ABC/PO/123/456 or similar formats
+PO_PATTERN = re.compile(r'\b[A-Z]{2,4}/PO/\d+/\d+\b')
+
+# LC numbers: L/C-123/456, LC-123/456, or similar formats
+LC_PATTERN = re.compile(r'\b(?:L/C|LC)[-\s]?\d+[/\s]?\d*\b')
+
+# Loan IDs: LD123, ID-456, etc. Shared by the plain, normalized and
+# after-time-loan-phrase extractors
+LOAN_ID_PATTERN = re.compile(r'\b(?P<prefix>LD|ID|LOAN)[-\s]?(?P<digits>\d+)\b')
+
+# Accept both variants:
+# - "... Principal & Interest repayment of Time Loan ..."
+# - "... Principal & Interest of Time Loan ..."
+TIME_LOAN_PHRASE_PATTERN = re.compile(
+    r"amount\s+being\s+paid\s+as\s*principal\s*&?\s*interest"  # Principal & Interest
+    r"(?:\s+repayment)?"                                           # optional 'repayment'
+    r"\s+(?:of\s+)?time\s+loan",                                 # 'of Time Loan' or 'Time Loan'
+    re.IGNORECASE,
+)
+
+# Lender pattern: "* Amount paid as Inter Unit Loan * (*-ID: *)"
+LENDER_PERSON_PATTERN = re.compile(
+    r"\(\s*(?P<name>[^()]+?)\s*-\s*ID\s*[:：]\s*(?P<id>\d+)\s*\)",
+    re.IGNORECASE,
+)
+
+# Borrower pattern: "Payable to *-ID:* * final settlement*"
+BORROWER_PERSON_PATTERN = re.compile(
+    r"payable\s+to\s+(?P<name>[^\r\n\-]+?)\s*-\s*ID\s*[:：]\s*(?P<id>\d+)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Salary person name heuristics, tried in priority order. They stay an ordered
+# tuple rather than one alternation: an alternation returns the leftmost hit of
+# any pattern, which would change which name wins.
+SALARY_PERSON_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    # Traditional salary patterns
+    r'salary\s+of\s+([A-Za-z\s]+?)(?:\s+for|\s+month|\s+period|$)',
+    r'([A-Za-z\s]+?)\s+salary',
+    r'payroll\s+for\s+([A-Za-z\s]+?)(?:\s+for|\s+month|\s+period|$)',
+    r'([A-Za-z\s]+?)\s+payroll',
+
+    # Real-world patterns with titles and employee IDs
+    r'\(([A-Za-z]+\.\s+[A-Za-z\s]+?)-ID\s*:\s*\d+\)',  # "(Name-ID : Number)"
+    r'([A-Za-z]+\.\s+[A-Za-z\s]+?)-ID\s*:\s*\d+',  # "Name-ID : Number" (without parentheses)
+    r'payable\s+to\s+([A-Za-z]+\.\s+[A-Za-z\s]+?)-ID\s*:\s*\d+',  # "Payable to Name-ID:Number"
+    r'amount\s+paid\s+to\s+([A-Za-z]+\.\s+[A-Za-z\s]+?)(?:\s*,|\s+for|\s+employee|\s+office|\s+human|\s+resources|\s+administration|\s+final|\s+settlement|\s+employee\s+id|\s*$)',  # "Amount paid to Name"
+    r'([A-Za-z]+\.\s+[A-Za-z\s]+?)(?:\s+for|\s+month|\s+period|\s+employee|\s+id|\s*,|\s*$)',  # General pattern for titles
+    # Additional pattern for names with titles in parentheses
+    r'\(([A-Za-z]+\.\s+[A-Za-z\s]+?)\)',  # "(Name)" - just the name in parentheses
+))
+
+# Salary period (month/year), first hit in priority order
+SALARY_PERIOD_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'(\w+\s+\d{4})',  # "January 2024"
+    r'(\d{1,2}/\d{4})',  # "01/2024"
+    r'(\d{4}-\d{2})',  # "2024-01"
+))
+
+# Interunit loan account numbers, tried in order per role. Lenders usually
+# quote the full 13-16 digit account, borrowers the hyphenated 3-10 digit form.
+INTERUNIT_ACCOUNT_PATTERNS = {
+    'lender': (
+        COMPILED_ACCOUNT_PATTERNS['standard'],
+        re.compile(r'([A-Za-z\s-]+[A-Za-z])-?[A-Za-z0-9/-]*(\d{10,})'),
+        re.compile(r'(\d{13,16})'),
+    ),
+    'borrower': (
+        re.compile(r'([A-Za-z\s-]+[A-Za-z])-?[A-Za-z0-9/-]*(\d{3}-\d{10})'),
+        re.compile(r'([A-Za-z\s-]+[A-Za-z])-?[A-Za-z0-9/-]*(\d{10,})'),
+        COMPILED_ACCOUNT_PATTERNS['hyphenated'],
+    ),
+}
+
+# Shortened account reference quoted after a bank code, e.g. PBL#1833
+SHORT_ACCOUNT_REF_PATTERN = re.compile(r'#(\d{4,5})')
+
+# ---------------------------------------------------------------------------
+# Narration keywords. Every keyword below, plus every BANK_MAPPING alias, goes
+# into one Aho-Corasick automaton (see scan_narration), so each narration is
+# scanned once instead of running a substring check per keyword. Keywords
+# are plain lowercase substrings, as with `keyword in particulars.lower()`.
+# ---------------------------------------------------------------------------
+
+# Primary salary keywords found in actual data
+SALARY_PRIMARY_KEYWORDS = (
+    'salary', 'sal', 'wage', 'payroll', 'remuneration', 'compensation'
+)
+
+# Secondary keywords (context-dependent)
+SALARY_SECONDARY_KEYWORDS = (
+    'monthly', 'month', 'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'
+)
+
+# A narration with any of these is not a salary transaction
+NON_SALARY_INDICATORS = (
+    'payment for', 'purchase of', 'rent', 'electricity', 'transportation', 'marketing',
+    'maintenance', 'equipment', 'insurance', 'legal', 'consulting', 'training',
+    'travel', 'software', 'security', 'cleaning', 'bank charges', 'interest',
+    'loan repayment', 'tax payment', 'bill payment', 'expenses for', 'fees for',
+    'vendor payment', 'po no', 'work order', 'invoice', 'challan', 'tds deduction',
+    'vds deduction', 'duty', 'taxes', 'port', 'shipping', 'carrying charges',
+    'l/c', 'letter of credit', 'margin', 'collateral', 'acceptance commission',
+    'retirement value', 'principal', 'time loan', 'usance loan'
+)
+
+# Triggers for the explicit final settlement person patterns
+LENDER_PERSON_TRIGGER = 'amount paid as inter unit loan'
+BORROWER_PERSON_TRIGGERS = ('payable to', 'final settlement')
+
+# Interunit loan narrations: either side's own phrase or the shared ones
+INTERUNIT_SIDE_PHRASES = {
+    'lender': 'amount paid as interunit loan',
+    'borrower': 'amount received as interunit loan',
+}
+INTERUNIT_KEYWORDS = ('interunit fund transfer', 'inter unit fund transfer', 'interunit loan')
+
+# Single-spaced spellings of TIME_LOAN_PHRASE_PATTERN settle the check
+# without the regex; anything else containing 'principal' falls back to it
+TIME_LOAN_PHRASE_VARIANTS = (
+    'amount being paid as principal & interest repayment of time loan',
+    'amount being paid as principal & interest of time loan',
+)
+TIME_LOAN_PREFILTER = 'principal'
+
+# Substrings every PO / L/C / Loan ID pattern match must contain; narrations
+# without them skip the regex search
+REFERENCE_PREFILTERS = {
+    'po': ('/po/',),
+    'lc': ('l/c', 'lc'),
+    'loan_id': ('ld', 'id', 'loan'),
+}
+
+NARRATION_KEYWORDS = tuple(dict.fromkeys(
+    SALARY_PRIMARY_KEYWORDS + SALARY_SECONDARY_KEYWORDS + NON_SALARY_INDICATORS +
+    (LENDER_PERSON_TRIGGER,) + BORROWER_PERSON_TRIGGERS +
+    tuple(INTERUNIT_SIDE_PHRASES.values()) + INTERUNIT_KEYWORDS +
+    TIME_LOAN_PHRASE_VARIANTS + (TIME_LOAN_PREFILTER,) +
+    tuple(keyword for keywords in REFERENCE_PREFILTERS.values() for keyword in keywords)
+))
+
+# Narration keywords take the low bits in this order; bank aliases follow
+# them, so these masks stay valid when the bank mapping is edited and the
+# automaton rebuilt
+NARRATION_BITS = {keyword: 1 << index for index, keyword in enumerate(NARRATION_KEYWORDS)}
+BANK_ALIAS_SHIFT = len(NARRATION_KEYWORDS)
+
+
+def _keyword_mask(keywords) -> int:
+    mask = 0
+    for keyword in keywords:
+        mask |= NARRATION_BITS[keyword]
+    return mask
+
+
+SALARY_PRIMARY_MASK = _keyword_mask(SALARY_PRIMARY_KEYWORDS + ('final settlement',))
+NON_SALARY_MASK = _keyword_mask(NON_SALARY_INDICATORS)
+INTERUNIT_MASK = _keyword_mask(INTERUNIT_KEYWORDS)
+INTERUNIT_SIDE_MASKS = {role: NARRATION_BITS[phrase] | INTERUNIT_MASK for role, phrase in INTERUNIT_SIDE_PHRASES.items()}
+BORROWER_PERSON_MASK = _keyword_mask(BORROWER_PERSON_TRIGGERS)
+TIME_LOAN_VARIANT_MASK = _keyword_mask(TIME_LOAN_PHRASE_VARIANTS)
+REFERENCE_PREFILTER_MASKS = {name: _keyword_mask(keywords) for name, keywords in REFERENCE_PREFILTERS.items()}
+SALARY_AUDIT_KEYWORDS = SALARY_PRIMARY_KEYWORDS + SALARY_SECONDARY_KEYWORDS
+
+# Mersenne prime modulus shared by MinHash and the rolling phrase hash
+MINHASH_PRIME = (1 << 61) - 1
+ROLLING_HASH_BASE = 1_000_003
+
+# Word tokens for Jaccard similarity
+JACCARD_WORD_PATTERN = re.compile(r'\b\w+\b')
+
+# Tokens (words, numbers, punctuation) for long common-phrase detection
+# Enhanced pattern to better capture mixed alphanumeric sequences
+PHRASE_TOKEN_PATTERN = re.compile(r'\b\w+\b|\d+(?:\.\d+)?|\d+[/\-]\d+|[A-Za-z0-9]+[/\-][A-Za-z0-9]+|[A-Za-z0-9]+(?:\-[A-Za-z0-9]+)*|[^\w\s]')
+
+
+class NarrationScan(NamedTuple):
+    """Keyword bitmask (NARRATION_BITS, then bank aliases) found in one narration by scan_narration()."""
+    particulars: str
+    mask: int
+
+    def banks(self) -> List[str]:
+        """Bank names whose aliases appear as whole words in the narration, in order of appearance."""
+        if not self.mask >> BANK_ALIAS_SHIFT:
+            return []
+        scanner, aliases = get_narration_scanner()
+        return find_bank_names(self.particulars, scanner.found(self.mask, aliases))
+
+
+# (BANK_MAPPING_VERSION, automaton, bank aliases) - rebuilt if the mapping is edited
+_narration_scanner = None
+
+
+def get_narration_scanner() -> Tuple[KeywordAutomaton, Tuple[str, ...]]:
+    """Get the narration automaton and the bank aliases it covers."""
+    global _narration_scanner
+    if _narration_scanner is None or _narration_scanner[0] != bank_config.BANK_MAPPING_VERSION:
+        aliases = tuple(alias for alias in bank_config.get_bank_aliases() if alias not in NARRATION_BITS)
+        _narration_scanner = (bank_config.BANK_MAPPING_VERSION, KeywordAutomaton(NARRATION_KEYWORDS + aliases), aliases)
+    return _narration_scanner[1], _narration_scanner[2]
+
+
+def scan_narration(particulars: str) -> NarrationScan:
+    """Scan a narration once for every narration keyword and bank alias.
+
+    Bank names are only resolved (whole-word checks) when banks() is called.
+    """
+    if not particulars:
+        return NarrationScan('', 0)
+    scanner, _ = get_narration_scanner()
+    return NarrationScan(particulars, scanner.scan(particulars.lower()))
+
+
+def extract_po(particulars: str, scan: Optional[NarrationScan] = None) -> Optional[str]:
     """Extract PO number from particulars."""
     if not particulars:
         return None
+    if scan is not None and not scan.mask & REFERENCE_PREFILTER_MASKS['po']:
+        return None
     
-    # Pattern for PO numbers: ABC/PO/123/456 or similar formats
-    po_pattern = r'\b[A-Z]{2,4}/PO/\d+/\d+\b'
     try:
-        match = re.search(po_pattern, particulars.upper())
+        match = PO_PATTERN.search(particulars.upper())
         return match.group() if match else None
     except Exception as e:
-        print(f"DEBUG: PO regex error: {e} with pattern '{po_pattern}' and text '{particulars}'")
+        print(f"DEBUG: PO regex error: {e} with pattern '{PO_PATTERN.pattern}' and text '{particulars}'")
         return None
 
 
-def extract_lc(particulars: str) -> Optional[str]:
+def extract_lc(particulars: str, scan: Optional[NarrationScan] = None) -> Optional[str]:
     """Extract LC number from particulars."""
     if not particulars:
         return None
+    if scan is not None and not scan.mask & REFERENCE_PREFILTER_MASKS['lc']:
+        return None
     
-    # Pattern for LC numbers: L/C-123/456, LC-123/456, or similar formats
-    lc_pattern = r'\b(?:L/C|LC)[-\s]?\d+[/\s]?\d*\b'
-    match = re.search(lc_pattern, particulars.upper())
+    match = LC_PATTERN.search(particulars.upper())
     return match.group() if match else None
 
 
@@ -51,25 +296,22 @@ def normalize_lc_number(lc_string: str) -> str:
 
 
 # Helper: detect the specific Time Loan repayment phrase
-def has_time_loan_phrase(particulars: str) -> bool:
+def has_time_loan_phrase(particulars: str, scan: Optional[NarrationScan] = None) -> bool:
     if not particulars:
         return False
-    # Accept both variants:
-    # - "... Principal & Interest repayment of Time Loan ..."
-    # - "... Principal & Interest of Time Loan ..."
-    pattern = (
-        r"amount\s+being\s+paid\s+as\s*principal\s*&?\s*interest"  # Principal & Interest
-        r"(?:\s+repayment)?"                                           # optional 'repayment'
-        r"\s+(?:of\s+)?time\s+loan"                                  # 'of Time Loan' or 'Time Loan'
-    )
-    return re.search(pattern, particulars, flags=re.IGNORECASE) is not None
+    if scan is not None:
+        if scan.mask & TIME_LOAN_VARIANT_MASK:
+            return True
+        if not scan.mask & NARRATION_BITS[TIME_LOAN_PREFILTER]:
+            return False
+    return TIME_LOAN_PHRASE_PATTERN.search(particulars) is not None
 
 
 # Helper: extract normalized loan id like PREFIX-<digits> (e.g., LD-2435445106)
 def extract_normalized_loan_id(particulars: str) -> Optional[str]:
     if not particulars:
         return None
-    match = re.search(r"\b(?P<prefix>LD|ID|LOAN)[-\s]?(?P<digits>\d+)\b", particulars.upper())
+    match = LOAN_ID_PATTERN.search(particulars.upper())
     if not match:
         return None
     prefix = match.group("prefix")
@@ -83,36 +325,94 @@ def extract_normalized_loan_id_after_time_loan_phrase(particulars: str) -> Optio
     """
     if not particulars:
         return None
-    phrase = re.search(
-        (
-            r"amount\s+being\s+paid\s+as\s*principal\s*&?\s*interest"  # Principal & Interest
-            r"(?:\s+repayment)?"                                           # optional 'repayment'
-            r"\s+(?:of\s+)?time\s+loan"                                  # 'of Time Loan' or 'Time Loan'
-        ),
-        particulars,
-        flags=re.IGNORECASE,
-    )
+    phrase = TIME_LOAN_PHRASE_PATTERN.search(particulars)
     if not phrase:
         return None
     start = phrase.end()
     after = particulars[start:]
-    m = re.search(r"\b(?:LD|ID|LOAN)[-\s]?(\d+)\b", after.upper())
+    m = LOAN_ID_PATTERN.search(after.upper())
     if not m:
         return None
-    digits = m.group(1)
+    digits = m.group("digits")
     return f"LD-{digits}"
 
-def extract_loan_id(particulars: str) -> Optional[str]:
+def extract_loan_id(particulars: str, scan: Optional[NarrationScan] = None) -> Optional[str]:
     """Extract Loan ID from particulars."""
     if not particulars:
         return None
+    if scan is not None and not scan.mask & REFERENCE_PREFILTER_MASKS['loan_id']:
+        return None
     
-    # Pattern for Loan IDs: LD123, ID-456, etc.
-    loan_pattern = r'\b(?:LD|ID|LOAN)[-\s]?\d+\b'
-    match = re.search(loan_pattern, particulars.upper())
+    match = LOAN_ID_PATTERN.search(particulars.upper())
     return match.group() if match else None
 
 
+# Capturing forms of the reference patterns for Series.str.extract, which
+# needs at least one group; the time loan form captures everything after
+# the phrase so the Loan ID search can run on that tail
+PO_CAPTURE_PATTERN = re.compile(f"({PO_PATTERN.pattern})")
+LC_CAPTURE_PATTERN = re.compile(f"({LC_PATTERN.pattern})")
+LOAN_ID_CAPTURE_PATTERN = re.compile(f"(?P<loan_id>{LOAN_ID_PATTERN.pattern})")
+TIME_LOAN_TAIL_PATTERN = re.compile(TIME_LOAN_PHRASE_PATTERN.pattern + r"(?P<tail>.*)", re.IGNORECASE | re.DOTALL)
+
+REFERENCE_COLUMNS = ('po', 'lc', 'normalized_lc', 'loan_id', 'has_time_loan_phrase', 'time_loan_id')
+
+
+def _extract_where(text: pd.Series, prefilter: pd.Series, pattern: re.Pattern, group: Any = 0) -> pd.Series:
+    # str.extract over the prefiltered rows only; None elsewhere and where nothing matched
+    result = pd.Series(None, index=text.index, dtype=object)
+    if prefilter.any():
+        extracted = text[prefilter].str.extract(pattern, expand=True)[group]
+        result[prefilter] = extracted.where(extracted.notna(), None)
+    return result
+
+
+def extract_reference_columns(particulars: pd.Series) -> pd.DataFrame:
+    """Batch form of the reference extractors over a Series of narrations.
+
+    Returns a DataFrame on the same index with the REFERENCE_COLUMNS, equal
+    row for row to extract_po, extract_lc (and normalize_lc_number),
+    extract_loan_id, has_time_loan_phrase and
+    extract_normalized_loan_id_after_time_loan_phrase; missing values are
+    None. The same compiled patterns run through Series.str, each only on
+    the rows holding the substring every match of it must contain. Text is
+    kept in object dtype so Python's re semantics apply throughout.
+    """
+    text = particulars.astype(object).where(particulars.notna(), '').map(str)
+    upper = text.str.upper()
+
+    po = _extract_where(upper, upper.str.contains('/PO/', regex=False), PO_CAPTURE_PATTERN)
+    lc = _extract_where(upper, upper.str.contains('LC', regex=False) | upper.str.contains('L/C', regex=False),
+                        LC_CAPTURE_PATTERN)
+    loan_id = _extract_where(upper, upper.str.contains('LD', regex=False) | upper.str.contains('ID', regex=False) |
+                             upper.str.contains('LOAN', regex=False), LOAN_ID_CAPTURE_PATTERN, 'loan_id')
+
+    has_phrase = text.str.contains(TIME_LOAN_PHRASE_PATTERN)
+    tail = _extract_where(text, has_phrase, TIME_LOAN_TAIL_PATTERN, 'tail')
+    tail = tail[has_phrase].str.upper()
+    digits = pd.Series(None, index=text.index, dtype=object)
+    if len(tail):
+        digits[has_phrase] = tail.str.extract(LOAN_ID_PATTERN)['digits']
+    time_loan_id = ('LD-' + digits[digits.notna()]).reindex(text.index)
+
+    normalized_lc = lc[lc.notna()].str.replace('L/C', 'LC', regex=False).str.strip().reindex(text.index)
+    frame = pd.DataFrame({
+        'po': po,
+        'lc': lc,
+        'normalized_lc': normalized_lc,
+        'loan_id': loan_id,
+        'has_time_loan_phrase': has_phrase.astype(bool),
+        'time_loan_id': time_loan_id,
+    }, index=text.index).astype(object)
+    return frame.where(frame.notna(), None)
+
+
+def reference_rows(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """extract_reference_columns output as one dict per row (cheaper than DataFrame.to_dict('records'))."""
+    columns = [frame[column].tolist() for column in REFERENCE_COLUMNS]
+    return [dict(zip(REFERENCE_COLUMNS, values)) for values in zip(*columns)]
+
+
 def extract_account_number(particulars: str) -> Optional[Dict[str, Any]]:
     """Extract account number reference from particulars."""
     if not particulars:
@@ -120,82 +420,124 @@ def extract_account_number(particulars: str) -> Optional[Dict[str, Any]]:
     
     # Pattern for account number references: #11026, MDBL#11026, OBL#8826, etc.
     # Look for 4-6 digit numbers preceded by # or bank code#
-    account_patterns = get_account_reference_patterns()
+    particulars_upper = particulars.upper()
     
-    for i, pattern in enumerate(account_patterns):
-        try:
-            match = re.search(pattern, particulars.upper())
-            if match:
-                if len(match.groups()) == 1:
-                    # Pattern: #11026
-                    account_number = match.group(1)
-                    bank_code = None
-                else:
-                    # Pattern: MDBL#11026 or Midland Bank#11026
-                    bank_code = match.group(1).strip()
-                    account_number = match.group(2)
-                
-                # Normalize bank codes using the bank configuration module
-                normalized_bank = get_bank_name(bank_code) if bank_code else None
-                
-                return {
-                    'account_number': account_number,
-                    'bank_code': bank_code,
-                    'normalized_bank': normalized_bank,
-                    'full_reference': match.group()
-                }
-        except Exception as e:
-            print(f"DEBUG: Account regex error pattern {i}: {e} with pattern '{pattern}' and text '{particulars}'")
-            continue
+    for pattern in get_compiled_account_reference_patterns():
+        match = pattern.search(particulars_upper)
+        if match:
+            if len(match.groups()) == 1:
+                # Pattern: #11026
+                account_number = match.group(1)
+                bank_code = None
+            else:
+                # Pattern: MDBL#11026 or Midland Bank#11026
+                bank_code = match.group(1).strip()
+                account_number = match.group(2)
+            
+            # Normalize bank codes using the bank configuration module
+            normalized_bank = get_bank_name(bank_code) if bank_code else None
+            
+            return {
+                'account_number': account_number,
+                'bank_code': bank_code,
+                'normalized_bank': normalized_bank,
+                'full_reference': match.group()
+            }
     
     return None
 
 
-def calculate_jaccard_similarity(text1: str, text2: str) -> float:
-    """Calculate Jaccard similarity between two texts."""
-    if not text1 or not text2:
-        return 0.0
-    
-    def preprocess(text: str) -> set:
-        # Convert to lowercase and split into words
-        words = re.findall(r'\b\w+\b', text.lower())
-        # Remove common stop words and short words
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-        words = [word for word in words if len(word) > 2 and word not in stop_words]
-        return set(words)
-    
-    set1 = preprocess(text1)
-    set2 = preprocess(text2)
-    
-    if not set1 and not set2:
+def is_interunit_narration(particulars: str, role: str, scan: Optional[NarrationScan] = None) -> bool:
+    """Check whether a lender/borrower narration carries interunit loan keywords."""
+    if not particulars:
+        return False
+
+    scan = scan or scan_narration(particulars)
+    return bool(scan.mask & INTERUNIT_SIDE_MASKS['lender' if role == 'lender' else 'borrower'])
+
+
+def extract_interunit_account(particulars: str, role: str) -> Optional[Dict[str, str]]:
+    """Extract the full bank account number quoted in an interunit loan narration.
+
+    Lenders usually quote the full 13-16 digit account after the bank name,
+    borrowers the hyphenated 3-10 digit form, so the pattern order depends on role.
+    """
+    if not particulars:
+        return None
+
+    match = None
+    for pattern in INTERUNIT_ACCOUNT_PATTERNS[role]:
+        match = pattern.search(particulars)
+        if match:
+            break
+
+    if not match:
+        return None
+
+    account_full = match.group(2) if len(match.groups()) >= 2 else match.group(1)
+    # Extract last 4-5 digits of the account number
+    last_digits = account_full[-5:] if len(account_full) >= 5 else account_full[-4:]
+    # Look for any 4-5 digit number followed by # as the shortened reference
+    short_ref = SHORT_ACCOUNT_REF_PATTERN.search(particulars)
+
+    return {
+        'account_full': account_full,
+        'last_digits': last_digits,
+        'reference': f"{match.group(1)}-{account_full}",
+        'short_ref': short_ref.group(1) if short_ref else None
+    }
+
+
+JACCARD_STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'})
+
+
+def jaccard_tokens(text: str) -> frozenset:
+    """Preprocess text into the word set used for Jaccard similarity."""
+    if not text:
+        return frozenset()
+    # Convert to lowercase and split into words
+    words = JACCARD_WORD_PATTERN.findall(text.lower())
+    # Remove common stop words and short words
+    return frozenset(word for word in words if len(word) > 2 and word not in JACCARD_STOP_WORDS)
+
+
+def jaccard_similarity_from_tokens(set1: frozenset, set2: frozenset) -> float:
+    """Calculate Jaccard similarity between two preprocessed word sets."""
+    if not set1 or not set2:
         return 0.0
-    
+
     intersection = set1.intersection(set2)
     union = set1.union(set2)
-    
+
     return len(intersection) / len(union) if union else 0.0
 
 
-def extract_final_settlement_details(particulars: str) -> Optional[Dict[str, Any]]:
+def calculate_jaccard_similarity(text1: str, text2: str) -> float:
+    """Calculate Jaccard similarity between two texts."""
+    if not text1 or not text2:
+        return 0.0
+
+    return jaccard_similarity_from_tokens(jaccard_tokens(text1), jaccard_tokens(text2))
+
+
+def find_person_matches(particulars: str, mask: int) -> Tuple[Optional[re.Match], Optional[re.Match]]:
+    """Search the explicit lender/borrower person patterns, each only when its trigger phrases are present."""
+    # 1) Lender pattern: "* Amount paid as Inter Unit Loan * (*-ID: *)"
+    lender_person_match = LENDER_PERSON_PATTERN.search(particulars) if mask & NARRATION_BITS[LENDER_PERSON_TRIGGER] else None
+
+    # 2) Borrower pattern: "Payable to *-ID:* * final settlement*"
+    borrower_person_match = (BORROWER_PERSON_PATTERN.search(particulars)
+                             if mask & BORROWER_PERSON_MASK == BORROWER_PERSON_MASK else None)
+    return lender_person_match, borrower_person_match
+
+
+def extract_final_settlement_details(particulars: str, scan: Optional[NarrationScan] = None) -> Optional[Dict[str, Any]]:
     """Extract final settlement details from particulars."""
     if not particulars:
         return None
     
-    particulars_lower = particulars.lower()
-    
-    # 1) Lender pattern: "* Amount paid as Inter Unit Loan * (*-ID: *)"
-    lender_person_match = re.search(
-        r"\(\s*(?P<name>[^()]+?)\s*-\s*ID\s*[:：]\s*(?P<id>\d+)\s*\)",
-        particulars,
-        flags=re.IGNORECASE,
-    ) if ('amount paid as inter unit loan' in particulars_lower) else None
-    
-    # 2) Borrower pattern: "Payable to *-ID:* * final settlement*"
-    borrower_person_match = re.search(
-        r"payable\s+to\s+(?P<name>[^\r\n\-]+?)\s*-\s*ID\s*[:：]\s*(?P<id>\d+)",
-        particulars,
-        flags=re.IGNORECASE | re.DOTALL,
-    ) if ('payable to' in particulars_lower and 'final settlement' in particulars_lower) else None
+    scan = scan or scan_narration(particulars)
+    lender_person_match, borrower_person_match = find_person_matches(particulars, scan.mask)
     
     # Extract person details
     person_name = None
@@ -223,89 +565,33 @@ def extract_final_settlement_details(particulars: str) -> Optional[Dict[str, Any
     return None
 
 
-def extract_salary_details(particulars: str) -> Optional[Dict[str, Any]]:
+def extract_salary_details(particulars: str, scan: Optional[NarrationScan] = None) -> Optional[Dict[str, Any]]:
     """Extract salary-related details from particulars."""
     if not particulars:
         return None
     
-    particulars_lower = particulars.lower()
-    
-    # Pre-check for the two explicit patterns provided by requirements
-    # 1) Lender pattern: "* Amount paid as Inter Unit Loan * (*-ID: *)"
-    lender_person_match = re.search(
-        r"\(\s*(?P<name>[^()]+?)\s*-\s*ID\s*[:：]\s*(?P<id>\d+)\s*\)",
-        particulars,
-        flags=re.IGNORECASE,
-    ) if ('amount paid as inter unit loan' in particulars_lower) else None
-    
-    # 2) Borrower pattern: "Payable to *-ID:* * final settlement*"
-    borrower_person_match = re.search(
-        r"payable\s+to\s+(?P<name>[^\r\n\-]+?)\s*-\s*ID\s*[:：]\s*(?P<id>\d+)",
-        particulars,
-        flags=re.IGNORECASE | re.DOTALL,
-    ) if ('payable to' in particulars_lower and 'final settlement' in particulars_lower) else None
-    
-    forced_salary = bool(lender_person_match or borrower_person_match)
-    
-    # Primary salary keywords found in actual data
-    primary_salary_keywords = [
-        'salary', 'sal', 'wage', 'payroll', 'remuneration', 'compensation'
-    ]
-    
-    # Secondary keywords (context-dependent)
-    secondary_keywords = [
-        'monthly', 'month', 'january', 'february', 'march', 'april', 'may', 'june',
-        'july', 'august', 'september', 'october', 'november', 'december',
-        'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'
-    ]
+    mask = (scan or scan_narration(particulars)).mask
     
     # Check for primary salary keywords first
-    # Allow additional real-world triggers to qualify as salary-like
-    has_primary_keyword = any(keyword in particulars_lower for keyword in primary_salary_keywords) or (
-        'final settlement' in particulars_lower
-    )
+    # Allow additional real-world triggers ('final settlement') to qualify as salary-like
+    has_primary_keyword = bool(mask & SALARY_PRIMARY_MASK)
     
     if not has_primary_keyword:
         return None
     
-    # Additional validation: must not contain non-salary indicators
-    non_salary_indicators = [
-        'payment for', 'purchase of', 'rent', 'electricity', 'transportation', 'marketing',
-        'maintenance', 'equipment', 'insurance', 'legal', 'consulting', 'training',
-        'travel', 'software', 'security', 'cleaning', 'bank charges', 'interest',
-        'loan repayment', 'tax payment', 'bill payment', 'expenses for', 'fees for',
-        'vendor payment', 'po no', 'work order', 'invoice', 'challan', 'tds deduction',
-        'vds deduction', 'duty', 'taxes', 'port', 'shipping', 'carrying charges',
-        'l/c', 'letter of credit', 'margin', 'collateral', 'acceptance commission',
-        'retirement value', 'principal', 'time loan', 'usance loan'
-    ]
+    # Pre-check for the two explicit patterns provided by requirements
+    lender_person_match, borrower_person_match = find_person_matches(particulars, mask)
+    forced_salary = bool(lender_person_match or borrower_person_match)
     
     # If any non-salary indicator is present, it's not a salary transaction
-    if any(indicator in particulars_lower for indicator in non_salary_indicators) and not forced_salary:
+    if mask & NON_SALARY_MASK and not forced_salary:
         return None
     
+    particulars_lower = particulars.lower()
+    
     # Check if this is a salary-related transaction
     is_salary = has_primary_keyword
     
-    # Extract person
-    # Handle patterns with titles and employee IDs
-    person_patterns = [
-        # Traditional salary patterns
-        r'salary\s+of\s+([A-Za-z\s]+?)(?:\s+for|\s+month|\s+period|$)',
-        r'([A-Za-z\s]+?)\s+salary',
-        r'payroll\s+for\s+([A-Za-z\s]+?)(?:\s+for|\s+month|\s+period|$)',
-        r'([A-Za-z\s]+?)\s+payroll',
-        
-        # Real-world patterns with titles and employee IDs
-        r'\(([A-Za-z]+\.\s+[A-Za-z\s]+?)-ID\s*:\s*\d+\)',  # "(Name-ID : Number)"
-        r'([A-Za-z]+\.\s+[A-Za-z\s]+?)-ID\s*:\s*\d+',  # "Name-ID : Number" (without parentheses)
-        r'payable\s+to\s+([A-Za-z]+\.\s+[A-Za-z\s]+?)-ID\s*:\s*\d+',  # "Payable to Name-ID:Number"
-        r'amount\s+paid\s+to\s+([A-Za-z]+\.\s+[A-Za-z\s]+?)(?:\s*,|\s+for|\s+employee|\s+office|\s+human|\s+resources|\s+administration|\s+final|\s+settlement|\s+employee\s+id|\s*$)',  # "Amount paid to Name"
-        r'([A-Za-z]+\.\s+[A-Za-z\s]+?)(?:\s+for|\s+month|\s+period|\s+employee|\s+id|\s*,|\s*$)',  # General pattern for titles
-        # Additional pattern for names with titles in parentheses
-        r'\(([A-Za-z]+\.\s+[A-Za-z\s]+?)\)',  # "(Name)" - just the name in parentheses
-    ]
-    
     person_name = None
     person_id = None
     person_combined = None
@@ -321,10 +607,10 @@ def extract_salary_details(particulars: str) -> Optional[Dict[str, Any]]:
         person_combined = f"{person_name}-ID : {person_id}"
     
     # If not found, fallback to legacy name extraction heuristics
-    for pattern in person_patterns:
+    for pattern in SALARY_PERSON_PATTERNS:
         if person_combined:
             break
-        match = re.search(pattern, particulars_lower)
+        match = pattern.search(particulars_lower)
         if match:
             person_name = match.group(1).strip()
             break
@@ -343,22 +629,15 @@ def extract_salary_details(particulars: str) -> Optional[Dict[str, Any]]:
                     person_name = name_part
     
     # Extract period (month/year)
-    period_patterns = [
-        r'(\w+\s+\d{4})',  # "January 2024"
-        r'(\d{1,2}/\d{4})',  # "01/2024"
-        r'(\d{4}-\d{2})',  # "2024-01"
-    ]
-    
     period = None
-    for pattern in period_patterns:
-        match = re.search(pattern, particulars)
+    for pattern in SALARY_PERIOD_PATTERNS:
+        match = pattern.search(particulars)
         if match:
             period = match.group(1)
             break
     
     # Extract matched keywords for audit trail
-    all_keywords = primary_salary_keywords + secondary_keywords
-    matched_keywords = [keyword for keyword in all_keywords if keyword in particulars_lower]
+    matched_keywords = [keyword for keyword in SALARY_AUDIT_KEYWORDS if mask & NARRATION_BITS[keyword]]
     
     return {
         'person_name': person_name,
@@ -370,55 +649,71 @@ def extract_salary_details(particulars: str) -> Optional[Dict[str, Any]]:
     }
 
 
-def extract_common_text(text1: str, text2: str) -> Optional[str]:
+def extract_common_text(text1: str, text2: str, min_words: int = 20, max_words: int = 50) -> Optional[str]:
     """Extract common text patterns between two strings using continuous phrase matching.
 
     Focuses on substantial matches (minimum 20 words) to ensure meaningful
     text similarity detection for complex documents like insurance certificates.
+
+    Common phrases are found from the maximal shared token runs
+    (find_common_token_runs) instead of materializing every 20-50 word
+    phrase of both texts, so cost grows with text length rather than
+    with the number of candidate phrases.
     """
     if not text1 or not text2:
         return None
 
-    text1_lower = text1.lower()
-    text2_lower = text2.lower()
-
     # Strategy: Look for continuous phrases (20-50+ words) including numbers/punctuation
-    # Extract phrases from both texts
-    phrases1 = extract_phrases(text1_lower)
-    phrases2 = extract_phrases(text2_lower)
-
-    # Find common phrases
-    common_phrases = phrases1.intersection(phrases2)
+    tokens1 = PHRASE_TOKEN_PATTERN.findall(text1.lower())
+    tokens2 = PHRASE_TOKEN_PATTERN.findall(text2.lower())
 
-    if not common_phrases:
+    runs = find_common_token_runs(tokens1, tokens2, min_words)
+    if not runs:
         return None
 
-    # Sort phrases by length (longest first) and deduplicate overlapping content
-    sorted_phrases = sorted(common_phrases, key=len, reverse=True)
+    # Character length of any window of tokens1 via prefix sums, so candidate
+    # phrases can be ranked without building their strings
+    char_offsets = [0]
+    for token in tokens1:
+        char_offsets.append(char_offsets[-1] + len(token))
+
+    # Every 20-50 word window inside a shared run is a common phrase; keep those
+    # of at least 50 characters, as extract_phrases does
+    candidates = set()
+    for start1, _, run_length in runs:
+        run_end = start1 + run_length
+        for start in range(start1, run_end - min_words + 1):
+            for length in range(min_words, min(max_words, run_end - start) + 1):
+                char_length = char_offsets[start + length] - char_offsets[start] + length - 1
+                if char_length >= 50:
+                    candidates.add((char_length, start, length))
 
-    # Deduplicate: keep only the longest unique phrases (no overlapping content)
+    # Sort phrases by length (longest first) and deduplicate overlapping content
     unique_phrases = []
-    for phrase in sorted_phrases:
+    selected_spans = []
+    for _, start, length in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        end = start + length
+        # A window inside an already selected window is a substring of it
+        if any(selected_start <= start and end <= selected_end for selected_start, selected_end in selected_spans):
+            continue
+
+        phrase = ' '.join(tokens1[start:end])
+        words1 = set(tokens1[start:end])
         # Check if this phrase significantly overlaps with any already selected phrase
         is_significantly_overlapping = False
-        for selected in unique_phrases:
-            # Check for significant overlap (more than 70% similarity)
-            if len(phrase) > 0 and len(selected) > 0:
-                # Calculate overlap percentage
-                if phrase in selected or selected in phrase:
-                    is_significantly_overlapping = True
-                    break
-                # Check for partial overlap by comparing word sets
-                words1 = set(phrase.split())
-                words2 = set(selected.split())
-                if len(words1) > 0 and len(words2) > 0:
-                    overlap_ratio = len(words1.intersection(words2)) / max(len(words1), len(words2))
-                    if overlap_ratio > 0.7:  # More than 70% overlap
-                        is_significantly_overlapping = True
-                        break
+        for selected, words2 in unique_phrases:
+            if phrase in selected or selected in phrase:
+                is_significantly_overlapping = True
+                break
+            # Check for partial overlap by comparing word sets
+            overlap_ratio = len(words1.intersection(words2)) / max(len(words1), len(words2))
+            if overlap_ratio > 0.7:  # More than 70% overlap
+                is_significantly_overlapping = True
+                break
 
         if not is_significantly_overlapping:
-            unique_phrases.append(phrase)
+            unique_phrases.append((phrase, words1))
+            selected_spans.append((start, end))
             # Limit to top 2 unique phrases to keep output focused
             if len(unique_phrases) >= 2:
                 break
@@ -426,10 +721,10 @@ def extract_common_text(text1: str, text2: str) -> Optional[str]:
     if unique_phrases:
         # Return common text with word count in clean format
         result = []
-        for phrase in unique_phrases:
-            word_count = len(phrase.split())
-            # Show up to 50 words, add (CONT...) if longer
+        for phrase, _ in unique_phrases:
             words = phrase.split()
+            word_count = len(words)
+            # Show up to 50 words, add (CONT...) if longer
             if len(words) > 50:
                 display_phrase = ' '.join(words[:50]) + ' (CONT...)'
             else:
@@ -441,6 +736,54 @@ def extract_common_text(text1: str, text2: str) -> Optional[str]:
     return None
 
 
+def find_common_token_runs(tokens1: List[str], tokens2: List[str], min_words: int = 20) -> List[Tuple[int, int, int]]:
+    """Find the maximal runs of identical tokens shared by two token lists.
+
+    Tokens are mapped to integer IDs and every min_words window is keyed by a
+    rolling polynomial hash, so shared windows are found in O(n + m) expected
+    time. Each hit is verified and extended to the full run.
+
+    Returns (start in tokens1, start in tokens2, run length) for every run of
+    at least min_words tokens.
+    """
+    if len(tokens1) < min_words or len(tokens2) < min_words:
+        return []
+
+    token_ids: Dict[str, int] = {}
+    ids1 = [token_ids.setdefault(token, len(token_ids) + 1) for token in tokens1]
+    ids2 = [token_ids.setdefault(token, len(token_ids) + 1) for token in tokens2]
+
+    def window_hashes(ids: List[int]):
+        # Rolling hash of every min_words window: h = sum(id * BASE^(k-1-i))
+        top = pow(ROLLING_HASH_BASE, min_words - 1, MINHASH_PRIME)
+        h = 0
+        for token_id in ids[:min_words]:
+            h = (h * ROLLING_HASH_BASE + token_id) % MINHASH_PRIME
+        yield 0, h
+        for start in range(1, len(ids) - min_words + 1):
+            h = ((h - ids[start - 1] * top) * ROLLING_HASH_BASE + ids[start + min_words - 1]) % MINHASH_PRIME
+            yield start, h
+
+    windows1: Dict[int, List[int]] = {}
+    for start, h in window_hashes(ids1):
+        windows1.setdefault(h, []).append(start)
+
+    runs = []
+    for start2, h in window_hashes(ids2):
+        for start1 in windows1.get(h, ()):
+            # Only report a run from its first shared token
+            if start1 > 0 and start2 > 0 and ids1[start1 - 1] == ids2[start2 - 1]:
+                continue
+            if ids1[start1:start1 + min_words] != ids2[start2:start2 + min_words]:
+                continue
+            length = min_words
+            while (start1 + length < len(ids1) and start2 + length < len(ids2) and
+                   ids1[start1 + length] == ids2[start2 + length]):
+                length += 1
+            runs.append((start1, start2, length))
+    return runs
+
+
 def extract_phrases(text: str, min_words: int = 20, max_words: int = 50) -> set:
     """Extract phrases of 20-50 words from text, including numbers and punctuation.
     
@@ -449,8 +792,7 @@ def extract_phrases(text: str, min_words: int = 20, max_words: int = 50) -> set:
     Minimum 20 words ensures meaningful, substantial matches.
     """
     # Split text into tokens (words, numbers, punctuation)
-    # Enhanced pattern to better capture mixed alphanumeric sequences
-    tokens = re.findall(r'\b\w+\b|\d+(?:\.\d+)?|\d+[/\-]\d+|[A-Za-z0-9]+[/\-][A-Za-z0-9]+|[A-Za-z0-9]+(?:\-[A-Za-z0-9]+)*|[^\w\s]', text)
+    tokens = PHRASE_TOKEN_PATTERN.findall(text)
     phrases = set()
     
     for i in range(len(tokens) - min_words + 1):
@@ -464,385 +806,1790 @@ def extract_phrases(text: str, min_words: int = 20, max_words: int = 50) -> set:
 
 
 
+# MinHash permutations h(x) = (a * x + b) mod MINHASH_PRIME, generated once at import
+_MINHASH_RANDOM = random.Random(20240101)
+MINHASH_PERMUTATIONS = tuple(
+    (_MINHASH_RANDOM.randrange(1, MINHASH_PRIME), _MINHASH_RANDOM.randrange(0, MINHASH_PRIME))
+    for _ in range(256)
+)
 
-def find_matches(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Match transactions using a hybrid approach combining exact and Jaccard similarity matching.
-    
-    Matching Strategy:
-    1. Amount match (Debit == Credit) as base requirement
-    2. Document reference matches (exact matching):
-       - PO numbers (e.g., ABC/PO/123/456)
-       - LC numbers (e.g., L/C-123/456)
-       - Loan IDs (e.g., LD123, ID-456)
-    3. Salary payment matches (hybrid):
-       - Exact match: person name and period
-       - Jaccard similarity: description comparison (threshold: 0.3)
-    4. Common text pattern match (fallback)
-       - Uses Jaccard similarity for general descriptions
-    
-    The hybrid approach ensures:
-    - High accuracy for structured identifiers (PO, LC, Loan ID)
-    - Flexibility for variations in descriptions (Salary, General text)
-    - Complete audit trail in audit_info JSON
+
+def minhash_signature(text: str, num_hashes: int, shingle_size: int = COMMON_TEXT_SHINGLE_SIZE,
+                      min_words: int = 20) -> Optional[Tuple[int, ...]]:
+    """Compute the MinHash signature of a narration's token shingles.
+
+    Uses the same tokenization as extract_phrases. Narrations shorter than
+    min_words tokens cannot share a common phrase, so they get no signature.
     """
-    if not data:
-        print("No data to match")
-        return []
-    
-    lenders = [r for r in data if r.get('Debit') and r['Debit'] > 0]
-    borrowers = [r for r in data if r.get('Credit') and r['Credit'] > 0]
-    
-    matches = []
-    # Track which records have already been matched to prevent duplicates
-    matched_lenders = set()
-    matched_borrowers = set()
-    
-    for lender in lenders:
-        # Skip if this lender is already matched
-        if lender['uid'] in matched_lenders:
+    if not text:
+        return None
+    tokens = PHRASE_TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < min_words:
+        return None
+    if num_hashes > len(MINHASH_PERMUTATIONS):
+        raise ValueError(f"At most {len(MINHASH_PERMUTATIONS)} MinHash permutations are available")
+
+    # blake2b rather than hash(): str hashes are salted per process, which
+    # would make signatures differ between runs and between shard workers
+    shingles = {
+        int.from_bytes(
+            hashlib.blake2b(' '.join(tokens[i:i + shingle_size]).encode('utf-8'), digest_size=8).digest(),
+            'big'
+        ) & MINHASH_PRIME
+        for i in range(len(tokens) - shingle_size + 1)
+    }
+    return tuple(
+        min((a * shingle + b) % MINHASH_PRIME for shingle in shingles)
+        for a, b in MINHASH_PERMUTATIONS[:num_hashes]
+    )
+
+
+def signature_bands(signature: Tuple[int, ...], bands: int, rows: int) -> List[Tuple[int, Tuple[int, ...]]]:
+    """Split a MinHash signature into (band number, band values) LSH keys."""
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(bands)]
+
+
+def build_common_text_lsh(borrowers: List['RecordFeatures'], bands: int = COMMON_TEXT_LSH_BANDS,
+                          rows: int = COMMON_TEXT_LSH_ROWS) -> Dict[Tuple[int, Tuple[int, ...]], List[str]]:
+    """Index borrower MinHash signatures into LSH band buckets of borrower uids.
+
+    Signatures are computed once per borrower.
+    """
+    lsh_index: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+    for borrower in borrowers:
+        signature = minhash_signature(borrower.particulars, bands * rows)
+        if signature is None:
             continue
-            
-        lender_po = extract_po(lender.get('Particulars', ''))
-        lender_lc = extract_lc(lender.get('Particulars', ''))
-        lender_loan_id = extract_loan_id(lender.get('Particulars', ''))
-        lender_account = extract_account_number(lender.get('Particulars', ''))
-        lender_salary = extract_salary_details(lender.get('Particulars', ''))
-        
-
-        
-        for borrower in borrowers:
-            # Skip if this borrower is already matched
-            if borrower['uid'] in matched_borrowers:
-                continue
-                
-            if float(lender['Debit']) == float(borrower['Credit']):
-                borrower_po = extract_po(borrower.get('Particulars', ''))
-                borrower_lc = extract_lc(borrower.get('Particulars', ''))
-                borrower_loan_id = extract_loan_id(borrower.get('Particulars', ''))
-                borrower_account = extract_account_number(borrower.get('Particulars', ''))
-                borrower_salary = extract_salary_details(borrower.get('Particulars', ''))
-                
-                # PO match
-                if lender_po and borrower_po and lender_po == borrower_po:
-                    matches.append({
-                        'lender_uid': lender['uid'],
-                        'borrower_uid': borrower['uid'],
-                        'amount': lender['Debit'],
-                        'match_type': 'PO',
-                        'po': lender_po
-                    })
-                    # Mark both records as matched
-                    matched_lenders.add(lender['uid'])
-                    matched_borrowers.add(borrower['uid'])
-                    break
-                    
-                # Final Settlement match
-                lender_final_settlement = extract_final_settlement_details(lender.get('Particulars', ''))
-                borrower_final_settlement = extract_final_settlement_details(borrower.get('Particulars', ''))
-                
-                if lender_final_settlement and borrower_final_settlement:
-                    # Check if both sides have the same person
-                    if lender_final_settlement['person_name'] == borrower_final_settlement['person_name']:
-                        matches.append({
-                            'lender_uid': lender['uid'],
-                            'borrower_uid': borrower['uid'],
-                            'amount': lender['Debit'],
-                            'match_type': 'FINAL_SETTLEMENT',
-                            'person': lender_final_settlement['person_combined'],
-                            'audit_trail': {
-                                'match_reason': 'Final settlement match',
-                                'lender_person': lender_final_settlement['person_combined'],
-                                'borrower_person': borrower_final_settlement['person_combined'],
-                                'person_name': lender_final_settlement['person_name'],
-                                'person_id': lender_final_settlement['person_id']
-                            }
-                    })
-                    # Mark both records as matched
-                    matched_lenders.add(lender['uid'])
-                    matched_borrowers.add(borrower['uid'])
-                    break
-                    
-                # Salary payment match with both exact and Jaccard matching
-                lender_text = lender.get('Particulars', '')
-                borrower_text = borrower.get('Particulars', '')
-                jaccard_score = calculate_jaccard_similarity(lender_text, borrower_text)
-                
-                if lender_salary and borrower_salary:
-                    # Exact keyword matching
-                    exact_match = (lender_salary['person_name'] == borrower_salary['person_name'] and 
-                                 lender_salary['period'] == borrower_salary['period'] and
-                                 lender_salary['is_salary'] and borrower_salary['is_salary'])
-                    
-                    # Jaccard similarity threshold for salary descriptions
-                    jaccard_threshold = 0.3  # Can be adjusted based on requirements
-                    
-                    if exact_match or jaccard_score >= jaccard_threshold:
-                        # Combine matched keywords and similarity score for audit trail
-                        audit_keywords = {
-                            'lender_keywords': lender_salary['matched_keywords'] if lender_salary else [],
-                            'borrower_keywords': borrower_salary['matched_keywords'] if borrower_salary else [],
-                            'jaccard_score': round(jaccard_score, 3),
-                            'match_method': 'exact' if exact_match else 'jaccard'
-                        }
-                        
-                        matches.append({
-                            'lender_uid': lender['uid'],
-                            'borrower_uid': borrower['uid'],
-                            'amount': lender['Debit'],
-                            'match_type': 'SALARY',
-                            'person': (
-                                lender_salary.get('person_combined')
-                                if lender_salary and lender_salary.get('person_combined')
-                                else lender_salary.get('person_name') if lender_salary else None
-                            ),
-                            'period': lender_salary['period'] if lender_salary else None,
-                            'audit_trail': audit_keywords
-                        })
-                        # Mark both records as matched
-                        matched_lenders.add(lender['uid'])
-                        matched_borrowers.add(borrower['uid'])
-                        break
-
-                
-                # LC match
-                if lender_lc and borrower_lc and normalize_lc_number(lender_lc) == normalize_lc_number(borrower_lc):
-                    matches.append({
-                        'lender_uid': lender['uid'],
-                        'borrower_uid': borrower['uid'],
-                        'amount': lender['Debit'],
-                        'match_type': 'LC',
-                        'lc': lender_lc
-                    })
-                    # Mark both records as matched
-                    matched_lenders.add(lender['uid'])
-                    matched_borrowers.add(borrower['uid'])
-                    break
-                
-                # Interunit Loan match (auto-confirmed, runs after PO and LC)
-                # Two-way cross-reference matching for interunit loan transactions
-                lender_particulars = lender.get('Particulars', '')
-                borrower_particulars = borrower.get('Particulars', '')
-                
-                # Check for interunit loan keywords (more flexible matching)
-                lender_lower = lender_particulars.lower()
-                borrower_lower = borrower_particulars.lower()
-                
-                is_lender_interunit = (
-                    'amount paid as interunit loan' in lender_lower or 
-                    'interunit fund transfer' in lender_lower or
-                    'inter unit fund transfer' in lender_lower or
-                    'interunit loan' in lender_lower
-                )
-                is_borrower_interunit = (
-                    'amount received as interunit loan' in borrower_lower or 
-                    'interunit fund transfer' in borrower_lower or
-                    'inter unit fund transfer' in borrower_lower or
-                    'interunit loan' in borrower_lower
-                )
-                
-                if (is_lender_interunit and is_borrower_interunit):
-                    # Extract account numbers from both narrations using multiple patterns
-                    lender_account_match = None
-                    borrower_account_match = None
-                    
-                    # Pattern 1: For lender - extract full account number after bank name
-                    lender_account_match = re.search(r'([A-Za-z\s-]+[A-Za-z])-?[A-Za-z0-9/-]*(\d{13,16})', lender_particulars)
-                    # Pattern 2: For borrower - extract hyphenated account number
-                    borrower_account_match = re.search(r'([A-Za-z\s-]+[A-Za-z])-?[A-Za-z0-9/-]*(\d{3}-\d{10})', borrower_particulars)
-                    
-                    # Pattern 3: Fallback for any account number format
-                    if not lender_account_match:
-                        lender_account_match = re.search(r'([A-Za-z\s-]+[A-Za-z])-?[A-Za-z0-9/-]*(\d{10,})', lender_particulars)
-                    if not borrower_account_match:
-                        borrower_account_match = re.search(r'([A-Za-z\s-]+[A-Za-z])-?[A-Za-z0-9/-]*(\d{10,})', borrower_particulars)
-                    
-                    # If still not found, try more generic patterns
-                    if not lender_account_match:
-                        # Try to extract from any pattern with 13-16 digits
-                        lender_account_match = re.search(r'(\d{13,16})', lender_particulars)
-                    if not borrower_account_match:
-                        # Try to extract from any pattern with hyphenated account
-                        borrower_account_match = re.search(r'(\d{3}-\d{10})', borrower_particulars)
-                    
-                    if lender_account_match and borrower_account_match:
-                        # Extract last 4-5 digits from both account numbers
-                        if len(lender_account_match.groups()) >= 2:
-                            lender_account_full = lender_account_match.group(2)
-                        else:
-                            lender_account_full = lender_account_match.group(1)
-                        
-                        if len(borrower_account_match.groups()) >= 2:
-                            borrower_account_full = borrower_account_match.group(2)
-                        else:
-                            borrower_account_full = borrower_account_match.group(1)
-                        
-                        lender_last_digits = lender_account_full[-5:] if len(lender_account_full) >= 5 else lender_account_full[-4:]
-                        borrower_last_digits = borrower_account_full[-5:] if len(borrower_account_full) >= 5 else borrower_account_full[-4:]
-                        
-                        # Cross-reference 1: Lender → Borrower
-                        # Look for lender's last digits in borrower's narration
-                        cross_ref_1_found = lender_last_digits in borrower_particulars
-                        
-                        # Cross-reference 2: Borrower → Lender
-                        # Look for borrower's last digits in lender's narration
-                        cross_ref_2_found = borrower_last_digits in lender_particulars
-                        
-                        # Alternative: Look for the shortened references in the narrations
-                        if not cross_ref_1_found:
-                            # Look for any 4-5 digit number followed by # in borrower narration
-                            borrower_short_ref = re.search(r'#(\d{4,5})', borrower_particulars)
-                            if borrower_short_ref:
-                                cross_ref_1_found = borrower_short_ref.group(1) in lender_last_digits
-                        
-                        if not cross_ref_2_found:
-                            # Look for any 4-5 digit number followed by # in lender narration
-                            lender_short_ref = re.search(r'#(\d{4,5})', lender_particulars)
-                            if lender_short_ref:
-                                cross_ref_2_found = lender_short_ref.group(1) in borrower_last_digits
-                        
-                        # Both cross-references must be found
-                        if cross_ref_1_found and cross_ref_2_found:
-                            matches.append({
-                                'lender_uid': lender['uid'],
-                                'borrower_uid': borrower['uid'],
-                                'amount': lender['Debit'],
-                                'match_type': 'INTERUNIT_LOAN',
-                                'lender_account': lender_account_full,
-                                'borrower_account': borrower_account_full,
-                                'lender_last_digits': lender_last_digits,
-                                'borrower_last_digits': borrower_last_digits,
-                                'audit_trail': {
-                                    'lender_reference': f"{lender_account_match.group(1) if len(lender_account_match.groups()) >= 1 else 'Unknown'}-{lender_account_full}",
-                                    'borrower_reference': f"{borrower_account_match.group(1) if len(borrower_account_match.groups()) >= 1 else 'Unknown'}-{borrower_account_full}",
-                                    'match_reason': f"Interunit loan cross-reference match: {lender_last_digits} ↔ {borrower_last_digits}",
-                                    'keywords': {
-                                        'lender_interunit_keywords': ['amount paid as interunit loan', 'interunit fund transfer'],
-                                        'borrower_interunit_keywords': ['amount received as interunit loan', 'interunit fund transfer'],
-                                        'account_patterns': ['generic bank name + account number', 'hyphenated account format'],
-                                        'cross_reference_patterns': ['#\\d{4,5}']
-                                    },
-                                    'validation': {
-                                        'lender_interunit': is_lender_interunit,
-                                        'borrower_interunit': is_borrower_interunit,
-                                        'cross_reference_1': cross_ref_1_found,
-                                        'cross_reference_2': cross_ref_2_found,
-                                        'interunit_loan_transaction': True
-                                    }
-                                }
-                            })
-                            # Mark both records as matched
-                            matched_lenders.add(lender['uid'])
-                            matched_borrowers.add(borrower['uid'])
-                            break
-                    
-                
-                # Loan ID match (redefined condition):
-                # If both narrations contain the Time Loan phrase and share the same Loan ID AFTER the phrase
-                lender_text_full = lender.get('Particulars', '')
-                borrower_text_full = borrower.get('Particulars', '')
-                if has_time_loan_phrase(lender_text_full) and has_time_loan_phrase(borrower_text_full):
-                    lender_after_id = extract_normalized_loan_id_after_time_loan_phrase(lender_text_full)
-                    borrower_after_id = extract_normalized_loan_id_after_time_loan_phrase(borrower_text_full)
-                    if lender_after_id and borrower_after_id and lender_after_id == borrower_after_id:
-                        matches.append({
-                            'lender_uid': lender['uid'],
-                            'borrower_uid': borrower['uid'],
-                            'amount': lender['Debit'],
-                            'match_type': 'LOAN_ID',
-                            'loan_id': lender_after_id,
-                            'audit_trail': {
-                                'match_reason': 'Time Loan phrase + matching Loan ID after phrase',
-                                'phrase_detected': True
-                            }
-                        })
-                        # Mark both records as matched
-                        matched_lenders.add(lender['uid'])
-                        matched_borrowers.add(borrower['uid'])
-                        break
-                
-                # Loan ID match (generic exact token equality)
-                if lender_loan_id and borrower_loan_id and lender_loan_id == borrower_loan_id:
-                    matches.append({
-                        'lender_uid': lender['uid'],
-                        'borrower_uid': borrower['uid'],
-                        'amount': lender['Debit'],
-                        'match_type': 'LOAN_ID',
-                        'loan_id': lender_loan_id
-                    })
-                    # Mark both records as matched
-                    matched_lenders.add(lender['uid'])
-                    matched_borrowers.add(borrower['uid'])
-                    break
-                
-                # Final Settlement match
-                final_settlement_match = extract_final_settlement_details(lender.get('Particulars', ''))
-                if final_settlement_match:
-                    matches.append({
-                        'lender_uid': lender['uid'],
-                        'borrower_uid': borrower['uid'],
-                        'amount': lender['Debit'],
-                        'match_type': 'FINAL_SETTLEMENT',
-                        'person': final_settlement_match['person_combined'],
-                        'audit_trail': {
-                            'match_reason': 'Final settlement match',
-                            'person_name': final_settlement_match['person_name'],
-                            'person_id': final_settlement_match['person_id'],
-                            'is_final_settlement': final_settlement_match['is_final_settlement']
-                        }
-                    })
-                    # Mark both records as matched
-                    matched_lenders.add(lender['uid'])
-                    matched_borrowers.add(borrower['uid'])
-                    break
-                
-                # Manual verification match (lowest priority - requires user verification)
-                # This matches records where debit, credit, and entered_by are exactly the same
-                lender_entered_by = lender.get('entered_by', '')
-                borrower_entered_by = borrower.get('entered_by', '')
-                
-                if (lender_entered_by and borrower_entered_by and 
-                    lender_entered_by == borrower_entered_by):
-                    matches.append({
-                        'lender_uid': lender['uid'],
-                        'borrower_uid': borrower['uid'],
-                        'amount': lender['Debit'],
-                        'match_type': 'MANUAL_VERIFICATION',
-                        'entered_by': lender_entered_by,
-                        'audit_trail': {
-                            'match_reason': 'Exact match on debit, credit, and entered_by fields',
-                            'requires_verification': True
-                        }
-                    })
-                    # Mark both records as matched
-                    matched_lenders.add(lender['uid'])
-                    matched_borrowers.add(borrower['uid'])
-                    break
-                
-                # Common text pattern match (fallback - only if no other matches found)
-                common_text = extract_common_text(
-                    lender.get('Particulars', ''),
-                    borrower.get('Particulars', '')
-                )
-                if common_text and isinstance(common_text, str) and common_text.strip():
-                    # Calculate Jaccard score for the overall texts
-                    text_similarity = calculate_jaccard_similarity(
-                        lender.get('Particulars', ''),
-                        borrower.get('Particulars', '')
-                    )
-                    matches.append({
-                        'lender_uid': lender['uid'],
-                        'borrower_uid': borrower['uid'],
-                        'amount': lender['Debit'],
-                        'match_type': 'COMMON_TEXT',
-                        'common_text': common_text.strip(),
-                        'audit_trail': {
-                            'jaccard_score': round(text_similarity, 3),
-                            'matched_phrase': common_text.strip()  # Store the actual matching phrase
-                        }
-                    })
-                    # Mark both records as matched
-                    matched_lenders.add(lender['uid'])
-                    matched_borrowers.add(borrower['uid'])
-                    break
-    
-    return matches 
+        for band_key in signature_bands(signature, bands, rows):
+            lsh_index.setdefault(band_key, []).append(borrower.uid)
+    return lsh_index
+
+
+def common_text_candidates(lender: 'RecordFeatures', lsh_index: Dict[Tuple[int, Tuple[int, ...]], List[str]],
+                           bands: int = COMMON_TEXT_LSH_BANDS, rows: int = COMMON_TEXT_LSH_ROWS) -> set:
+    """Return the uids of borrowers whose signatures collide with the lender's in any band."""
+    signature = minhash_signature(lender.particulars, bands * rows)
+    if signature is None:
+        return set()
+    candidates = set()
+    for band_key in signature_bands(signature, bands, rows):
+        candidates.update(lsh_index.get(band_key, ()))
+    return candidates
+
+
+# Amounts are matched in integer minor units (paisa). DECIMAL(18,2) values
+# convert exactly, so equality and hashing never depend on float rounding;
+# Decimal only comes back at the JSON / Excel boundary (from_minor_units).
+AMOUNT_SCALE = 100
+
+
+def to_minor_units(amount: Any) -> Optional[int]:
+    """Convert a Debit/Credit value (Decimal, float, int or str) to integer paisa."""
+    if isinstance(amount, str):
+        # Tally text amounts may carry thousands separators, e.g. '1,234.50'
+        amount = amount.replace(',', '').strip()
+    if amount is None or amount == '':
+        return None
+    if isinstance(amount, int):
+        return amount * AMOUNT_SCALE
+    if isinstance(amount, float):
+        if amount != amount:  # NaN from pandas
+            return None
+        # repr is the shortest string that round-trips, so 1234.1 stays 1234.10
+        amount = repr(amount)
+    value = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+    return int((value * AMOUNT_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(units: Optional[int]) -> Optional[Decimal]:
+    """Convert integer paisa back to a two-place Decimal, e.g. 123450 -> Decimal('1234.50')."""
+    if units is None:
+        return None
+    return Decimal(units).scaleb(-2)
+
+
+# Match fields holding integer paisa (one amount or a list of them)
+MATCH_AMOUNT_FIELDS = ('amount', 'borrower_amount', 'amount_difference', 'lender_amounts', 'borrower_amounts')
+
+
+def match_with_decimal_amounts(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a match with its paisa fields (MATCH_AMOUNT_FIELDS) as two-place Decimals, for JSON responses."""
+    shown = dict(match)
+    for field in MATCH_AMOUNT_FIELDS:
+        value = shown.get(field)
+        if isinstance(value, list):
+            shown[field] = [from_minor_units(units) for units in value]
+        elif value is not None:
+            shown[field] = from_minor_units(value)
+    return shown
+
+
+class RecordFeatures(NamedTuple):
+    """Match features of one transaction, extracted once before pairwise matching.
+
+    Every rule in the cascade compares two of these instead of re-parsing
+    the narrations, so regex cost scales with records rather than pairs.
+    amount is the Debit (lender) or Credit (borrower) in integer paisa.
+    """
+    uid: str
+    amount: Optional[int]
+    particulars: str
+    entered_by: Optional[str]
+    po: Optional[str]
+    lc: Optional[str]
+    normalized_lc: Optional[str]
+    loan_id: Optional[str]
+    has_time_loan_phrase: bool
+    time_loan_id: Optional[str]
+    final_settlement: Optional[Dict[str, Any]]
+    salary: Optional[Dict[str, Any]]
+    is_interunit: bool
+    interunit_account: Optional[Dict[str, str]]
+    jaccard_tokens: frozenset
+    date: Any
+
+
+def extract_record_features(record: Dict[str, Any], role: str,
+                            references: Optional[Dict[str, Any]] = None) -> RecordFeatures:
+    """Build the feature record for a lender ('Debit') or borrower ('Credit') transaction.
+
+    references optionally passes the row's REFERENCE_COLUMNS already
+    extracted in a batch (extract_reference_columns).
+    """
+    particulars = record.get('Particulars') or ''
+    scan = scan_narration(particulars)
+    if references is None:
+        lc = extract_lc(particulars, scan)
+        time_loan = has_time_loan_phrase(particulars, scan)
+        references = {
+            'po': extract_po(particulars, scan),
+            'lc': lc,
+            'normalized_lc': normalize_lc_number(lc) if lc else None,
+            'loan_id': extract_loan_id(particulars, scan),
+            'has_time_loan_phrase': time_loan,
+            'time_loan_id': extract_normalized_loan_id_after_time_loan_phrase(particulars) if time_loan else None,
+        }
+    is_interunit = is_interunit_narration(particulars, role, scan)
+
+    return RecordFeatures(
+        uid=record['uid'],
+        amount=to_minor_units(record['Debit'] if role == 'lender' else record['Credit']),
+        particulars=particulars,
+        entered_by=record.get('entered_by', ''),
+        po=references['po'],
+        lc=references['lc'],
+        normalized_lc=references['normalized_lc'],
+        loan_id=references['loan_id'],
+        has_time_loan_phrase=bool(references['has_time_loan_phrase']),
+        time_loan_id=references['time_loan_id'],
+        final_settlement=extract_final_settlement_details(particulars, scan),
+        salary=extract_salary_details(particulars, scan),
+        is_interunit=is_interunit,
+        interunit_account=extract_interunit_account(particulars, role) if is_interunit else None,
+        jaccard_tokens=jaccard_tokens(particulars),
+        date=record.get('Date')
+    )
+
+
+# Version of the narration features persisted on tally_data. Bump it whenever
+# an extractor changes so stale rows are re-extracted (and re-backfilled).
+MATCH_FEATURE_VERSION = 1
+
+# Version of the matching rules themselves. Bump it whenever a pass changes
+# what find_matches returns for the same input, so results recorded under
+# the old rules (see rule_set_version) are not reused.
+MATCH_RULES_VERSION = 2
+
+# Row columns the feature extraction reads
+FEATURE_INPUT_COLUMNS = ('uid', 'Debit', 'Credit', 'Particulars', 'entered_by', 'Date')
+
+# Indexed key columns written at ingest next to the full match_features JSON
+FEATURE_COLUMNS = (
+    'feat_po', 'feat_lc', 'feat_lc_norm', 'feat_loan_id', 'feat_time_loan_id',
+    'feat_account_digits', 'feat_person_name', 'feat_person_id', 'feat_salary_period',
+    'match_features', 'feature_version'
+)
+
+# RecordFeatures fields carried in the match_features JSON; the rest come from
+# the row itself (uid, amount, particulars, entered_by, date) or are cheap to
+# rebuild (jaccard_tokens)
+_STORED_FEATURE_FIELDS = (
+    'po', 'lc', 'normalized_lc', 'loan_id', 'has_time_loan_phrase', 'time_loan_id',
+    'final_settlement', 'salary', 'is_interunit', 'interunit_account'
+)
+
+
+def record_role(record: Dict[str, Any]) -> str:
+    """The matching role of a row: 'lender' for Debit > 0, otherwise 'borrower'.
+
+    Debit may still be the parser's string form at ingest.
+    """
+    debit = to_minor_units(record.get('Debit'))
+    return 'lender' if debit and debit > 0 else 'borrower'
+
+
+def compute_feature_columns(record: Dict[str, Any], references: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Extract a row's match features once, as tally_data column values."""
+    role = record_role(record)
+    features = extract_record_features(record, role, references)
+    person = features.final_settlement or features.salary or {}
+
+    stored = {field: getattr(features, field) for field in _STORED_FEATURE_FIELDS}
+    stored['role'] = role
+    return {
+        'feat_po': features.po,
+        'feat_lc': features.lc,
+        'feat_lc_norm': features.normalized_lc,
+        'feat_loan_id': features.loan_id,
+        'feat_time_loan_id': features.time_loan_id,
+        'feat_account_digits': features.interunit_account['last_digits'] if features.interunit_account else None,
+        'feat_person_name': features.final_settlement['person_name'] if features.final_settlement else None,
+        'feat_person_id': person.get('person_id'),
+        'feat_salary_period': features.salary['period'] if features.salary else None,
+        'match_features': json.dumps(stored),
+        'feature_version': MATCH_FEATURE_VERSION
+    }
+
+
+def add_feature_columns(df):
+    """Add the persisted feature columns to a parsed Tally DataFrame before it is saved.
+
+    The reference columns are extracted for the whole Particulars column at
+    once; the remaining features per row.
+    """
+    particulars = df['Particulars'] if 'Particulars' in df.columns else pd.Series('', index=df.index)
+    references = reference_rows(extract_reference_columns(particulars))
+    # Only the columns the extractors read, so to_dict doesn't box the rest
+    records = df[[column for column in FEATURE_INPUT_COLUMNS if column in df.columns]].to_dict('records')
+    columns = [compute_feature_columns(record, row_references)
+               for record, row_references in zip(records, references)]
+    for column in FEATURE_COLUMNS:
+        df[column] = [values[column] for values in columns]
+    return df
+
+
+def has_stored_features(record: Dict[str, Any]) -> bool:
+    """Whether a row carries match_features of the current MATCH_FEATURE_VERSION."""
+    return bool(record.get('match_features')) and record.get('feature_version') == MATCH_FEATURE_VERSION
+
+
+def load_record_features(record: Dict[str, Any], role: str,
+                         references: Optional[Dict[str, Any]] = None) -> RecordFeatures:
+    """Build RecordFeatures from the row's stored match_features, re-extracting only when needed.
+
+    Falls back to extract_record_features (with references, if given) for
+    rows without stored features, with an older feature_version, or stored
+    for the other role.
+    """
+    if not has_stored_features(record):
+        return extract_record_features(record, role, references)
+    stored = record['match_features']
+    if isinstance(stored, str):
+        stored = json.loads(stored)
+    if stored.get('role') != role:
+        return extract_record_features(record, role, references)
+
+    particulars = record.get('Particulars') or ''
+    return RecordFeatures(
+        uid=record['uid'],
+        amount=to_minor_units(record['Debit'] if role == 'lender' else record['Credit']),
+        particulars=particulars,
+        entered_by=record.get('entered_by', ''),
+        jaccard_tokens=jaccard_tokens(particulars),
+        date=record.get('Date'),
+        **{field: stored.get(field) for field in _STORED_FEATURE_FIELDS}
+    )
+
+
+def load_features(records: List[Dict[str, Any]], role: str) -> List[RecordFeatures]:
+    """load_record_features over many rows, batch-extracting the reference columns of rows without stored features."""
+    pending = [position for position, record in enumerate(records) if not has_stored_features(record)]
+    references = {}
+    if pending:
+        particulars = pd.Series([records[position].get('Particulars') or '' for position in pending], dtype=object)
+        references = dict(zip(pending, reference_rows(extract_reference_columns(particulars))))
+    return [load_record_features(record, role, references.get(position)) for position, record in enumerate(records)]
+
+
+def bucket_by_amount(records: List[Any], amount_field: str) -> Dict[int, List[Any]]:
+    """Group records by exact amount in paisa, preserving their original order within each bucket.
+
+    Used as a hash-join on amount so a lender is only compared with
+    borrowers that can pass the Debit == Credit requirement. Works on raw
+    record dicts (amount_field='Debit' / 'Credit', converted here) or on
+    RecordFeatures (amount_field='amount', already in paisa).
+    """
+    buckets: Dict[int, List[Any]] = {}
+    for record in records:
+        if isinstance(record, dict):
+            amount = to_minor_units(record[amount_field])
+        else:
+            amount = getattr(record, amount_field)
+        buckets.setdefault(amount, []).append(record)
+    return buckets
+
+
+def date_ordinal(value: Any) -> Optional[int]:
+    """Day number of a transaction date (date, datetime or ISO string), or None when missing/unparseable."""
+    if value is None:
+        return None
+    if not hasattr(value, 'toordinal'):
+        try:
+            value = datetime.date.fromisoformat(str(value)[:10])
+        except ValueError:
+            return None
+    return value.toordinal()
+
+
+def within_date_window(lender: RecordFeatures, borrower: RecordFeatures, window: Optional[int]) -> bool:
+    """Whether two records' Dates are at most window days apart; undated records always pass."""
+    if window is None:
+        return True
+    lender_day = date_ordinal(lender.date)
+    borrower_day = date_ordinal(borrower.date)
+    if lender_day is None or borrower_day is None:
+        return True
+    return abs(lender_day - borrower_day) <= window
+
+
+def build_date_index(records: List[RecordFeatures]) -> Tuple[List[int], List[Tuple[int, int, RecordFeatures]],
+                                                            List[Tuple[int, RecordFeatures]]]:
+    """Sort one amount bucket by date for window lookups.
+
+    Returns (day numbers, (day, position, record) entries in day order,
+    undated (position, record) entries); position is the record's place in
+    the bucket so candidates can be handed back in their original order.
+    """
+    dated = []
+    undated = []
+    for position, record in enumerate(records):
+        day = date_ordinal(record.date)
+        if day is None:
+            undated.append((position, record))
+        else:
+            dated.append((day, position, record))
+    dated.sort(key=lambda entry: (entry[0], entry[1]))
+    return [entry[0] for entry in dated], dated, undated
+
+
+def date_window_candidates(date_index, lender: RecordFeatures, window: int) -> List[RecordFeatures]:
+    """Records of a date-indexed bucket within window days of the lender, in original bucket order."""
+    days, dated, undated = date_index
+    lender_day = date_ordinal(lender.date)
+    if lender_day is None:
+        entries = [(position, record) for _, position, record in dated] + undated
+    else:
+        low = bisect.bisect_left(days, lender_day - window)
+        high = bisect.bisect_right(days, lender_day + window)
+        entries = [(position, record) for _, position, record in dated[low:high]] + undated
+    entries.sort(key=lambda entry: entry[0])
+    return [record for _, record in entries]
+
+
+def date_window_for(pass_name: str) -> Optional[int]:
+    """Configured date window in days for a pass (TOLERANCE_ passes share their rule's), or None."""
+    name = pass_name[len('TOLERANCE_'):] if pass_name.startswith('TOLERANCE_') else pass_name
+    if name in MATCH_DATE_WINDOW_BY_RULE:
+        return MATCH_DATE_WINDOW_BY_RULE[name]
+    return MATCH_DATE_WINDOW_DAYS
+
+
+# ---------------------------------------------------------------------------
+# Pairwise rules. Each takes the lender and borrower features of a same-amount
+# pair and returns the rule-specific match fields, or None if the rule fails.
+# ---------------------------------------------------------------------------
+
+def match_po(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """PO match: identical PO number on both sides."""
+    if lender.po and borrower.po and lender.po == borrower.po:
+        return {
+            'match_type': 'PO',
+            'po': lender.po
+        }
+    return None
+
+
+def match_final_settlement_person(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """Final Settlement match: both sides name the same person."""
+    lender_fs = lender.final_settlement
+    borrower_fs = borrower.final_settlement
+    if lender_fs and borrower_fs and lender_fs['person_name'] == borrower_fs['person_name']:
+        return {
+            'match_type': 'FINAL_SETTLEMENT',
+            'person': lender_fs['person_combined'],
+            'audit_trail': {
+                'match_reason': 'Final settlement match',
+                'lender_person': lender_fs['person_combined'],
+                'borrower_person': borrower_fs['person_combined'],
+                'person_name': lender_fs['person_name'],
+                'person_id': lender_fs['person_id']
+            }
+        }
+    return None
+
+
+def match_salary(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """Salary payment match with both exact and Jaccard matching."""
+    lender_salary = lender.salary
+    borrower_salary = borrower.salary
+    if not (lender_salary and borrower_salary):
+        return None
+
+    jaccard_score = jaccard_similarity_from_tokens(lender.jaccard_tokens, borrower.jaccard_tokens)
+
+    # Exact keyword matching
+    exact_match = (lender_salary['person_name'] == borrower_salary['person_name'] and
+                   lender_salary['period'] == borrower_salary['period'] and
+                   lender_salary['is_salary'] and borrower_salary['is_salary'])
+
+    # Jaccard similarity threshold for salary descriptions
+    jaccard_threshold = 0.3  # Can be adjusted based on requirements
+
+    if not (exact_match or jaccard_score >= jaccard_threshold):
+        return None
+
+    return {
+        'match_type': 'SALARY',
+        'person': lender_salary.get('person_combined') or lender_salary.get('person_name'),
+        'period': lender_salary['period'],
+        'audit_trail': {
+            'lender_keywords': lender_salary['matched_keywords'],
+            'borrower_keywords': borrower_salary['matched_keywords'],
+            'jaccard_score': round(jaccard_score, 3),
+            'match_method': 'exact' if exact_match else 'jaccard'
+        }
+    }
+
+
+def match_lc(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """LC match: same LC number after normalizing L/C and LC prefixes."""
+    if lender.normalized_lc and borrower.normalized_lc and lender.normalized_lc == borrower.normalized_lc:
+        return {
+            'match_type': 'LC',
+            'lc': lender.lc
+        }
+    return None
+
+
+def match_interunit_loan(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """Interunit Loan match: two-way cross-reference of account digits between narrations."""
+    if not (lender.is_interunit and borrower.is_interunit):
+        return None
+
+    lender_account = lender.interunit_account
+    borrower_account = borrower.interunit_account
+    if not (lender_account and borrower_account):
+        return None
+
+    lender_last_digits = lender_account['last_digits']
+    borrower_last_digits = borrower_account['last_digits']
+
+    # Cross-reference 1: Lender → Borrower
+    # Look for lender's last digits in borrower's narration
+    cross_ref_1_found = lender_last_digits in borrower.particulars
+    # Cross-reference 2: Borrower → Lender
+    # Look for borrower's last digits in lender's narration
+    cross_ref_2_found = borrower_last_digits in lender.particulars
+
+    # Alternative: Look for the shortened #NNNN references in the narrations
+    if not cross_ref_1_found and borrower_account['short_ref']:
+        cross_ref_1_found = borrower_account['short_ref'] in lender_last_digits
+    if not cross_ref_2_found and lender_account['short_ref']:
+        cross_ref_2_found = lender_account['short_ref'] in borrower_last_digits
+
+    # Both cross-references must be found
+    if not (cross_ref_1_found and cross_ref_2_found):
+        return None
+
+    return {
+        'match_type': 'INTERUNIT_LOAN',
+        'lender_account': lender_account['account_full'],
+        'borrower_account': borrower_account['account_full'],
+        'lender_last_digits': lender_last_digits,
+        'borrower_last_digits': borrower_last_digits,
+        'audit_trail': {
+            'lender_reference': lender_account['reference'],
+            'borrower_reference': borrower_account['reference'],
+            'match_reason': f"Interunit loan cross-reference match: {lender_last_digits} ↔ {borrower_last_digits}",
+            'keywords': {
+                'lender_interunit_keywords': ['amount paid as interunit loan', 'interunit fund transfer'],
+                'borrower_interunit_keywords': ['amount received as interunit loan', 'interunit fund transfer'],
+                'account_patterns': ['generic bank name + account number', 'hyphenated account format'],
+                'cross_reference_patterns': ['#\\d{4,5}']
+            },
+            'validation': {
+                'lender_interunit': True,
+                'borrower_interunit': True,
+                'cross_reference_1': cross_ref_1_found,
+                'cross_reference_2': cross_ref_2_found,
+                'interunit_loan_transaction': True
+            }
+        }
+    }
+
+
+def match_time_loan_id(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """Loan ID match: both narrations contain the Time Loan phrase and share the Loan ID after it."""
+    if (lender.has_time_loan_phrase and borrower.has_time_loan_phrase and
+            lender.time_loan_id and lender.time_loan_id == borrower.time_loan_id):
+        return {
+            'match_type': 'LOAN_ID',
+            'loan_id': lender.time_loan_id,
+            'audit_trail': {
+                'match_reason': 'Time Loan phrase + matching Loan ID after phrase',
+                'phrase_detected': True
+            }
+        }
+    return None
+
+
+def match_loan_id(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """Loan ID match: generic exact token equality."""
+    if lender.loan_id and borrower.loan_id and lender.loan_id == borrower.loan_id:
+        return {
+            'match_type': 'LOAN_ID',
+            'loan_id': lender.loan_id
+        }
+    return None
+
+
+def match_final_settlement(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """Final Settlement match: lender narration is a final settlement payment."""
+    final_settlement_match = lender.final_settlement
+    if final_settlement_match:
+        return {
+            'match_type': 'FINAL_SETTLEMENT',
+            'person': final_settlement_match['person_combined'],
+            'audit_trail': {
+                'match_reason': 'Final settlement match',
+                'person_name': final_settlement_match['person_name'],
+                'person_id': final_settlement_match['person_id'],
+                'is_final_settlement': final_settlement_match['is_final_settlement']
+            }
+        }
+    return None
+
+
+def match_manual_verification(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """Manual verification match (lowest priority - requires user verification).
+
+    Matches records where debit, credit, and entered_by are exactly the same.
+    """
+    if lender.entered_by and borrower.entered_by and lender.entered_by == borrower.entered_by:
+        return {
+            'match_type': 'MANUAL_VERIFICATION',
+            'entered_by': lender.entered_by,
+            'audit_trail': {
+                'match_reason': 'Exact match on debit, credit, and entered_by fields',
+                'requires_verification': True
+            }
+        }
+    return None
+
+
+def match_common_text(lender: RecordFeatures, borrower: RecordFeatures) -> Optional[Dict[str, Any]]:
+    """Common text pattern match (fallback - only if no other matches found)."""
+    common_text = extract_common_text(lender.particulars, borrower.particulars)
+    if not (common_text and common_text.strip()):
+        return None
+
+    # Calculate Jaccard score for the overall texts
+    text_similarity = jaccard_similarity_from_tokens(lender.jaccard_tokens, borrower.jaccard_tokens)
+    return {
+        'match_type': 'COMMON_TEXT',
+        'common_text': common_text.strip(),
+        'audit_trail': {
+            'jaccard_score': round(text_similarity, 3),
+            'matched_phrase': common_text.strip()  # Store the actual matching phrase
+        }
+    }
+
+
+# Rules strongest first (the order of MATCH_PASSES) - the first rule that
+# fires wins the pair
+MATCH_RULES = [
+    match_po,
+    match_final_settlement_person,
+    match_lc,
+    match_time_loan_id,
+    match_loan_id,
+    match_salary,
+    match_interunit_loan,
+    match_final_settlement,
+    match_manual_verification,
+    match_common_text,
+]
+
+# Rule strength for assignment scoring: the strongest rule scores highest and
+# adjacent rules differ by 1, more than the Jaccard and date terms can add
+RULE_STRENGTH = {rule: len(MATCH_RULES) - position for position, rule in enumerate(MATCH_RULES)}
+MATCH_SCORE_JACCARD_WEIGHT = 0.5
+MATCH_SCORE_DATE_WEIGHT = 0.5
+
+
+def _final_settlement_person_key(features: RecordFeatures) -> Optional[str]:
+    return features.final_settlement['person_name'] if features.final_settlement else None
+
+
+def build_match(lender: RecordFeatures, borrower: RecordFeatures, details: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the pair identity and amount (paisa) with rule-specific match fields."""
+    match = {
+        'lender_uid': lender.uid,
+        'borrower_uid': borrower.uid,
+        'amount': lender.amount
+    }
+    match.update(details)
+    return match
+
+
+def evaluate_pair(lender: RecordFeatures, borrower: RecordFeatures,
+                  rules: Optional[List] = None) -> Optional[Dict[str, Any]]:
+    """Run the rule cascade on a same-amount pair and return the first match, if any."""
+    for rule in (MATCH_RULES if rules is None else rules):
+        details = rule(lender, borrower)
+        if details:
+            return build_match(lender, borrower, details)
+    return None
+
+
+def take_reference_candidate(index: Dict[Tuple[str, int], deque], key: Tuple[str, int],
+                             matched_borrowers: set) -> Optional[RecordFeatures]:
+    """Return the first still-unmatched borrower under an index key.
+
+    Borrowers matched since they were indexed are dropped from the front of
+    the posting list as they are met, so repeated lookups stay O(1) amortized.
+    """
+    postings = index.get(key)
+    while postings:
+        if postings[0].uid not in matched_borrowers:
+            return postings[0]
+        postings.popleft()
+    return None
+
+
+def run_index_pass(lenders: List[RecordFeatures], borrowers: List[RecordFeatures], rule: Callable,
+                   key_func: Callable[[RecordFeatures], Optional[str]],
+                   window: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Exact-key pass: pair lenders with borrowers sharing a (key, amount) via an inverted index.
+
+    Lenders are visited in order and take the first unmatched borrower with
+    the same key and amount (and within the date window, if any), so results
+    follow the original record order.
+    """
+    index: Dict[Tuple[str, int], deque] = {}
+    for borrower in borrowers:
+        key = key_func(borrower)
+        if key is not None:
+            index.setdefault((key, borrower.amount), deque()).append(borrower)
+
+    # With a date window each posting list is kept sorted by date instead
+    date_indexes = ({index_key: build_date_index(list(postings)) for index_key, postings in index.items()}
+                    if window is not None else None)
+
+    matched_borrowers = set()
+    matches = []
+    for lender in lenders:
+        key = key_func(lender)
+        if key is None:
+            continue
+        if date_indexes is None:
+            borrower = take_reference_candidate(index, (key, lender.amount), matched_borrowers)
+        else:
+            date_index = date_indexes.get((key, lender.amount))
+            borrower = next((candidate for candidate in date_window_candidates(date_index, lender, window)
+                             if candidate.uid not in matched_borrowers), None) if date_index else None
+        if borrower is None:
+            continue
+        details = rule(lender, borrower)
+        if details:
+            matches.append(build_match(lender, borrower, details))
+            matched_borrowers.add(borrower.uid)
+    return matches
+
+
+def run_bucket_pass(lenders: List[RecordFeatures], borrowers: List[RecordFeatures], rule: Callable,
+                    lender_filter: Optional[Callable[[RecordFeatures], Any]] = None,
+                    borrower_filter: Optional[Callable[[RecordFeatures], Any]] = None,
+                    window: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Pairwise pass: try the rule on same-amount pairs of eligible records.
+
+    The filters drop records the rule can never fire on before any pair is
+    examined; each lender takes the first unmatched borrower the rule accepts.
+    With a date window only the bucket's borrowers within window days of the
+    lender are tried.
+    """
+    if borrower_filter is not None:
+        borrowers = [borrower for borrower in borrowers if borrower_filter(borrower)]
+    borrowers_by_amount = bucket_by_amount(borrowers, 'amount')
+    date_indexes = ({amount: build_date_index(bucket) for amount, bucket in borrowers_by_amount.items()}
+                    if window is not None else None)
+
+    matched_borrowers = set()
+    matches = []
+    for lender in lenders:
+        if lender_filter is not None and not lender_filter(lender):
+            continue
+        if date_indexes is None:
+            candidates = borrowers_by_amount.get(lender.amount, ())
+        elif lender.amount in date_indexes:
+            candidates = date_window_candidates(date_indexes[lender.amount], lender, window)
+        else:
+            continue
+        for borrower in candidates:
+            if borrower.uid in matched_borrowers:
+                continue
+            details = rule(lender, borrower)
+            if details:
+                matches.append(build_match(lender, borrower, details))
+                matched_borrowers.add(borrower.uid)
+                break
+    return matches
+
+
+def run_common_text_pass(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                         rule: Callable = match_common_text, window: Optional[int] = None) -> List[Dict[str, Any]]:
+    """COMMON_TEXT pass: same-amount pairs, gated by the MinHash/LSH candidate filter when enabled.
+
+    With a date window only borrowers within window days of the lender are tried.
+    """
+    borrowers_by_amount = bucket_by_amount(borrowers, 'amount')
+    date_indexes = ({amount: build_date_index(bucket) for amount, bucket in borrowers_by_amount.items()}
+                    if window is not None else None)
+    lsh_index = build_common_text_lsh(borrowers) if COMMON_TEXT_LSH_ENABLED else None
+
+    matched_borrowers = set()
+    matches = []
+    for lender in lenders:
+        candidates = borrowers_by_amount.get(lender.amount)
+        if not candidates:
+            continue
+        if date_indexes is not None:
+            candidates = date_window_candidates(date_indexes[lender.amount], lender, window)
+        common_text_uids = common_text_candidates(lender, lsh_index) if lsh_index is not None else None
+        for borrower in candidates:
+            if borrower.uid in matched_borrowers:
+                continue
+            if common_text_uids is not None and borrower.uid not in common_text_uids:
+                continue
+            details = rule(lender, borrower)
+            if details:
+                matches.append(build_match(lender, borrower, details))
+                matched_borrowers.add(borrower.uid)
+                break
+    return matches
+
+
+def _is_interunit_with_account(features: RecordFeatures) -> Any:
+    return features.is_interunit and features.interunit_account
+
+
+# Match passes, strongest first, as (name, strategy, rule). A strategy takes the
+# still-unmatched lenders and borrowers plus the rule and returns its matches;
+# matched records are removed before the next pass. Exact-key rules resolve by
+# index lookup, the rest pairwise within amount buckets.
+MATCH_PASSES = [
+    ('PO', partial(run_index_pass, key_func=lambda features: features.po), match_po),
+    ('FINAL_SETTLEMENT_PERSON', partial(run_index_pass, key_func=_final_settlement_person_key),
+     match_final_settlement_person),
+    ('LC', partial(run_index_pass, key_func=lambda features: features.normalized_lc), match_lc),
+    ('TIME_LOAN_ID', partial(run_index_pass, key_func=lambda features: features.time_loan_id), match_time_loan_id),
+    ('LOAN_ID', partial(run_index_pass, key_func=lambda features: features.loan_id), match_loan_id),
+    ('SALARY', partial(run_bucket_pass,
+                       lender_filter=lambda features: features.salary,
+                       borrower_filter=lambda features: features.salary), match_salary),
+    ('INTERUNIT_LOAN', partial(run_bucket_pass,
+                               lender_filter=_is_interunit_with_account,
+                               borrower_filter=_is_interunit_with_account), match_interunit_loan),
+    ('FINAL_SETTLEMENT', partial(run_bucket_pass, lender_filter=lambda features: features.final_settlement),
+     match_final_settlement),
+    ('MANUAL_VERIFICATION', partial(run_index_pass, key_func=lambda features: features.entered_by or None),
+     match_manual_verification),
+    ('COMMON_TEXT', run_common_text_pass, match_common_text),
+]
+
+
+# Pass name of each rule, for per-rule settings keyed by pass name
+RULE_PASS_NAMES = {rule: name for name, _, rule in MATCH_PASSES}
+
+
+class MatchStats:
+    """Optional instrumentation for find_matches: candidate counts, per-rule timing and hits.
+
+    Pass an instance as find_matches(..., stats=stats) to fill it; nothing is
+    measured when stats is None. Per rule it records the pairs offered to the
+    pass (lenders x borrowers), the pairs among them with equal amounts, the
+    rule evaluations actually run after index / bucket / LSH pruning, the
+    matches made and the time spent. new_records counts the records new
+    since the watermarks of an incremental run (None otherwise); 0 means
+    nothing was uploaded since the last run, so nothing was matched.
+    """
+
+    def __init__(self):
+        self.lenders = 0
+        self.borrowers = 0
+        self.matches = 0
+        self.new_records: Optional[int] = None
+        self.pairs_examined = 0
+        self.pairs_amount_passed = 0
+        self.rule_evaluations = 0
+        self.extraction_time = 0.0
+        self.matching_time = 0.0
+        self.rules: Dict[str, Dict[str, Any]] = {}
+        # Reconcile phases outside find_matches (load, sql_pushdown, write), filled by the caller
+        self.phases: Dict[str, float] = {}
+
+    def record_phase(self, name: str, seconds: float) -> None:
+        """Add time spent in a reconcile phase outside find_matches."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def record_rule(self, name: str, seconds: float, pairs_examined: int,
+                    pairs_amount_passed: int, evaluations: int, hits: int) -> None:
+        """Add one pass (or part of one) to the totals of a rule."""
+        rule_stats = self.rules.setdefault(name, {
+            'time': 0.0, 'pairs_examined': 0, 'pairs_amount_passed': 0, 'evaluations': 0, 'hits': 0
+        })
+        rule_stats['time'] += seconds
+        rule_stats['pairs_examined'] += pairs_examined
+        rule_stats['pairs_amount_passed'] += pairs_amount_passed
+        rule_stats['evaluations'] += evaluations
+        rule_stats['hits'] += hits
+        self.pairs_examined += pairs_examined
+        self.pairs_amount_passed += pairs_amount_passed
+        self.rule_evaluations += evaluations
+
+    def merge(self, other: 'MatchStats') -> None:
+        """Fold in the stats of another run, e.g. one shard of a sharded reconcile."""
+        self.lenders += other.lenders
+        self.borrowers += other.borrowers
+        self.matches += other.matches
+        if other.new_records is not None:
+            self.new_records = (self.new_records or 0) + other.new_records
+        self.extraction_time += other.extraction_time
+        self.matching_time += other.matching_time
+        for name, seconds in other.phases.items():
+            self.record_phase(name, seconds)
+        for name, rule_stats in other.rules.items():
+            self.record_rule(name, rule_stats['time'], rule_stats['pairs_examined'],
+                             rule_stats['pairs_amount_passed'], rule_stats['evaluations'], rule_stats['hits'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready summary, times in seconds, rules in pass order."""
+        return {
+            'lenders': self.lenders,
+            'borrowers': self.borrowers,
+            'matches': self.matches,
+            'new_records': self.new_records,
+            'pairs_examined': self.pairs_examined,
+            'pairs_amount_passed': self.pairs_amount_passed,
+            'rule_evaluations': self.rule_evaluations,
+            'extraction_time': round(self.extraction_time, 4),
+            'matching_time': round(self.matching_time, 4),
+            'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            'rules': {
+                name: dict(rule_stats, time=round(rule_stats['time'], 4))
+                for name, rule_stats in self.rules.items()
+            }
+        }
+
+
+def same_amount_pairs(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                      window: Optional[int] = None) -> int:
+    """Number of lender/borrower pairs that pass the Debit == Credit requirement (and the date window, if any)."""
+    if window is not None:
+        date_indexes = {amount: build_date_index(bucket)
+                        for amount, bucket in bucket_by_amount(borrowers, 'amount').items()}
+        return sum(len(date_window_candidates(date_indexes[lender.amount], lender, window))
+                   for lender in lenders if lender.amount in date_indexes)
+    borrower_counts: Dict[int, int] = {}
+    for borrower in borrowers:
+        borrower_counts[borrower.amount] = borrower_counts.get(borrower.amount, 0) + 1
+    return sum(borrower_counts.get(lender.amount, 0) for lender in lenders)
+
+
+# Passes whose cost grows with candidate pairs (Jaccard / shared-text
+# scoring) rather than index lookups; a TimeBudget can defer them
+FUZZY_PASSES = ('SALARY', 'COMMON_TEXT')
+
+
+class TimeBudget:
+    """Wall-clock deadline for the fuzzy passes of a reconcile.
+
+    Passes outside FUZZY_PASSES, and the tolerance and split matching,
+    always run. A fuzzy pass runs only if it is estimated
+    (RECONCILE_FUZZY_SECONDS_PER_PAIR per candidate pair) to end before the
+    deadline. Otherwise it, and every later fuzzy pass of that find_matches
+    call, is skipped and recorded in deferred; the exact passes after it
+    still run, on every record they would have seen. The deadline is
+    time.time() based so a budget can be sent to worker processes.
+    """
+
+    def __init__(self, seconds: float):
+        self.deadline = time.time() + seconds
+        self.deferred: List[str] = []
+
+    def allows(self, name: str, lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+               candidate_pairs: Callable = same_amount_pairs) -> bool:
+        """Whether pass name is estimated to finish before the deadline on these records."""
+        if name not in FUZZY_PASSES:
+            return True
+        estimate = candidate_pairs(lenders, borrowers) * RECONCILE_FUZZY_SECONDS_PER_PAIR
+        return time.time() + estimate <= self.deadline
+
+    def defer(self, name: str) -> None:
+        """Record pass name as left for the background run."""
+        if name not in self.deferred:
+            self.deferred.append(name)
+
+    def deferred_passes(self) -> List[str]:
+        """The fuzzy passes a background run has to finish: from the earliest deferred one on."""
+        if not self.deferred:
+            return []
+        first = min(FUZZY_PASSES.index(name) for name in self.deferred)
+        return list(FUZZY_PASSES[first:])
+
+
+def _timed_pass(name: str, match_pass: Callable, rule: Callable, lenders: List[RecordFeatures],
+                borrowers: List[RecordFeatures], stats: Optional[MatchStats],
+                candidate_pairs: Callable = same_amount_pairs) -> List[Dict[str, Any]]:
+    # Run one pass, recording it in stats when instrumentation is on
+    if stats is None:
+        return match_pass(lenders, borrowers, rule)
+
+    evaluations = 0
+
+    def counted_rule(lender, borrower):
+        nonlocal evaluations
+        evaluations += 1
+        return rule(lender, borrower)
+
+    started = time.perf_counter()
+    pass_matches = match_pass(lenders, borrowers, counted_rule)
+    stats.record_rule(name, time.perf_counter() - started, len(lenders) * len(borrowers),
+                      candidate_pairs(lenders, borrowers), evaluations, len(pass_matches))
+    return pass_matches
+
+
+def find_matches(data: List[Dict[str, Any]],
+                 watermarks: Optional[Dict[Tuple[str, str, Any, Any], Any]] = None,
+                 stats: Optional[MatchStats] = None) -> List[Dict[str, Any]]:
+    """Match transactions using a hybrid approach combining exact and Jaccard similarity matching.
+    
+    Matching Strategy:
+    1. Amount match (Debit == Credit) as base requirement
+    2. Document reference matches (exact matching):
+       - PO numbers (e.g., ABC/PO/123/456)
+       - LC numbers (e.g., L/C-123/456)
+       - Loan IDs (e.g., LD123, ID-456)
+    3. Salary payment matches (hybrid):
+       - Exact match: person name and period
+       - Jaccard similarity: description comparison (threshold: 0.3)
+    4. Common text pattern match (fallback)
+       - Uses Jaccard similarity for general descriptions
+    
+    The hybrid approach ensures:
+    - High accuracy for structured identifiers (PO, LC, Loan ID)
+    - Flexibility for variations in descriptions (Salary, General text)
+    - Complete audit trail in audit_info JSON
+
+    Features are read from the columns stored at ingest (load_features)
+    or extracted once per record when missing. Rules run as set-level passes
+    (MATCH_PASSES), strongest first: each pass sees every record still
+    unmatched, so a weak rule can no longer claim a borrower that a later
+    lender would have matched by reference. Exact-key passes resolve through
+    inverted indexes and shrink the input before the pairwise and
+    COMMON_TEXT passes run.
+
+    With MATCH_SCORING_MODE = 'optimal' each amount group is instead solved
+    as a scored assignment problem (find_optimal_matches).
+
+    Incremental mode: given per pair-period high-water marks (latest
+    input_date already reconciled, keyed by shard_key), pairs of two records
+    that were both present at the last run are skipped - they were already
+    tried and failed - so only pairs with a new side are evaluated.
+
+    Pass a MatchStats as stats to collect candidate counts and per-rule
+    timing for the call.
+
+    Amount tolerance (opt-in, MATCH_AMOUNT_TOLERANCE_*): records left
+    unmatched are retried against near-amount counterparts of the same
+    company pair (find_tolerance_matches); those matches carry
+    amount_tolerance, borrower_amount and amount_difference.
+
+    Split settlements (MATCH_SPLIT_*): what is still unmatched is searched
+    for one entry settled by several on the other side with the same
+    reference or person (find_split_matches). Those matches carry split,
+    lender_uids / borrower_uids and the per-entry amounts; lender_uid and
+    borrower_uid are the first entry of each side.
+    """
+    matches = []
+    for batch in iter_matches(data, watermarks, stats):
+        matches.extend(batch)
+    return matches
+
+
+def iter_matches(data: List[Dict[str, Any]],
+                 watermarks: Optional[Dict[Tuple[str, str, Any, Any], Any]] = None,
+                 stats: Optional[MatchStats] = None,
+                 budget: Optional[TimeBudget] = None,
+                 passes: Optional[List[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """find_matches as a generator: yields each pass's matches as soon as the pass is done.
+
+    Lets a caller write one pass's matches while the next pass runs. The
+    batches, concatenated, are exactly what find_matches returns. Stats
+    timing leaves out the time the generator spends suspended.
+
+    With a budget (greedy mode only) a fuzzy pass that no longer fits is
+    skipped, with every later fuzzy pass, and the budget records the
+    deferral (see TimeBudget). passes (greedy mode only) restricts the call
+    to those MATCH_PASSES names, without tolerance and split matching: the
+    background run of deferred fuzzy passes.
+    """
+    if not data:
+        print("No data to match")
+        return
+
+    new_uids = None
+    if watermarks is not None:
+        new_uids = {r['uid'] for r in data if is_new_since_watermark(r, watermarks)}
+        if stats is not None:
+            stats.new_records = (stats.new_records or 0) + len(new_uids)
+        if not new_uids:
+            return
+
+    started = time.perf_counter() if stats is not None else 0.0
+    lenders = load_features([r for r in data if r.get('Debit') and r['Debit'] > 0], 'lender')
+    borrowers = load_features([r for r in data if r.get('Credit') and r['Credit'] > 0], 'borrower')
+
+    extracted = time.perf_counter() if stats is not None else 0.0
+    if stats is not None:
+        stats.extraction_time += extracted - started
+        stats.lenders += len(lenders)
+        stats.borrowers += len(borrowers)
+
+    matches = []
+    if MATCH_SCORING_MODE == 'optimal':
+        pass_batches = iter([find_optimal_matches(lenders, borrowers, new_uids, stats)])
+    else:
+        selected = None if passes is None else [match_pass for match_pass in MATCH_PASSES if match_pass[0] in passes]
+        pass_batches = iter_match_passes(lenders, borrowers, new_uids, stats, selected, budget=budget)
+    # Tolerance and split matching see every match made before them
+    final_batches = (final_pass() for final_pass in (
+        lambda: find_tolerance_matches(data, lenders, borrowers, matches, new_uids, stats),
+        lambda: find_split_matches(lenders, borrowers, matches, new_uids, stats)
+    ) if passes is None or MATCH_SCORING_MODE == 'optimal')
+
+    started = extracted
+    for batch in chain(pass_batches, final_batches):
+        if not batch:
+            continue
+        matches.extend(batch)
+        if stats is not None:
+            stats.matching_time += time.perf_counter() - started
+            stats.matches += len(batch)
+        yield batch
+        started = time.perf_counter() if stats is not None else 0.0
+
+    if stats is not None:
+        stats.matching_time += time.perf_counter() - started
+
+
+def run_match_passes(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                     new_uids: Optional[set] = None,
+                     stats: Optional[MatchStats] = None,
+                     passes: Optional[List[Tuple[str, Callable, Callable]]] = None,
+                     candidate_pairs: Callable = same_amount_pairs) -> List[Dict[str, Any]]:
+    """Run MATCH_PASSES (or the given passes) in order, removing matched records between passes.
+
+    With new_uids (incremental mode) only pairs with at least one new side
+    are tried: each pass runs the new lenders against every borrower, then
+    the remaining old lenders against the new borrowers only.
+    """
+    matches = []
+    for pass_matches in iter_match_passes(lenders, borrowers, new_uids, stats, passes, candidate_pairs):
+        matches.extend(pass_matches)
+    return matches
+
+
+def iter_match_passes(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                      new_uids: Optional[set] = None,
+                      stats: Optional[MatchStats] = None,
+                      passes: Optional[List[Tuple[str, Callable, Callable]]] = None,
+                      candidate_pairs: Callable = same_amount_pairs,
+                      budget: Optional[TimeBudget] = None) -> Iterator[List[Dict[str, Any]]]:
+    """run_match_passes as a generator yielding each pass's (non-empty) matches.
+
+    With a budget, the first fuzzy pass it does not allow and every later
+    fuzzy pass are skipped and recorded as deferred; the other passes run.
+    """
+    deferring = False
+    for name, match_pass, rule in (MATCH_PASSES if passes is None else passes):
+        if not lenders or not borrowers:
+            break
+        window = date_window_for(name)
+        pass_candidate_pairs = candidate_pairs
+        if window is not None:
+            match_pass = partial(match_pass, window=window)
+            if candidate_pairs is same_amount_pairs:
+                pass_candidate_pairs = partial(same_amount_pairs, window=window)
+        if budget is not None and name in FUZZY_PASSES and \
+                (deferring or not budget.allows(name, lenders, borrowers, pass_candidate_pairs)):
+            # Later fuzzy passes wait too, so the background run keeps their order
+            deferring = True
+            budget.defer(name)
+            continue
+        if new_uids is None:
+            pass_matches = _timed_pass(name, match_pass, rule, lenders, borrowers, stats, pass_candidate_pairs)
+        else:
+            new_lenders = [lender for lender in lenders if lender.uid in new_uids]
+            pass_matches = _timed_pass(name, match_pass, rule, new_lenders, borrowers, stats, pass_candidate_pairs)
+            taken = {match['borrower_uid'] for match in pass_matches}
+            old_lenders = [lender for lender in lenders if lender.uid not in new_uids]
+            new_borrowers = [borrower for borrower in borrowers
+                             if borrower.uid in new_uids and borrower.uid not in taken]
+            if old_lenders and new_borrowers:
+                pass_matches.extend(_timed_pass(name, match_pass, rule, old_lenders, new_borrowers, stats,
+                                                pass_candidate_pairs))
+        if not pass_matches:
+            continue
+        yield pass_matches
+
+        # Remove matched records so later (weaker) passes only see what is left
+        matched_lenders = {match['lender_uid'] for match in pass_matches}
+        matched_borrowers = {match['borrower_uid'] for match in pass_matches}
+        lenders = [lender for lender in lenders if lender.uid not in matched_lenders]
+        borrowers = [borrower for borrower in borrowers if borrower.uid not in matched_borrowers]
+
+
+# Passes retried under an amount tolerance: the reference and identity rules.
+# entered_by, shared text, a settlement keyword or (for SALARY) a Jaccard
+# score alone is too weak once the amounts may differ.
+TOLERANCE_EXCLUDED_PASSES = ('SALARY', 'FINAL_SETTLEMENT', 'MANUAL_VERIFICATION', 'COMMON_TEXT')
+
+
+def amount_tolerance_for(company1: Any, company2: Any) -> Optional[Tuple[int, Decimal]]:
+    """Configured amount tolerance of a company pair as (absolute paisa, percent), or None when off."""
+    override = (MATCH_AMOUNT_TOLERANCE_BY_PAIR.get((company1, company2)) or
+                MATCH_AMOUNT_TOLERANCE_BY_PAIR.get((company2, company1)))
+    if override is not None:
+        absolute, percent = override.get('absolute', 0), override.get('percent', 0)
+    elif MATCH_AMOUNT_TOLERANCE_ENABLED:
+        absolute, percent = MATCH_AMOUNT_TOLERANCE_ABSOLUTE, MATCH_AMOUNT_TOLERANCE_PERCENT
+    else:
+        return None
+
+    absolute = to_minor_units(absolute or 0)
+    percent = Decimal(str(percent or 0))
+    if absolute <= 0 and percent <= 0:
+        return None
+    return absolute, percent
+
+
+def tolerance_limit(amount: int, tolerance: Tuple[int, Decimal]) -> int:
+    """Largest allowed Debit/Credit difference, in paisa, for a lender amount."""
+    absolute, percent = tolerance
+    return max(absolute, int(abs(amount) * percent / 100))
+
+
+def tolerance_pairs(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                    tolerance: Tuple[int, Decimal]) -> int:
+    """Number of lender/borrower pairs with different amounts within the tolerance."""
+    amounts = sorted(borrower.amount for borrower in borrowers)
+    total = 0
+    for lender in lenders:
+        limit = tolerance_limit(lender.amount, tolerance)
+        total += (bisect.bisect_right(amounts, lender.amount + limit) -
+                  bisect.bisect_left(amounts, lender.amount - limit))
+        total -= bisect.bisect_right(amounts, lender.amount) - bisect.bisect_left(amounts, lender.amount)
+    return total
+
+
+def run_tolerance_pass(lenders: List[RecordFeatures], borrowers: List[RecordFeatures], rule: Callable,
+                       tolerance: Tuple[int, Decimal], window: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Tolerance pass: pair each lender with the closest-amount borrower the rule accepts.
+
+    Borrowers are sorted by amount once; each lender binary-searches its
+    position and walks outward (lower amount first on ties) until the
+    difference exceeds its limit. Equal amounts are skipped - the exact
+    passes already tried them.
+    """
+    by_amount = sorted(borrowers, key=lambda borrower: borrower.amount)
+    amounts = [borrower.amount for borrower in by_amount]
+    matched_borrowers = set()
+    matches = []
+    for lender in lenders:
+        amount = lender.amount
+        limit = tolerance_limit(amount, tolerance)
+        below = bisect.bisect_left(amounts, amount) - 1
+        above = bisect.bisect_right(amounts, amount)
+        low, high = amount - limit, amount + limit
+        while True:
+            below_ok = below >= 0 and amounts[below] >= low
+            above_ok = above < len(amounts) and amounts[above] <= high
+            if not (below_ok or above_ok):
+                break
+            if below_ok and (not above_ok or amount - amounts[below] <= amounts[above] - amount):
+                borrower = by_amount[below]
+                below -= 1
+            else:
+                borrower = by_amount[above]
+                above += 1
+            if borrower.uid in matched_borrowers or not within_date_window(lender, borrower, window):
+                continue
+            details = rule(lender, borrower)
+            if details:
+                match = build_match(lender, borrower, details)
+                match['borrower_amount'] = borrower.amount
+                match['amount_difference'] = amount - borrower.amount
+                match['amount_tolerance'] = True
+                matches.append(match)
+                matched_borrowers.add(borrower.uid)
+                break
+    return matches
+
+
+def find_tolerance_matches(data: List[Dict[str, Any]], lenders: List[RecordFeatures],
+                           borrowers: List[RecordFeatures], matches: List[Dict[str, Any]],
+                           new_uids: Optional[set] = None,
+                           stats: Optional[MatchStats] = None) -> List[Dict[str, Any]]:
+    """Retry what the exact-amount passes left unmatched under each company pair's amount tolerance."""
+    if not MATCH_AMOUNT_TOLERANCE_ENABLED and not MATCH_AMOUNT_TOLERANCE_BY_PAIR:
+        return []
+
+    matched = {match['lender_uid'] for match in matches} | {match['borrower_uid'] for match in matches}
+    pair_of = {record['uid']: tuple(sorted((str(record.get('lender') or ''), str(record.get('borrower') or ''))))
+               for record in data}
+    groups: Dict[Tuple[str, str], Tuple[List[RecordFeatures], List[RecordFeatures]]] = {}
+    for side, records in ((0, lenders), (1, borrowers)):
+        for features in records:
+            if features.uid not in matched:
+                groups.setdefault(pair_of[features.uid], ([], []))[side].append(features)
+
+    tolerance_matches = []
+    for (company1, company2), (group_lenders, group_borrowers) in groups.items():
+        tolerance = amount_tolerance_for(company1, company2)
+        if tolerance is None or not group_lenders or not group_borrowers:
+            continue
+        passes = [(f"TOLERANCE_{name}", partial(run_tolerance_pass, tolerance=tolerance), rule)
+                  for name, _, rule in MATCH_PASSES if name not in TOLERANCE_EXCLUDED_PASSES]
+        tolerance_matches.extend(run_match_passes(group_lenders, group_borrowers, new_uids, stats, passes,
+                                                  partial(tolerance_pairs, tolerance=tolerance)))
+    return tolerance_matches
+
+
+# ---------------------------------------------------------------------------
+# Split settlements: one entry on one side settled by several on the other.
+# ---------------------------------------------------------------------------
+
+def _salary_person_key(features: RecordFeatures) -> Optional[Tuple[str, Any]]:
+    salary = features.salary
+    if not salary or not salary.get('person_name'):
+        return None
+    return salary['person_name'], salary.get('period')
+
+
+# Keys the entries of a split group must share, strongest first:
+# (pass name, key function, match fields reported for a key)
+SPLIT_KEYS = [
+    ('PO', lambda features: features.po, lambda key: {'match_type': 'PO', 'po': key}),
+    ('FINAL_SETTLEMENT_PERSON', _final_settlement_person_key,
+     lambda key: {'match_type': 'FINAL_SETTLEMENT', 'person': key}),
+    ('LC', lambda features: features.normalized_lc, lambda key: {'match_type': 'LC', 'lc': key}),
+    ('TIME_LOAN_ID', lambda features: features.time_loan_id, lambda key: {'match_type': 'LOAN_ID', 'loan_id': key}),
+    ('LOAN_ID', lambda features: features.loan_id, lambda key: {'match_type': 'LOAN_ID', 'loan_id': key}),
+    ('SALARY_PERSON', _salary_person_key,
+     lambda key: {'match_type': 'SALARY', 'person': key[0], 'period': key[1]}),
+]
+
+
+def find_split_subset(target: int, amounts: List[int], max_parts: int) -> Optional[List[int]]:
+    """Positions of 2..max_parts amounts (paisa, all positive) summing exactly to target, or None.
+
+    Meet in the middle: every combination of up to ceil(max_parts / 2)
+    amounts is enumerated once in ascending amount order - a branch stops
+    as soon as its sum passes the target - and indexed by sum. A full
+    combination is a lower half plus a disjoint upper half of equal or one
+    smaller size, so only about n^(k/2) sums are ever built. Fewest parts
+    wins, then the earliest positions.
+    """
+    order = sorted(range(len(amounts)), key=lambda position: amounts[position])
+    values = [amounts[position] for position in order]
+    half = (max_parts + 1) // 2
+
+    halves: List[Tuple[int, Tuple[int, ...]]] = []
+    stack = [(0, (), 0)]
+    while stack:
+        start, chosen, total = stack.pop()
+        for index in range(start, len(values)):
+            combined = total + values[index]
+            if combined > target:
+                break
+            combo = chosen + (index,)
+            halves.append((combined, combo))
+            if len(combo) < half:
+                stack.append((index + 1, combo, combined))
+
+    by_sum: Dict[int, List[Tuple[int, ...]]] = {}
+    for total, combo in halves:
+        by_sum.setdefault(total, []).append(combo)
+
+    best = None
+    for total, lower in halves:
+        for upper in by_sum.get(target - total, ()):
+            if (upper[0] <= lower[-1] or len(upper) > len(lower) or len(lower) - len(upper) > 1 or
+                    len(lower) + len(upper) > max_parts):
+                continue
+            positions = sorted(order[index] for index in lower + upper)
+            candidate = (len(positions), positions)
+            if best is None or candidate < best:
+                best = candidate
+    return best[1] if best else None
+
+
+def build_split_match(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                      details: Dict[str, Any]) -> Dict[str, Any]:
+    """Group match of one entry and its split counterparts; lender_uid / borrower_uid are the first of each side."""
+    parts = max(len(lenders), len(borrowers))
+    match = {
+        'lender_uid': lenders[0].uid,
+        'borrower_uid': borrowers[0].uid,
+        'amount': sum(lender.amount for lender in lenders)
+    }
+    match.update(details)
+    match.update({
+        'audit_trail': {
+            'match_reason': f"Split settlement: one {'lender' if len(lenders) == 1 else 'borrower'} "
+                            f"entry against {parts} entries"
+        },
+        'split': True,
+        'lender_uids': [lender.uid for lender in lenders],
+        'borrower_uids': [borrower.uid for borrower in borrowers],
+        'lender_amounts': [lender.amount for lender in lenders],
+        'borrower_amounts': [borrower.amount for borrower in borrowers],
+    })
+    return match
+
+
+def run_split_pass(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                   key_func: Callable[[RecordFeatures], Any], details_for: Callable[[Any], Dict[str, Any]],
+                   new_uids: Optional[set] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """Split pass for one key: returns (group matches, subset searches run).
+
+    Records are grouped by key. Within a key each lender, in order, looks
+    for 2..MATCH_SPLIT_MAX_PARTS unused borrowers within the date bound
+    summing to its amount; then each remaining borrower does the same
+    against the remaining lenders. In incremental mode a search needs at
+    least one new record among the single entry and its candidates.
+    """
+    lender_groups: Dict[str, List[RecordFeatures]] = {}
+    borrower_groups: Dict[str, List[RecordFeatures]] = {}
+    for groups, records in ((lender_groups, lenders), (borrower_groups, borrowers)):
+        for features in records:
+            key = key_func(features)
+            if key:
+                groups.setdefault(key, []).append(features)
+
+    used = set()
+    matches = []
+    searches = 0
+    for key, group_lenders in lender_groups.items():
+        group_borrowers = borrower_groups.get(key)
+        if not group_borrowers:
+            continue
+        for single_side, parts_side in ((0, group_borrowers), (1, group_lenders)):
+            for single in (group_lenders if single_side == 0 else group_borrowers):
+                if single.uid in used:
+                    continue
+                candidates = [
+                    part for part in parts_side
+                    if part.uid not in used and part.amount < single.amount and
+                    within_date_window(single, part, MATCH_SPLIT_DATE_WINDOW_DAYS)
+                ][:MATCH_SPLIT_MAX_CANDIDATES]
+                if len(candidates) < 2:
+                    continue
+                if new_uids is not None and single.uid not in new_uids and \
+                        not any(part.uid in new_uids for part in candidates):
+                    continue
+                searches += 1
+                positions = find_split_subset(single.amount, [part.amount for part in candidates],
+                                              MATCH_SPLIT_MAX_PARTS)
+                if positions is None:
+                    continue
+                parts = [candidates[position] for position in positions]
+                if single_side == 0:
+                    matches.append(build_split_match([single], parts, details_for(key)))
+                else:
+                    matches.append(build_split_match(parts, [single], details_for(key)))
+                used.add(single.uid)
+                used.update(part.uid for part in parts)
+    return matches, searches
+
+
+def find_split_matches(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                       matches: List[Dict[str, Any]], new_uids: Optional[set] = None,
+                       stats: Optional[MatchStats] = None) -> List[Dict[str, Any]]:
+    """Match what the 1:1 passes left unmatched as split settlements (one entry vs 2..k on the other side)."""
+    if not MATCH_SPLIT_ENABLED or MATCH_SPLIT_MAX_PARTS < 2:
+        return []
+
+    matched = {match['lender_uid'] for match in matches} | {match['borrower_uid'] for match in matches}
+    lenders = [lender for lender in lenders if lender.uid not in matched and lender.amount]
+    borrowers = [borrower for borrower in borrowers if borrower.uid not in matched and borrower.amount]
+
+    split_matches = []
+    for name, key_func, details_for in SPLIT_KEYS:
+        if not lenders or not borrowers:
+            break
+        started = time.perf_counter()
+        pass_matches, searches = run_split_pass(lenders, borrowers, key_func, details_for, new_uids)
+        if stats is not None:
+            stats.record_rule(f"SPLIT_{name}", time.perf_counter() - started,
+                              len(lenders) * len(borrowers), 0, searches, len(pass_matches))
+        if not pass_matches:
+            continue
+        split_matches.extend(pass_matches)
+        grouped = {uid for match in pass_matches for uid in match['lender_uids'] + match['borrower_uids']}
+        lenders = [lender for lender in lenders if lender.uid not in grouped]
+        borrowers = [borrower for borrower in borrowers if borrower.uid not in grouped]
+    return split_matches
+
+
+def date_proximity(date1: Any, date2: Any) -> float:
+    """Score two transaction dates: 1.0 on the same day, falling as 1 / (1 + days apart).
+
+    Returns 0.0 when either date is missing or unparseable.
+    """
+    day1, day2 = date_ordinal(date1), date_ordinal(date2)
+    if day1 is None or day2 is None:
+        return 0.0
+    return 1.0 / (1 + abs(day1 - day2))
+
+
+def score_match(lender: RecordFeatures, borrower: RecordFeatures, rule: Callable) -> float:
+    """Score a rule-accepted pair from rule strength, narration Jaccard score and date distance."""
+    return (RULE_STRENGTH[rule] +
+            MATCH_SCORE_JACCARD_WEIGHT * jaccard_similarity_from_tokens(lender.jaccard_tokens, borrower.jaccard_tokens) +
+            MATCH_SCORE_DATE_WEIGHT * date_proximity(lender.date, borrower.date))
+
+
+def solve_assignment(weights: List[List[float]]) -> List[Tuple[int, int]]:
+    """Maximum-weight assignment of rows to columns (Hungarian algorithm, O(n^2 m)).
+
+    Cells of weight 0 mean "cannot pair" and never appear in the result.
+    Returns (row, column) pairs sorted by row.
+    """
+    if not weights or not weights[0]:
+        return []
+
+    transposed = len(weights) > len(weights[0])
+    if transposed:
+        weights = [list(column) for column in zip(*weights)]
+    rows, cols = len(weights), len(weights[0])
+
+    # Minimize (top - weight); with rows <= cols every row is assigned
+    top = max(max(row) for row in weights)
+    cost = [[top - weight for weight in row] for row in weights]
+
+    infinity = float('inf')
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (cols + 1)
+    assigned_row = [0] * (cols + 1)
+    way = [0] * (cols + 1)
+    for row in range(1, rows + 1):
+        assigned_row[0] = row
+        col0 = 0
+        min_slack = [infinity] * (cols + 1)
+        used = [False] * (cols + 1)
+        while True:
+            used[col0] = True
+            row0 = assigned_row[col0]
+            delta = infinity
+            col1 = 0
+            for col in range(1, cols + 1):
+                if not used[col]:
+                    slack = cost[row0 - 1][col - 1] - u[row0] - v[col]
+                    if slack < min_slack[col]:
+                        min_slack[col] = slack
+                        way[col] = col0
+                    if min_slack[col] < delta:
+                        delta = min_slack[col]
+                        col1 = col
+            for col in range(cols + 1):
+                if used[col]:
+                    u[assigned_row[col]] += delta
+                    v[col] -= delta
+                else:
+                    min_slack[col] -= delta
+            col0 = col1
+            if assigned_row[col0] == 0:
+                break
+        # Augment along the alternating path
+        while col0:
+            col1 = way[col0]
+            assigned_row[col0] = assigned_row[col1]
+            col0 = col1
+
+    pairs = []
+    for col in range(1, cols + 1):
+        row = assigned_row[col]
+        if row and weights[row - 1][col - 1] > 0:
+            pairs.append((col - 1, row - 1) if transposed else (row - 1, col - 1))
+    return sorted(pairs)
+
+
+def solve_amount_group(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                       new_uids: Optional[set] = None) -> List[Dict[str, Any]]:
+    """Optimally pair one amount group's lenders and borrowers.
+
+    Every pair is scored with its strongest accepting rule (score_match) and
+    the score matrix is solved by solve_assignment. Groups larger than
+    MATCH_ASSIGNMENT_MAX_GROUP_SIZE on either side fall back to the greedy
+    passes. With new_uids, pairs of two old records score 0 (incremental
+    mode). Module-level so it can run in a ProcessPoolExecutor.
+    """
+    if max(len(lenders), len(borrowers)) > MATCH_ASSIGNMENT_MAX_GROUP_SIZE:
+        return run_match_passes(lenders, borrowers, new_uids)
+
+    lsh_index = build_common_text_lsh(borrowers) if COMMON_TEXT_LSH_ENABLED else None
+    scored_rules = [rule for rule in MATCH_RULES if rule is not match_common_text]
+
+    weights = []
+    details_by_cell = {}
+    for row, lender in enumerate(lenders):
+        common_text_uids = common_text_candidates(lender, lsh_index) if lsh_index is not None else None
+        row_weights = []
+        for col, borrower in enumerate(borrowers):
+            if new_uids is not None and lender.uid not in new_uids and borrower.uid not in new_uids:
+                row_weights.append(0.0)
+                continue
+            rules = scored_rules
+            if common_text_uids is None or borrower.uid in common_text_uids:
+                rules = MATCH_RULES
+            weight = 0.0
+            for rule in rules:
+                if not within_date_window(lender, borrower, date_window_for(RULE_PASS_NAMES[rule])):
+                    continue
+                details = rule(lender, borrower)
+                if details:
+                    weight = score_match(lender, borrower, rule)
+                    details_by_cell[row, col] = details
+                    break
+            row_weights.append(weight)
+        weights.append(row_weights)
+
+    matches = []
+    for row, col in solve_assignment(weights):
+        match = build_match(lenders[row], borrowers[col], details_by_cell[row, col])
+        match['match_score'] = round(weights[row][col], 3)
+        matches.append(match)
+    return matches
+
+
+def find_optimal_matches(lenders: List[RecordFeatures], borrowers: List[RecordFeatures],
+                         new_uids: Optional[set] = None,
+                         stats: Optional[MatchStats] = None) -> List[Dict[str, Any]]:
+    """Scored matching mode: solve each amount group independently as an assignment problem.
+
+    Groups run in a process pool when there are enough candidate pairs to
+    pay for it (MATCH_ASSIGNMENT_PARALLEL_MIN_PAIRS), and never from inside
+    a worker process, e.g. one started by sharded reconciliation. Stats
+    record the whole solve as one OPTIMAL_ASSIGNMENT entry.
+    """
+    if stats is not None:
+        started = time.perf_counter()
+        matches = find_optimal_matches(lenders, borrowers, new_uids)
+        stats.record_rule('OPTIMAL_ASSIGNMENT', time.perf_counter() - started, len(lenders) * len(borrowers),
+                          same_amount_pairs(lenders, borrowers), 0, len(matches))
+        return matches
+
+    borrowers_by_amount = bucket_by_amount(borrowers, 'amount')
+    groups = []
+    for amount, group_lenders in bucket_by_amount(lenders, 'amount').items():
+        group_borrowers = borrowers_by_amount.get(amount)
+        if not group_borrowers:
+            continue
+        if new_uids is None:
+            groups.append((group_lenders, group_borrowers, None))
+            continue
+        # Incremental mode: skip groups without new records, ship only the group's new uids
+        group_new_uids = {record.uid for record in group_lenders + group_borrowers if record.uid in new_uids}
+        if group_new_uids:
+            groups.append((group_lenders, group_borrowers, group_new_uids))
+
+    workers = MATCH_ASSIGNMENT_WORKERS or os.cpu_count() or 1
+    total_pairs = sum(len(group_lenders) * len(group_borrowers) for group_lenders, group_borrowers, _ in groups)
+    matches = []
+    if (workers > 1 and len(groups) > 1 and total_pairs >= MATCH_ASSIGNMENT_PARALLEL_MIN_PAIRS and
+            multiprocessing.parent_process() is None):
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(groups))) as executor:
+                for group_matches in executor.map(solve_amount_group, *zip(*groups)):
+                    matches.extend(group_matches)
+            return matches
+        except Exception as e:
+            print(f"Error solving amount groups in parallel, falling back to single process: {e}")
+            matches = []
+
+    for group_lenders, group_borrowers, group_new_uids in groups:
+        matches.extend(solve_amount_group(group_lenders, group_borrowers, group_new_uids))
+    return matches
+
+
+def shard_key(record: Dict[str, Any]) -> Tuple[str, str, Any, Any]:
+    """Key a record by its company pair (in either direction) and statement period."""
+    company1, company2 = sorted((record.get('lender') or '', record.get('borrower') or ''))
+    return company1, company2, record.get('statement_month'), record.get('statement_year')
+
+
+def partition_by_pair_period(data: List[Dict[str, Any]]) -> Dict[Tuple[str, str, Any, Any], List[Dict[str, Any]]]:
+    """Split records into independent (company pair, month, year) shards, preserving order."""
+    shards: Dict[Tuple[str, str, Any, Any], List[Dict[str, Any]]] = {}
+    for record in data:
+        shards.setdefault(shard_key(record), []).append(record)
+    return shards
+
+
+def find_matches_in_shards(shards: List[List[Dict[str, Any]]],
+                           watermarks: Optional[Dict[Tuple[str, str, Any, Any], Any]] = None) -> List[Dict[str, Any]]:
+    """Run find_matches on each shard separately and concatenate the results.
+
+    Module-level so it can be submitted to a ProcessPoolExecutor.
+    """
+    matches = []
+    for shard in shards:
+        matches.extend(find_matches(shard, watermarks))
+    return matches
+
+
+def find_matches_in_shards_with_stats(shards: List[List[Dict[str, Any]]],
+                                      watermarks: Optional[Dict[Tuple[str, str, Any, Any], Any]] = None
+                                      ) -> Tuple[List[Dict[str, Any]], MatchStats]:
+    """find_matches_in_shards that also returns the MatchStats of its shards."""
+    stats = MatchStats()
+    matches = []
+    for shard in shards:
+        matches.extend(find_matches(shard, watermarks, stats))
+    return matches, stats
+
+
+def find_matches_in_shards_within_budget(shards: List[List[Dict[str, Any]]],
+                                         watermarks: Optional[Dict[Tuple[str, str, Any, Any], Any]] = None,
+                                         budget: Optional[TimeBudget] = None,
+                                         passes: Optional[List[str]] = None
+                                         ) -> Tuple[List[Dict[str, Any]], MatchStats, List[str]]:
+    """find_matches_in_shards_with_stats under a time budget, also returning the passes it deferred.
+
+    The budget is a copy in a worker process, so its deferrals come back
+    in the result. passes is as for iter_matches.
+    """
+    stats = MatchStats()
+    matches = []
+    for shard in shards:
+        for batch in iter_matches(shard, watermarks, stats, budget, passes):
+            matches.extend(batch)
+    return matches, stats, budget.deferred if budget is not None else []
+
+
+def _input_date_key(value: Any) -> str:
+    # input_date arrives as a datetime, a pandas Timestamp or the parser's
+    # 'YYYY-MM-DD HH:MM:SS' string; all three share this sortable prefix
+    return str(value)[:19]
+
+
+def is_new_since_watermark(record: Dict[str, Any], watermarks: Dict[Tuple[str, str, Any, Any], Any]) -> bool:
+    """True when a record was uploaded after its pair-period's last reconciliation run.
+
+    Records without an input_date, or in a pair-period with no watermark,
+    count as new.
+    """
+    watermark = watermarks.get(shard_key(record))
+    input_date = record.get('input_date')
+    if watermark is None or input_date is None:
+        return True
+    return _input_date_key(input_date) > _input_date_key(watermark)
+
+
+def latest_input_dates(data: List[Dict[str, Any]]) -> Dict[Tuple[str, str, Any, Any], Any]:
+    """Latest input_date per pair-period - the high-water marks to store after a run."""
+    latest: Dict[Tuple[str, str, Any, Any], Any] = {}
+    for record in data:
+        input_date = record.get('input_date')
+        if input_date is None:
+            continue
+        key = shard_key(record)
+        if key not in latest or _input_date_key(input_date) > _input_date_key(latest[key]):
+            latest[key] = input_date
+    return latest
+
+
+# ---------------------------------------------------------------------------
+# Cross-period carry-forward: a transfer booked on the last day of one period
+# by one unit and on the first of the next by the other.
+# ---------------------------------------------------------------------------
+
+MONTH_NUMBERS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+
+
+def period_index(month: Any, year: Any) -> Optional[int]:
+    """Consecutive number of a statement period ('March', 2024), or None when unparseable."""
+    number = MONTH_NUMBERS.get(str(month or '').strip().lower())
+    try:
+        return int(year) * 12 + number - 1 if number else None
+    except (TypeError, ValueError):
+        return None
+
+
+def carry_forward_scope(data: List[Dict[str, Any]], periods: int) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """What to carry forward into a run over data, per company pair.
+
+    For each pair: the previous `periods` statement periods before each of
+    its periods in data (those already in data excluded), and the amounts
+    in paisa residue may have to pair with data on exact amount - Debit
+    residue needs a Credit in data, Credit residue a Debit.
+    """
+    scope: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for record in data:
+        company1, company2, month, year = shard_key(record)
+        pair = scope.setdefault((company1, company2), {
+            'own_periods': set(), 'periods': set(), 'debit_amounts': set(), 'credit_amounts': set()
+        })
+        index = period_index(month, year)
+        if index is not None:
+            pair['own_periods'].add(index)
+        debit = to_minor_units(record.get('Debit'))
+        credit = to_minor_units(record.get('Credit'))
+        if debit and debit > 0:
+            pair['credit_amounts'].add(debit)
+        elif credit and credit > 0:
+            pair['debit_amounts'].add(credit)
+
+    for pair in scope.values():
+        own_periods = pair.pop('own_periods')
+        pair['periods'] = sorted({index - offset for index in own_periods
+                                  for offset in range(1, periods + 1)} - own_periods)
+    return {key: pair for key, pair in scope.items() if pair['periods']}
+
+
+def period_name(index: int) -> Tuple[str, str]:
+    """Statement month and year of a period_index value, as stored in tally_data."""
+    return calendar.month_name[index % 12 + 1], str(index // 12)
+
+
+def rule_set_version() -> str:
+    """Short hash of everything besides the data that decides what find_matches returns.
+
+    Covers the rules and feature versions, the matching settings from
+    core.config and the current bank mapping and account patterns, so it
+    changes whenever a run over the same rows could come out differently.
+    """
+    settings = (
+        MATCH_RULES_VERSION, MATCH_FEATURE_VERSION, MATCH_SCORING_MODE,
+        COMMON_TEXT_LSH_ENABLED, COMMON_TEXT_LSH_BANDS, COMMON_TEXT_LSH_ROWS, COMMON_TEXT_SHINGLE_SIZE,
+        MATCH_AMOUNT_TOLERANCE_ENABLED, MATCH_AMOUNT_TOLERANCE_ABSOLUTE, MATCH_AMOUNT_TOLERANCE_PERCENT,
+        sorted(MATCH_AMOUNT_TOLERANCE_BY_PAIR.items(), key=repr),
+        MATCH_DATE_WINDOW_DAYS, sorted(MATCH_DATE_WINDOW_BY_RULE.items(), key=repr),
+        MATCH_SPLIT_ENABLED, MATCH_SPLIT_MAX_PARTS, MATCH_SPLIT_DATE_WINDOW_DAYS, MATCH_SPLIT_MAX_CANDIDATES,
+        sorted(bank_config.BANK_MAPPING.items()),
+        sorted(bank_config.BANK_ACCOUNT_PATTERNS.items()),
+        list(bank_config.ACCOUNT_REFERENCE_PATTERNS)
+    )
+    return hashlib.sha1(repr(settings).encode('utf-8')).hexdigest()[:16]
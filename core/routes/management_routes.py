@@ -22,4 +22,13 @@ def reset_all_matches():
         result = database.reset_all_matches()
         return jsonify(result)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@management_bp.route('/backfill-match-features', methods=['POST'])
+def backfill_match_features():
+    """Compute persisted match features for rows uploaded before they existed"""
+    try:
+        result = database.backfill_match_features()
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,12 +1,78 @@
 """
 Reconciliation Routes - Handles all matching and reconciliation endpoints.
 """
-from flask import Blueprint, request, jsonify
+import json
+import math
+import queue
+import threading
+import time
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from core.services.reconciliation_service import ReconciliationService
 from core import database
+from core.config import RECONCILE_STATS_ENABLED, RECONCILE_STREAM_HEARTBEAT_SECONDS
+from core.matching import MatchStats
 
 reconciliation_bp = Blueprint('reconciliation', __name__)
 
+def _wants_stream():
+    """Whether the request asked for an NDJSON progress stream (?stream=1)."""
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+def _parse_time_budget(value):
+    """A request's time_budget as seconds (None when not given); ValueError unless a non-negative number."""
+    if value is None:
+        return None
+    try:
+        seconds = float(value) if not isinstance(value, bool) else math.nan
+    except (TypeError, ValueError):
+        seconds = math.nan
+    if math.isnan(seconds) or seconds < 0:
+        raise ValueError('time_budget must be a non-negative number of seconds')
+    return seconds
+
+def _stream_reconciliation(run, stats=None, service=None):
+    """NDJSON progress stream of run(progress), which runs in a background thread.
+    
+    One JSON object per line: the service's progress events, a heartbeat
+    every RECONCILE_STREAM_HEARTBEAT_SECONDS while nothing else happens,
+    then a final done (with matches_found, stats and the service's deferred
+    job) or error event. The run finishes and commits even if the client
+    disconnects.
+    """
+    events = queue.Queue()
+    
+    def work():
+        try:
+            matches_found = run(events.put)
+            done = {'event': 'done', 'message': 'Reconciliation complete.', 'matches_found': matches_found}
+            if stats is not None:
+                done['stats'] = stats.to_dict()
+                print(f"Reconciliation stats: {json.dumps(done['stats'])}")
+            if service is not None and service.deferred_job:
+                done['deferred'] = service.deferred_job
+            events.put(done)
+        except Exception as e:
+            print(f"Error in streamed reconciliation: {e}")
+            events.put({'event': 'error', 'error': str(e)})
+        finally:
+            events.put(None)
+    
+    def generate():
+        started = time.monotonic()
+        threading.Thread(target=work, name='reconcile-stream', daemon=True).start()
+        while True:
+            try:
+                event = events.get(timeout=RECONCILE_STREAM_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                event = {'event': 'heartbeat'}
+            if event is None:
+                return
+            event['elapsed'] = round(time.monotonic() - started, 2)
+            yield json.dumps(event, default=str) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @reconciliation_bp.route('/reconcile', methods=['POST'])
 def reconcile_transactions():
     """Run reconciliation on all data - REFACTORED to use ReconciliationService"""
@@ -17,17 +83,48 @@ def reconcile_transactions():
         borrower_company = data.get('borrower_company')
         month = data.get('month')
         year = data.get('year')
+        # Optional override of RECONCILE_INCREMENTAL_ENABLED (false forces a full re-match)
+        incremental = data.get('incremental')
+        # Matcher instrumentation, off unless configured or requested
+        stats = MatchStats() if data.get('stats', RECONCILE_STATS_ENABLED) else None
+        # Optional override of RECONCILE_CARRY_FORWARD_PERIODS (previous periods to carry residue from)
+        carry_forward = data.get('carry_forward')
+        # Optional override of RECONCILE_TIME_BUDGET_SECONDS (seconds; fuzzy passes beyond it run in the background)
+        try:
+            time_budget = _parse_time_budget(data.get('time_budget'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Use ReconciliationService for reconciliation
         reconciliation_service = ReconciliationService()
+        # "preview": true proposes matches over a read-only connection without writing them
+        if data.get('preview'):
+            preview = reconciliation_service.preview_reconciliation(
+                lender_company, borrower_company, month, year, incremental=incremental,
+                carry_forward=carry_forward, stats=stats
+            )
+            return jsonify(dict(preview, message='Preview complete. Nothing was written.'))
+        # ?stream=1: NDJSON progress lines instead of one JSON response at the end
+        if _wants_stream():
+            return _stream_reconciliation(lambda progress: reconciliation_service.run_reconciliation(
+                lender_company, borrower_company, month, year, incremental, stats, carry_forward, progress,
+                time_budget
+            ), stats, reconciliation_service)
         matches_found = reconciliation_service.run_reconciliation(
-            lender_company, borrower_company, month, year
+            lender_company, borrower_company, month, year, incremental, stats, carry_forward,
+            time_budget=time_budget
         )
         
-        return jsonify({
+        response = {
             'message': 'Reconciliation complete.',
             'matches_found': matches_found
-        })
+        }
+        if reconciliation_service.deferred_job:
+            response['deferred'] = reconciliation_service.deferred_job
+        if stats is not None:
+            response['stats'] = stats.to_dict()
+            print(f"Reconciliation stats: {json.dumps(response['stats'])}")
+        return jsonify(response)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -35,17 +132,78 @@ def reconcile_transactions():
 def reconcile_pair(pair_id):
     """Reconcile transactions for a specific pair - REFACTORED to use ReconciliationService"""
     try:
+        # Optional incremental, carry_forward, time budget and preview, as for /reconcile
+        data = request.get_json(silent=True) or {}
+        incremental = data.get('incremental')
+        carry_forward = data.get('carry_forward')
+        try:
+            time_budget = _parse_time_budget(data.get('time_budget'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Use ReconciliationService for pair reconciliation
         reconciliation_service = ReconciliationService()
-        matches_found = reconciliation_service.run_pair_reconciliation(pair_id)
+        # The preview runs with the same options as the run it stands in for
+        if data.get('preview'):
+            preview = reconciliation_service.preview_reconciliation(
+                pair_id=pair_id, incremental=incremental, carry_forward=carry_forward
+            )
+            return jsonify(dict(preview, message=f'Preview complete for pair {pair_id}. Nothing was written.'))
+        if _wants_stream():
+            return _stream_reconciliation(
+                lambda progress: reconciliation_service.run_pair_reconciliation(
+                    pair_id, incremental, carry_forward=carry_forward, progress=progress, time_budget=time_budget
+                ), service=reconciliation_service
+            )
+        matches_found = reconciliation_service.run_pair_reconciliation(
+            pair_id, incremental, carry_forward=carry_forward, time_budget=time_budget
+        )
         
-        return jsonify({
+        response = {
             'message': f'Reconciliation complete for pair {pair_id}.',
             'matches_found': matches_found
+        }
+        if reconciliation_service.deferred_job:
+            response['deferred'] = reconciliation_service.deferred_job
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reconciliation_bp.route('/reconcile/preview/<preview_id>/commit', methods=['POST'])
+def commit_reconcile_preview(preview_id):
+    """Write the matches of a stored reconcile preview without recomputing them"""
+    try:
+        reconciliation_service = ReconciliationService()
+        result = reconciliation_service.commit_preview(preview_id)
+        if not result['success']:
+            return jsonify({'error': result['error']}), 404 if result['reason'] == 'not_found' else 409
+        return jsonify({
+            'message': 'Preview committed.',
+            'matches_found': result['matches_found']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@reconciliation_bp.route('/reconcile/deferred', methods=['GET'])
+def get_deferred_reconciles():
+    """Recent deferred (background) reconcile jobs, newest first"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({'jobs': database.get_deferred_reconciles(limit)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reconciliation_bp.route('/reconcile/deferred/<int:job_id>', methods=['GET'])
+def get_deferred_reconcile(job_id):
+    """Status of one deferred reconcile job: queued, running, done (with matches_found) or failed"""
+    try:
+        job = database.get_deferred_reconcile(job_id)
+        if job is None:
+            return jsonify({'error': 'Deferred reconcile not found'}), 404
+        return jsonify({'job': job})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @reconciliation_bp.route('/matches', methods=['GET'])
 def get_matches():
     """Get matched data with optional filtering"""
@@ -1,43 +1,591 @@
 """
 ReconciliationService - Handles reconciliation logic and orchestration.
 """
-from typing import Dict, Any, Optional
+import json
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
 from core import database
 from core import matching
+from core.config import (
+    RECONCILE_SHARDING_ENABLED, RECONCILE_MAX_WORKERS,
+    RECONCILE_PARALLEL_MIN_ROWS, RECONCILE_SHARD_MIN_ROWS, RECONCILE_INCREMENTAL_ENABLED,
+    RECONCILE_SQL_PUSHDOWN_ENABLED, RECONCILE_CARRY_FORWARD_PERIODS, RECONCILE_RESULT_CACHE_ENABLED,
+    RECONCILE_WRITE_QUEUE_SIZE, RECONCILE_TIME_BUDGET_SECONDS, RECONCILE_DEFERRED_POLL_SECONDS,
+    RECONCILE_DEFERRED_STALE_SECONDS, RECONCILE_PREVIEW_TTL_SECONDS
+)
 
 
 class ReconciliationService:
     """Handles reconciliation logic and orchestration."""
     
+    def __init__(self):
+        # Deferred-reconcile job ({'job_id', 'deferred_pass'}) queued by the last budgeted run, if any
+        self.deferred_job: Optional[Dict[str, Any]] = None
+    
     def run_reconciliation(self, lender_company: Optional[str] = None, 
                           borrower_company: Optional[str] = None,
                           month: Optional[str] = None, 
-                          year: Optional[str] = None) -> int:
-        """Run reconciliation for specified company pair and period."""
+                          year: Optional[str] = None,
+                          incremental: Optional[bool] = None,
+                          stats: Optional[matching.MatchStats] = None,
+                          carry_forward: Optional[int] = None,
+                          progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                          time_budget: Optional[float] = None,
+                          passes: Optional[List[str]] = None) -> int:
+        """Run reconciliation for specified company pair and period.
+        
+        Incremental runs (the default, see RECONCILE_INCREMENTAL_ENABLED) skip
+        pairs of records that were both present at the previous run. Pass a
+        matching.MatchStats as stats to have it filled for this run.
+        carry_forward overrides RECONCILE_CARRY_FORWARD_PERIODS for a
+        company-pair run. A repeat of a run that matched nothing returns 0
+        without loading anything while its input is unchanged (see
+        RECONCILE_RESULT_CACHE_ENABLED).
+        
+        Matches are written pass by pass while matching continues
+        (_match_and_write); progress, when given, is called with an event
+        dict at each step (cached, sql_pushdown, loaded, matched, written,
+        deferred).
+        
+        time_budget (seconds, default RECONCILE_TIME_BUDGET_SECONDS) bounds
+        the fuzzy passes: the ones that no longer fit are queued for the
+        background worker and self.deferred_job is set. passes, set by that
+        worker, runs only those (deferred) passes over what is still
+        unmatched, without SQL pushdown or the result cache.
+        """
+        budget = self._make_budget(time_budget)
+        started = time.perf_counter()
+        cached_run = None if passes else self._cached_run_scope(
+            incremental, carry_forward, lender_company=lender_company, borrower_company=borrower_company,
+            month=month, year=year
+        )
+        self._record_phase(stats, 'fingerprint', started)
+        if cached_run and database.is_known_empty_run(*cached_run):
+            self._notify(progress, 'cached')
+            return 0
+        
+        watermarks = self._get_watermarks(incremental)
+        
+        # Exact reference matches first, inside MySQL, when pushdown is enabled
+        pushed_down = 0
+        if RECONCILE_SQL_PUSHDOWN_ENABLED and not passes:
+            started = time.perf_counter()
+            if lender_company and borrower_company:
+                pushed_down = database.match_references_in_sql(lender_company, borrower_company, month, year)
+            else:
+                pushed_down = database.match_references_in_sql(by_period=RECONCILE_SHARDING_ENABLED)
+            self._record_phase(stats, 'sql_pushdown', started)
+            self._notify(progress, 'sql_pushdown', matches=pushed_down)
+        
+        started = time.perf_counter()
         # Get filtered unmatched transactions if company pair is specified
         if lender_company and borrower_company:
             data = database.get_unmatched_data_by_companies(lender_company, borrower_company, month, year)
+            carried = self._load_carry_forward(data, carry_forward)
+            self._record_phase(stats, 'load', started)
+            self._notify(progress, 'loaded', records=len(data), carried=len(carried))
+            
+            # Perform matching logic using the matching module
+            batches = matching.iter_matches(data + carried, self._carry_forward_watermarks(watermarks, carried),
+                                            stats, budget, passes)
         else:
-            # Get all unmatched transactions if no company pair specified
+            # Get all unmatched transactions if no company pair specified; they
+            # span every period already, so nothing is carried forward
             data = database.get_unmatched_data()
+            carried = []
+            self._record_phase(stats, 'load', started)
+            self._notify(progress, 'loaded', records=len(data), carried=0)
+            
+            if RECONCILE_SHARDING_ENABLED:
+                batches = self.iter_matches_sharded(data, watermarks=watermarks, stats=stats, budget=budget,
+                                                    passes=passes)
+            else:
+                batches = matching.iter_matches(data, watermarks, stats, budget, passes)
         
-        # Perform matching logic using the matching module
-        matches = matching.find_matches(data)
-        
-        # Update database with matches
-        database.update_matches(matches)
+        # Update database with matches as they come
+        matches, skipped = self._match_and_write(batches, stats, progress)
+        started = time.perf_counter()
+        deferred = self._defer_fuzzy_passes(budget, {
+            'lender_company': lender_company, 'borrower_company': borrower_company, 'month': month, 'year': year,
+            'incremental': incremental, 'carry_forward': carry_forward
+        }, progress)
+        # Rows of a skipped match may still pair with other rows, so the next run must see them as new
+        if not deferred and not skipped:
+            self._record_watermarks(data)
+        database.update_open_items(data + carried, matches)
+        self._record_phase(stats, 'write', started)
         
-        return len(matches)
+        if stats is not None:
+            stats.matches += pushed_down
+        if cached_run and not deferred and not pushed_down and not matches and not skipped:
+            database.record_empty_run(*cached_run)
+        return pushed_down + len(matches)
     
-    def run_pair_reconciliation(self, pair_id: str) -> int:
-        """Run reconciliation for a specific pair ID."""
+    def run_pair_reconciliation(self, pair_id: str, incremental: Optional[bool] = None,
+                                stats: Optional[matching.MatchStats] = None,
+                                carry_forward: Optional[int] = None,
+                                progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                time_budget: Optional[float] = None,
+                                passes: Optional[List[str]] = None) -> int:
+        """Run reconciliation for a specific pair ID (see run_reconciliation for progress, time_budget and passes)."""
+        budget = self._make_budget(time_budget)
+        started = time.perf_counter()
+        cached_run = None if passes else self._cached_run_scope(incremental, carry_forward, pair_id=pair_id)
+        self._record_phase(stats, 'fingerprint', started)
+        if cached_run and database.is_known_empty_run(*cached_run):
+            self._notify(progress, 'cached')
+            return 0
+        
+        watermarks = self._get_watermarks(incremental)
+        
+        # Exact reference matches first, inside MySQL, when pushdown is enabled
+        pushed_down = 0
+        if RECONCILE_SQL_PUSHDOWN_ENABLED and not passes:
+            started = time.perf_counter()
+            pushed_down = database.match_references_in_sql(pair_id=pair_id)
+            self._record_phase(stats, 'sql_pushdown', started)
+            self._notify(progress, 'sql_pushdown', matches=pushed_down)
+        
         # Get unmatched transactions for this pair
+        started = time.perf_counter()
         data = database.get_unmatched_data_by_pair_id(pair_id)
+        carried = self._load_carry_forward(data, carry_forward)
+        self._record_phase(stats, 'load', started)
+        self._notify(progress, 'loaded', records=len(data), carried=len(carried))
+        
+        # Perform matching logic using the matching module, writing matches as they come
+        batches = matching.iter_matches(data + carried, self._carry_forward_watermarks(watermarks, carried),
+                                        stats, budget, passes)
+        matches, skipped = self._match_and_write(batches, stats, progress)
+        started = time.perf_counter()
+        deferred = self._defer_fuzzy_passes(budget, {
+            'pair_id': pair_id, 'incremental': incremental, 'carry_forward': carry_forward
+        }, progress)
+        if not deferred and not skipped:
+            self._record_watermarks(data)
+        database.update_open_items(data + carried, matches)
+        self._record_phase(stats, 'write', started)
+        
+        if stats is not None:
+            stats.matches += pushed_down
+        if cached_run and not deferred and not pushed_down and not matches and not skipped:
+            database.record_empty_run(*cached_run)
+        return pushed_down + len(matches)
+    
+    def preview_reconciliation(self, lender_company: Optional[str] = None,
+                               borrower_company: Optional[str] = None,
+                               month: Optional[str] = None,
+                               year: Optional[str] = None,
+                               pair_id: Optional[str] = None,
+                               incremental: Optional[bool] = None,
+                               carry_forward: Optional[int] = None,
+                               stats: Optional[matching.MatchStats] = None) -> Dict[str, Any]:
+        """Work out what a reconcile of this scope would match, without writing tally_data.
+        
+        Everything is read over the read-only engine. SQL pushdown, the
+        result cache and time budgets are skipped, so the whole rule set
+        runs in Python. The proposal is stored (reconcile_previews) for
+        commit_preview. Returns its preview_id, the proposed matches (amounts
+        as two-place Decimals), their count per match type and the run's
+        MatchStats.
+        """
+        stats = stats if stats is not None else matching.MatchStats()
+        watermarks = self._get_watermarks(incremental, read_only=True)
+        
+        started = time.perf_counter()
+        if pair_id:
+            data = database.get_unmatched_data_by_pair_id(pair_id, read_only=True)
+            carried = self._load_carry_forward(data, carry_forward, read_only=True)
+        elif lender_company and borrower_company:
+            data = database.get_unmatched_data_by_companies(lender_company, borrower_company, month, year,
+                                                            read_only=True)
+            carried = self._load_carry_forward(data, carry_forward, read_only=True)
+        else:
+            data = database.get_unmatched_data(read_only=True)
+            carried = []
+        self._record_phase(stats, 'load', started)
+        
+        if not pair_id and not (lender_company and borrower_company) and RECONCILE_SHARDING_ENABLED:
+            matches = self.find_matches_sharded(data, watermarks=watermarks, stats=stats)
+        else:
+            matches = matching.find_matches(data + carried, self._carry_forward_watermarks(watermarks, carried), stats)
+        
+        # Stored in the JSON form update_matches_atomically takes as is (amounts in
+        # paisa); the response shows amounts as Decimals, like every other response
+        proposed = json.loads(json.dumps(matches, default=str))
+        watermark_rows = [[*key, str(last_input_date)]
+                          for key, last_input_date in matching.latest_input_dates(data).items()]
+        preview_id = uuid.uuid4().hex
+        params = {
+            'lender_company': lender_company, 'borrower_company': borrower_company, 'month': month, 'year': year,
+            'pair_id': pair_id, 'incremental': incremental, 'carry_forward': carry_forward,
+            'rule_version': matching.rule_set_version()
+        }
+        started = time.perf_counter()
+        database.save_reconcile_preview(preview_id, params, json.dumps(proposed), json.dumps(watermark_rows),
+                                        RECONCILE_PREVIEW_TTL_SECONDS)
+        self._record_phase(stats, 'save_preview', started)
+        
+        return {
+            'preview_id': preview_id,
+            'matches_found': len(proposed),
+            'rule_counts': dict(Counter(match['match_type'] for match in proposed)),
+            'matches': [matching.match_with_decimal_amounts(match) for match in proposed],
+            'stats': stats.to_dict()
+        }
+    
+    def commit_preview(self, preview_id: str) -> Dict[str, Any]:
+        """Write a stored preview's matches as proposed, without recomputing them.
+        
+        Refused (success False, reason 'not_found' or 'stale') when the
+        preview is unknown or expired, when the matching rules changed since
+        it was made, or when any row it pairs has been matched or removed
+        since. The matches are written in one transaction
+        (database.update_matches_atomically), so a refused commit writes
+        nothing; the preview is dropped only after a successful one.
+        """
+        preview = database.get_reconcile_preview(preview_id, RECONCILE_PREVIEW_TTL_SECONDS)
+        if preview is None:
+            return {'success': False, 'reason': 'not_found',
+                    'error': 'Preview not found or expired. Run the preview again.'}
+        if preview['params'].get('rule_version') != matching.rule_set_version():
+            return {'success': False, 'reason': 'stale',
+                    'error': 'The matching rules changed since this preview was made. Run the preview again.'}
+        
+        matches = preview['matches']
+        if not database.update_matches_atomically(matches):
+            return {'success': False, 'reason': 'stale',
+                    'error': 'Transactions in this preview were matched or removed since it was made. '
+                             'Run the preview again.'}
+        
+        database.delete_reconcile_preview(preview_id)
+        if RECONCILE_INCREMENTAL_ENABLED:
+            database.update_match_watermarks({tuple(row[:4]): row[4] for row in preview['watermarks']})
+        return {'success': True, 'matches_found': len(matches)}
+    
+    def run_deferred_reconcile(self, job: Dict[str, Any]) -> None:
+        """Finish a claimed deferred reconcile: run its deferred passes without a budget and record the outcome.
+        
+        Only the job's passes run, over what the budgeted run left
+        unmatched; jobs queued without passes re-run the whole scope.
+        """
+        params = job['params']
+        try:
+            # An infinite budget, not the configured default, so nothing is deferred again
+            if params.get('pair_id'):
+                matches_found = self.run_pair_reconciliation(params['pair_id'], params.get('incremental'),
+                                                             carry_forward=params.get('carry_forward'),
+                                                             time_budget=math.inf, passes=params.get('passes'))
+            else:
+                matches_found = self.run_reconciliation(
+                    params.get('lender_company'), params.get('borrower_company'), params.get('month'),
+                    params.get('year'), params.get('incremental'), carry_forward=params.get('carry_forward'),
+                    time_budget=math.inf, passes=params.get('passes')
+                )
+            database.finish_deferred_reconcile(job['id'], matches_found=matches_found)
+        except Exception as e:
+            print(f"Error in deferred reconcile {job['id']}: {e}")
+            database.finish_deferred_reconcile(job['id'], error=str(e))
+    
+    def _make_budget(self, time_budget: Optional[float]) -> Optional[matching.TimeBudget]:
+        """TimeBudget for a run, starting now, or None for an unbudgeted run (no or an infinite budget)."""
+        seconds = RECONCILE_TIME_BUDGET_SECONDS if time_budget is None else float(time_budget)
+        if seconds is None or math.isinf(seconds):
+            return None
+        return matching.TimeBudget(seconds)
+    
+    def _defer_fuzzy_passes(self, budget: Optional[matching.TimeBudget], params: Dict[str, Any],
+                            progress: Optional[Callable[[Dict[str, Any]], None]]) -> bool:
+        """Queue the deferred fuzzy passes of the run's scope for the background worker; True if any were.
         
-        # Perform matching logic using the matching module
-        matches = matching.find_matches(data)
+        The job carries the passes to run (TimeBudget.deferred_passes), so
+        the worker runs only those over what this run left unmatched. The
+        run leaves its watermarks alone so the background run still tries
+        every pair the deferred passes never saw.
+        """
+        if budget is None or not budget.deferred:
+            return False
+        passes = budget.deferred_passes()
+        params = dict(params, passes=passes)
+        job_id = database.enqueue_deferred_reconcile(json.dumps(params, sort_keys=True), params, passes[0])
+        self.deferred_job = {'job_id': job_id, 'deferred_pass': passes[0]}
+        self._notify(progress, 'deferred', **self.deferred_job)
+        start_deferred_worker()
+        return True
+    
+    def _match_and_write(self, batches: Iterator[List[Dict[str, Any]]],
+                         stats: Optional[matching.MatchStats],
+                         progress: Optional[Callable[[Dict[str, Any]], None]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Write match batches from a writer thread while the next batches are being matched.
+        
+        Batches pass through a queue of at most RECONCILE_WRITE_QUEUE_SIZE,
+        so matching waits instead of running ahead of a slow database. The
+        first write error stops matching and is raised once the writer is
+        done. Returns a (matches written, number skipped) tuple; a match is
+        skipped when a concurrent run matched one of its rows first (see
+        database.update_matches). Stats get the overlapped wall time as the
+        match_write phase and the writer's own time as write.
+        """
+        pending = queue.Queue(maxsize=RECONCILE_WRITE_QUEUE_SIZE)
+        errors = []
+        written = {'matches': [], 'skipped': 0, 'seconds': 0.0}
+        
+        def write():
+            while True:
+                batch = pending.get()
+                if batch is None:
+                    return
+                if errors:
+                    continue
+                try:
+                    started = time.perf_counter()
+                    stored = database.update_matches(batch)
+                    written['seconds'] += time.perf_counter() - started
+                    written['matches'].extend(stored)
+                    written['skipped'] += len(batch) - len(stored)
+                    self._notify(progress, 'written', total=len(written['matches']))
+                except Exception as e:
+                    print(f"Error writing matches: {e}")
+                    errors.append(e)
+        
+        started = time.perf_counter()
+        writer = threading.Thread(target=write, name='reconcile-writer', daemon=True)
+        writer.start()
+        matches = []
+        try:
+            for batch in batches:
+                matches.extend(batch)
+                self._notify(progress, 'matched', matches=len(batch), total=len(matches),
+                             match_types=dict(Counter(match['match_type'] for match in batch)))
+                pending.put(batch)
+                if errors:
+                    break
+        finally:
+            pending.put(None)
+            writer.join()
         
-        # Update database with matches
-        database.update_matches(matches)
+        self._record_phase(stats, 'match_write', started)
+        if stats is not None:
+            stats.record_phase('write', written['seconds'])
+        if errors:
+            raise errors[0]
+        if stats is not None:
+            stats.matches -= written['skipped']
+        return written['matches'], written['skipped']
+    
+    def _notify(self, progress: Optional[Callable[[Dict[str, Any]], None]], event: str, **fields: Any) -> None:
+        """Report a reconcile progress event when a progress callback was given."""
+        if progress is not None:
+            progress({'event': event, **fields})
+    
+    def _cached_run_scope(self, incremental: Optional[bool], carry_forward: Optional[int],
+                          lender_company: Optional[str] = None, borrower_company: Optional[str] = None,
+                          month: Optional[str] = None, year: Optional[str] = None,
+                          pair_id: Optional[str] = None) -> Optional[Tuple[str, str, str]]:
+        """(scope key, input fingerprint, rule-set version) for the result cache, or None to always run.
         
-        return len(matches)
\ No newline at end of file
+        A carry-forward run also reads earlier periods' residue, so their
+        rows are part of its input: the fingerprint of a company-pair run
+        for one period covers the periods it reaches back into, and a
+        pair-ID run with carry-forward is not cached.
+        """
+        if not RECONCILE_RESULT_CACHE_ENABLED or incremental is False:
+            return None
+        periods = RECONCILE_CARRY_FORWARD_PERIODS if carry_forward is None else int(carry_forward)
+        periods = max(periods, 0)
+        
+        if pair_id:
+            if periods:
+                return None
+            scope_key = f"pair_id:{pair_id}"
+            fingerprint = database.get_input_fingerprint(pair_id=pair_id)
+        elif lender_company and borrower_company:
+            earlier_periods = []
+            if periods and (month or year):
+                index = matching.period_index(month, year)
+                if index is None:
+                    return None
+                earlier_periods = [matching.period_name(index - offset) for offset in range(1, periods + 1)]
+            company1, company2 = sorted((lender_company, borrower_company))
+            scope_key = f"pair:{company1}|{company2}|{month or ''}|{year or ''}|{periods if earlier_periods else 0}"
+            fingerprint = database.get_input_fingerprint(lender_company, borrower_company, month, year,
+                                                         earlier_periods=earlier_periods)
+        else:
+            scope_key = f"all:{'sharded' if RECONCILE_SHARDING_ENABLED else 'single'}"
+            fingerprint = database.get_input_fingerprint()
+        
+        if not fingerprint:
+            return None
+        return scope_key, fingerprint, f"{matching.rule_set_version()}:{int(RECONCILE_SQL_PUSHDOWN_ENABLED)}"
+    
+    def _load_carry_forward(self, data: List[Dict[str, Any]], carry_forward: Optional[int],
+                            read_only: bool = False) -> List[Dict[str, Any]]:
+        """Earlier periods' unmatched residue that can pair with data, via the open-items index."""
+        periods = RECONCILE_CARRY_FORWARD_PERIODS if carry_forward is None else int(carry_forward)
+        if periods <= 0 or not data:
+            return []
+        
+        uids = {record['uid'] for record in data}
+        carried = []
+        for (company1, company2), scope in matching.carry_forward_scope(data, periods).items():
+            for record in database.get_carry_forward_items(company1, company2, scope['periods'],
+                                                           scope['debit_amounts'], scope['credit_amounts'],
+                                                           read_only=read_only):
+                if record['uid'] not in uids:
+                    uids.add(record['uid'])
+                    carried.append(record)
+        return carried
+    
+    def _carry_forward_watermarks(self, watermarks: Optional[Dict[Any, Any]],
+                                  carried: List[Dict[str, Any]]) -> Optional[Dict[Any, Any]]:
+        """Watermarks without the carried periods, so carried residue counts as new against this period."""
+        if watermarks is None or not carried:
+            return watermarks
+        carried_keys = {matching.shard_key(record) for record in carried}
+        return {key: value for key, value in watermarks.items() if key not in carried_keys}
+    
+    def _record_phase(self, stats: Optional[matching.MatchStats], phase: str, started: float) -> None:
+        """Add the time since started to a reconcile phase when stats are being collected."""
+        if stats is not None:
+            stats.record_phase(phase, time.perf_counter() - started)
+    
+    def _get_watermarks(self, incremental: Optional[bool], read_only: bool = False) -> Optional[Dict[Any, Any]]:
+        """High-water marks for an incremental run, or None for a full run.
+
+        Only marks recorded under the current rule-set version are returned.
+        """
+        if incremental is None:
+            incremental = RECONCILE_INCREMENTAL_ENABLED
+        return database.get_match_watermarks(read_only=read_only) if incremental else None
+    
+    def _record_watermarks(self, data: List[Dict[str, Any]]) -> None:
+        """Store each pair-period's latest reconciled input_date for the next incremental run."""
+        if RECONCILE_INCREMENTAL_ENABLED:
+            database.update_match_watermarks(matching.latest_input_dates(data))
+    
+    def find_matches_sharded(self, data: List[Dict[str, Any]],
+                             max_workers: Optional[int] = None,
+                             watermarks: Optional[Dict[Any, Any]] = None,
+                             stats: Optional[matching.MatchStats] = None,
+                             budget: Optional[matching.TimeBudget] = None) -> List[Dict[str, Any]]:
+        """Match each (company pair, month, year) shard independently, in parallel when worthwhile."""
+        matches = []
+        for batch in self.iter_matches_sharded(data, max_workers, watermarks, stats, budget):
+            matches.extend(batch)
+        return matches
+    
+    def iter_matches_sharded(self, data: List[Dict[str, Any]],
+                             max_workers: Optional[int] = None,
+                             watermarks: Optional[Dict[Any, Any]] = None,
+                             stats: Optional[matching.MatchStats] = None,
+                             budget: Optional[matching.TimeBudget] = None,
+                             passes: Optional[List[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """find_matches_sharded as a generator: yields each pool task's (or in-process pass's) matches."""
+        shards = list(matching.partition_by_pair_period(data).values())
+        workers = max_workers or RECONCILE_MAX_WORKERS or os.cpu_count() or 1
+        tasks = self._pack_shards(shards)
+        
+        if len(data) < RECONCILE_PARALLEL_MIN_ROWS or len(tasks) < 2 or workers < 2:
+            yield from self._iter_shards_in_process(shards, watermarks, stats, budget, passes)
+            return
+        
+        done = 0
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+                if budget is not None or passes is not None:
+                    # Each worker gets a copy of the budget; deferrals come back with the matches
+                    match_task = partial(matching.find_matches_in_shards_within_budget,
+                                         watermarks=watermarks, budget=budget, passes=passes)
+                    for task_matches, task_stats, task_deferred in executor.map(match_task, tasks):
+                        done += 1
+                        if stats is not None:
+                            stats.merge(task_stats)
+                        for name in task_deferred:
+                            budget.defer(name)
+                        if task_matches:
+                            yield task_matches
+                elif stats is None:
+                    match_task = partial(matching.find_matches_in_shards, watermarks=watermarks)
+                    for task_matches in executor.map(match_task, tasks):
+                        done += 1
+                        if task_matches:
+                            yield task_matches
+                else:
+                    match_task = partial(matching.find_matches_in_shards_with_stats, watermarks=watermarks)
+                    for task_matches, task_stats in executor.map(match_task, tasks):
+                        done += 1
+                        stats.merge(task_stats)
+                        if task_matches:
+                            yield task_matches
+        except Exception as e:
+            # Tasks already yielded are written; match only the rest here
+            print(f"Error in sharded reconciliation, falling back to single process: {e}")
+            remaining = [shard for task in tasks[done:] for shard in task]
+            yield from self._iter_shards_in_process(remaining, watermarks, stats, budget, passes)
+    
+    def _iter_shards_in_process(self, shards: List[List[Dict[str, Any]]],
+                                watermarks: Optional[Dict[Any, Any]],
+                                stats: Optional[matching.MatchStats],
+                                budget: Optional[matching.TimeBudget] = None,
+                                passes: Optional[List[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Match shards one after another in this process, yielding each pass's matches."""
+        for shard in shards:
+            yield from matching.iter_matches(shard, watermarks, stats, budget, passes)
+    
+    def _pack_shards(self, shards: List[List[Dict[str, Any]]]) -> List[List[List[Dict[str, Any]]]]:
+        """Group shards into pool tasks: large shards alone, small ones packed to RECONCILE_SHARD_MIN_ROWS."""
+        tasks = []
+        pending = []
+        pending_rows = 0
+        # Largest first so the slowest shards start immediately
+        for shard in sorted(shards, key=len, reverse=True):
+            if len(shard) >= RECONCILE_SHARD_MIN_ROWS:
+                tasks.append([shard])
+                continue
+            pending.append(shard)
+            pending_rows += len(shard)
+            if pending_rows >= RECONCILE_SHARD_MIN_ROWS:
+                tasks.append(pending)
+                pending = []
+                pending_rows = 0
+        if pending:
+            tasks.append(pending)
+        return tasks
+
+
+_deferred_worker_lock = threading.Lock()
+_deferred_worker_pid = None
+
+
+def start_deferred_worker() -> None:
+    """Start this process's background thread for deferred reconciles (once per process).
+
+    Every app process runs one; jobs are claimed through the
+    deferred_reconciles table, so each runs in exactly one process.
+    """
+    global _deferred_worker_pid
+    with _deferred_worker_lock:
+        # Checked by pid so a forked gunicorn worker starts its own thread
+        if _deferred_worker_pid == os.getpid():
+            return
+        _deferred_worker_pid = os.getpid()
+        threading.Thread(target=_run_deferred_worker, name='deferred-reconcile', daemon=True).start()
+
+
+def _run_deferred_worker() -> None:
+    # Claim and run queued jobs one at a time, polling while the queue is empty
+    service = ReconciliationService()
+    while True:
+        job = database.claim_deferred_reconcile(RECONCILE_DEFERRED_STALE_SECONDS)
+        if job is None:
+            time.sleep(RECONCILE_DEFERRED_POLL_SECONDS)
+            continue
+        service.run_deferred_reconcile(job)
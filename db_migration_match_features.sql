@@ -0,0 +1,26 @@
+-- Persisted match features for tally_data (existing installs).
+-- Run once, then backfill existing rows:
+--   python -m core.backfill_match_features
+USE interunit_loan_recon_db;
+
+ALTER TABLE tally_data
+    ADD COLUMN feat_po VARCHAR(64),
+    ADD COLUMN feat_lc VARCHAR(64),
+    ADD COLUMN feat_lc_norm VARCHAR(64),
+    ADD COLUMN feat_loan_id VARCHAR(64),
+    ADD COLUMN feat_time_loan_id VARCHAR(64),
+    ADD COLUMN feat_account_digits VARCHAR(32),
+    ADD COLUMN feat_person_name VARCHAR(128),
+    ADD COLUMN feat_person_id VARCHAR(32),
+    ADD COLUMN feat_salary_period VARCHAR(64),
+    ADD COLUMN match_features JSON,
+    ADD COLUMN feature_version SMALLINT,
+    ADD INDEX idx_feat_po (feat_po),
+    ADD INDEX idx_feat_lc_norm (feat_lc_norm),
+    ADD INDEX idx_feat_loan_id (feat_loan_id),
+    ADD INDEX idx_feat_time_loan_id (feat_time_loan_id),
+    ADD INDEX idx_feat_account_digits (feat_account_digits),
+    ADD INDEX idx_feat_person_name (feat_person_name),
+    ADD INDEX idx_feat_person_id (feat_person_id),
+    ADD INDEX idx_feat_salary_period (feat_salary_period),
+    ADD INDEX idx_feature_version (feature_version);
@@ -0,0 +1,7 @@
+-- Rule-set version on incremental-matching watermarks (existing installs).
+-- Existing marks have no version, so each pair-period gets one full run
+-- before incremental runs resume.
+USE interunit_loan_recon_db;
+
+ALTER TABLE match_watermarks
+    ADD COLUMN rule_version VARCHAR(32) AFTER last_input_date;
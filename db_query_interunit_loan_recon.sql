@@ -24,6 +24,94 @@ CREATE TABLE IF NOT EXISTS tally_data (
     audit_info JSON,  -- Stores structured match information including type, method, keywords, and jaccard score
     role VARCHAR(16),
     pair_id VARCHAR(64),
+    -- Match features extracted from Particulars at ingest (see core/matching.py FEATURE_COLUMNS)
+    feat_po VARCHAR(64),
+    feat_lc VARCHAR(64),
+    feat_lc_norm VARCHAR(64),
+    feat_loan_id VARCHAR(64),
+    feat_time_loan_id VARCHAR(64),
+    feat_account_digits VARCHAR(32),
+    feat_person_name VARCHAR(128),
+    feat_person_id VARCHAR(32),
+    feat_salary_period VARCHAR(64),
+    match_features JSON,
+    feature_version SMALLINT,
     INDEX idx_match_status (match_status),
-    INDEX idx_match_method (match_method)
-);
\ No newline at end of file
+    INDEX idx_match_method (match_method),
+    INDEX idx_feat_po (feat_po),
+    INDEX idx_feat_lc_norm (feat_lc_norm),
+    INDEX idx_feat_loan_id (feat_loan_id),
+    INDEX idx_feat_time_loan_id (feat_time_loan_id),
+    INDEX idx_feat_account_digits (feat_account_digits),
+    INDEX idx_feat_person_name (feat_person_name),
+    INDEX idx_feat_person_id (feat_person_id),
+    INDEX idx_feat_salary_period (feat_salary_period),
+    INDEX idx_feature_version (feature_version)
+);
+
+-- Incremental matching high-water marks: latest input_date already reconciled
+-- per company pair (either direction) and statement period. rule_version is
+-- the matching rule-set version the mark was reached under; a mark from any
+-- other version is ignored so changed rules re-match the whole period
+CREATE TABLE IF NOT EXISTS match_watermarks (
+    company1 VARCHAR(32) NOT NULL,
+    company2 VARCHAR(32) NOT NULL,
+    statement_month VARCHAR(16) NOT NULL,
+    statement_year VARCHAR(8) NOT NULL,
+    last_input_date DATETIME,
+    rule_version VARCHAR(32),
+    last_run DATETIME,
+    PRIMARY KEY (company1, company2, statement_month, statement_year)
+);
+
+-- Open-items index for carry-forward matching: each reconciled period's
+-- unmatched residue by company pair (sorted, either direction), side
+-- ('D' Debit / 'C' Credit), statement period (year * 12 + month - 1) and amount
+CREATE TABLE IF NOT EXISTS open_items (
+    uid VARCHAR(50) NOT NULL PRIMARY KEY,
+    company1 VARCHAR(32) NOT NULL,
+    company2 VARCHAR(32) NOT NULL,
+    side CHAR(1) NOT NULL,
+    period INT NOT NULL,
+    amount DECIMAL(18,2) NOT NULL,
+    INDEX idx_open_items_lookup (company1, company2, side, period, amount)
+);
+
+-- Reconcile result cache: per reconcile scope (company pair and period, or
+-- pair ID), the input fingerprint and rule-set version of its last run that
+-- matched nothing, so an unchanged repeat run can return straight away
+CREATE TABLE IF NOT EXISTS reconcile_runs (
+    scope_key VARCHAR(255) NOT NULL PRIMARY KEY,
+    fingerprint VARCHAR(128) NOT NULL,  -- row count : max input_date : uid/match_status checksum
+    rule_version VARCHAR(32) NOT NULL,  -- matching.rule_set_version()
+    last_run DATETIME
+);
+
+-- Deferred reconciles: reconcile scopes whose fuzzy passes (SALARY,
+-- COMMON_TEXT) did not fit the request's time budget, re-run in the
+-- background by the app (see RECONCILE_TIME_BUDGET_SECONDS)
+CREATE TABLE IF NOT EXISTS deferred_reconciles (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    scope_key VARCHAR(255) NOT NULL,
+    params JSON NOT NULL,  -- company pair / period / pair_id, incremental and carry_forward of the run
+    status VARCHAR(16) NOT NULL,  -- 'queued', 'running', 'done' or 'failed'
+    deferred_pass VARCHAR(32),  -- first pass that did not fit the budget
+    matches_found INT,
+    error TEXT,
+    created_at DATETIME,
+    started_at DATETIME,
+    finished_at DATETIME,
+    INDEX idx_deferred_status (status, id),
+    INDEX idx_deferred_scope (scope_key, status)
+);
+
+-- Reconcile previews: matches a preview run proposed (computed over a
+-- read-only connection), committed later by preview_id without recomputing
+CREATE TABLE IF NOT EXISTS reconcile_previews (
+    preview_id VARCHAR(36) NOT NULL PRIMARY KEY,
+    params JSON NOT NULL,  -- company pair / period or pair_id, incremental and carry_forward of the preview
+    matches LONGTEXT NOT NULL,  -- JSON list of the proposed matches, as update_matches takes them
+    watermarks LONGTEXT,  -- JSON list of [company1, company2, month, year, latest input_date]
+    created_at DATETIME,
+    INDEX idx_previews_created (created_at)
+);
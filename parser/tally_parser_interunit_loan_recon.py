@@ -64,6 +64,8 @@ def extract_counterparty(metadata: pd.DataFrame) -> Tuple[str, str, int]:
             return counterparty, cell, i
     return "", "", None
 
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
 def clean(val) -> str:
     cleaned = str(val).strip() if val is not None else ""
     # Remove _x000D_ characters (Carriage Return)
@@ -72,7 +74,7 @@ def clean(val) -> str:
     cleaned = cleaned.replace('\r', ' ')
     cleaned = cleaned.replace('\n', ' ')
     # Remove multiple spaces
-    cleaned = re.sub(r'\s+', ' ', cleaned)
+    cleaned = WHITESPACE_PATTERN.sub(' ', cleaned)
     return cleaned.strip()
 
 def deduplicate_row(row, dup_map):
@@ -206,10 +208,7 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
     df['entered_by'] = entered_by_list
 
     # Add role column based on Debit/Credit
-    def determine_role(row):
-        debit_val = row.get('Debit', 0)
-        credit_val = row.get('Credit', 0)
-        
+    def determine_role(debit_val, credit_val):
         # Convert to float, handle empty/None values
         try:
             debit_float = float(debit_val) if debit_val and str(debit_val).strip() != '' else 0
@@ -224,24 +223,20 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
         else:
             return None
     
-    df['role'] = df.apply(determine_role, axis=1)
-    
-    # Add lender and borrower columns based on role for each transaction
-    def assign_lender_borrower(row):
-        role = row.get('role')
-        if role == 'Lender':
-            # Current company is lending (Debit > 0), so they are the lender
-            return current_company, counterparty
-        elif role == 'Borrower':
-            # Current company is borrowing (Credit > 0), so counterparty is the lender
-            return counterparty, current_company
-        else:
-            return None, None
+    # Column-wise rather than df.apply(axis=1), which builds a Series per row
+    def column_or(name, default):
+        return df[name].tolist() if name in df.columns else [default] * len(df)
+
+    df['role'] = [determine_role(debit_val, credit_val)
+                  for debit_val, credit_val in zip(column_or('Debit', 0), column_or('Credit', 0))]
     
-    # Apply the function to get lender and borrower for each row
-    lender_borrower_pairs = df.apply(assign_lender_borrower, axis=1)
-    df['lender'] = [pair[0] for pair in lender_borrower_pairs]
-    df['borrower'] = [pair[1] for pair in lender_borrower_pairs]
+    # Add lender and borrower columns based on role for each transaction:
+    # a lending row (Debit > 0) has the current company as lender, a
+    # borrowing row (Credit > 0) has the counterparty as lender
+    lenders_by_role = {'Lender': current_company, 'Borrower': counterparty}
+    borrowers_by_role = {'Lender': counterparty, 'Borrower': current_company}
+    df['lender'] = [lenders_by_role.get(role) for role in df['role']]
+    df['borrower'] = [borrowers_by_role.get(role) for role in df['role']]
     
     # Debug print to see what's being assigned
     # print(f"DEBUG: Current company: '{current_company}'")
@@ -265,10 +260,7 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
 
     uids = []
     rownum = 1
-    for i, row in df.iterrows():
-        date_val = row.get("Date", "")
-        credit_val = row.get("Credit", "")
-        debit_val = row.get("Debit", "")
+    for date_val, credit_val, debit_val in zip(column_or("Date", ""), column_or("Credit", ""), column_or("Debit", "")):
         balance_val = credit_val if (pd.notna(credit_val) and str(credit_val).strip() != "") else debit_val
         if pd.notna(date_val) and date_val != "":
             date_str = str(date_val).replace("-", "")
@@ -325,6 +317,10 @@ def parse_tally_file(file_path: str, sheet_name: str) -> pd.DataFrame:
         "Credit": "Credit",
     }
     df = df.rename(columns=new_column_names)
+
+    # Match features for the whole sheet in one batch pass; save_data keeps them
+    from core import matching
+    df = matching.add_feature_columns(df)
     return df
 
 
@@ -463,13 +463,14 @@ async function runReconciliation() {
         notificationMessage += '<strong>Statement Period:</strong> All Periods<br>';
     }
     
-    notificationMessage += '<small class="text-muted">Processing transactions...</small>';
+    notificationMessage += '<small class="text-muted" id="reconcile-progress">Processing transactions...</small>';
     notificationMessage += '</div>';
     
     resultDiv.innerHTML = notificationMessage;
     
     try {
-        const response = await fetch('/api/reconcile', {
+        // Streamed: progress lines while matching and writing, then a final done/error line
+        const response = await fetch('/api/reconcile?stream=1', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -478,20 +479,25 @@ async function runReconciliation() {
                 lender_company: lenderCompany,
                 borrower_company: borrowerCompany,
                 month: month,
-                year: year
+                year: year,
+                time_budget: INTERACTIVE_RECONCILE_BUDGET_SECONDS
             })
         });
         
-        const result = await response.json();
+        const result = response.ok
+            ? await readReconcileStream(response, showReconcileProgress)
+            : await response.json();
         
-        if (response.ok) {
+        if (response.ok && !result.error) {
             // Create new reconciliation result entry
             const timestamp = new Date().toLocaleString();
             const reconciliationResult = {
                 timestamp: timestamp,
                 companyPair: lenderCompany && borrowerCompany ? `${lenderCompany} ↔ ${borrowerCompany}` : 'All Companies',
                 statementPeriod: month && year ? `${month} ${year}` : 'All Periods',
-                matchesFound: result.matches_found
+                matchesFound: result.matches_found,
+                // Fuzzy passes past the time budget finish in the background
+                deferredJobId: result.deferred ? result.deferred.job_id : null
             };
             
             // Add to reconciliation history
@@ -500,6 +506,10 @@ async function runReconciliation() {
             // Display all reconciliation history
             displayReconciliationHistory();
             
+            if (reconciliationResult.deferredJobId) {
+                pollDeferredReconcile(reconciliationResult);
+            }
+            
         } else {
             // Create error notification
             let errorMessage = '<div class="alert alert-danger" role="alert">';
@@ -527,6 +537,94 @@ async function runReconciliation() {
     }
 }
 
+// Seconds the reconcile request may spend on fuzzy matching before handing it to the background
+const INTERACTIVE_RECONCILE_BUDGET_SECONDS = 2;
+
+// Poll a deferred reconcile job until it finishes, then add its matches to the history entry
+function pollDeferredReconcile(entry) {
+    setTimeout(async () => {
+        try {
+            const response = await fetch(`/api/reconcile/deferred/${entry.deferredJobId}`);
+            const result = await response.json();
+            if (!response.ok) {
+                entry.deferredError = result.error;
+            } else if (result.job.status === 'done') {
+                entry.matchesFound += result.job.matches_found || 0;
+            } else if (result.job.status === 'failed') {
+                entry.deferredError = result.job.error;
+            } else {
+                pollDeferredReconcile(entry);
+                return;
+            }
+        } catch (error) {
+            entry.deferredError = error.message;
+        }
+        entry.deferredJobId = null;
+        displayReconciliationHistory();
+    }, 3000);
+}
+
+// Read an NDJSON reconcile stream, passing each progress event to onEvent;
+// resolves with the final done event (or an error event)
+async function readReconcileStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let last = { error: 'Reconciliation stream ended unexpectedly' };
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (value) {
+            buffer += decoder.decode(value, { stream: true });
+        }
+        const lines = buffer.split('\n');
+        buffer = done ? '' : lines.pop();
+        for (const line of lines) {
+            if (!line.trim()) {
+                continue;
+            }
+            const event = JSON.parse(line);
+            if (event.event === 'done' || event.event === 'error') {
+                last = event;
+            } else {
+                onEvent(event);
+            }
+        }
+        if (done) {
+            return last;
+        }
+    }
+}
+
+// Show the latest reconcile progress event under the running notification
+function showReconcileProgress(event) {
+    const progressEl = document.getElementById('reconcile-progress');
+    if (!progressEl) {
+        return;
+    }
+    
+    if (event.event === 'cached') {
+        progressEl.textContent = 'Nothing changed since the last run.';
+    } else if (event.event === 'loaded') {
+        const carried = event.carried ? ` (+${event.carried} carried forward)` : '';
+        progressEl.dataset.records = `${event.records} unmatched transactions loaded${carried}`;
+        progressEl.textContent = `${progressEl.dataset.records}. Matching...`;
+    } else if (event.event === 'matched') {
+        progressEl.dataset.matched = event.total;
+        progressEl.textContent = `${event.total} matches found so far, ${progressEl.dataset.written || 0} saved (${event.elapsed}s)`;
+    } else if (event.event === 'written') {
+        progressEl.dataset.written = event.total;
+        progressEl.textContent = `${progressEl.dataset.matched || event.total} matches found so far, ${event.total} saved (${event.elapsed}s)`;
+    } else if (event.event === 'deferred') {
+        progressEl.textContent = `Time budget reached; ${event.deferred_pass} matching and later passes continue in the background.`;
+    } else if (event.event === 'heartbeat') {
+        const status = progressEl.dataset.matched
+            ? `${progressEl.dataset.matched} matches found so far, ${progressEl.dataset.written || 0} saved`
+            : (progressEl.dataset.records || 'Processing transactions');
+        progressEl.textContent = `${status} (${event.elapsed}s)`;
+    }
+}
+
 async function loadMatches() {
     const resultDiv = document.getElementById('reconciliation-result');
     
@@ -848,7 +946,20 @@ function formatAuditInfo(auditInfoStr) {
                     formattedInfo += `Borrower Amount: ${auditInfo.borrower_amount}\n`;
                 }
         }
-        
+
+        // Amount tolerance matches: Debit and Credit differ (bank charges, VAT)
+        if (auditInfo.amount_tolerance) {
+            formattedInfo += `Amount Difference: ${auditInfo.amount_difference} (within tolerance, review required)\n`;
+        }
+
+        // Split settlements: one entry matched to several on the other side
+        if (auditInfo.split_group) {
+            const group = auditInfo.split_group;
+            formattedInfo += `Split Settlement: ${group.lender_uids.length} lender / ${group.borrower_uids.length} borrower entries (review required)\n`;
+            formattedInfo += `Lender Parts: ${group.lender_amounts.join(' + ')}\n`;
+            formattedInfo += `Borrower Parts: ${group.borrower_amounts.join(' + ')}\n`;
+        }
+
         return formattedInfo.trim().replace(/^\n+/, '');
     } catch (e) {
         console.error('Error parsing audit info:', e);
@@ -2265,6 +2376,11 @@ function displayReconciliationHistory() {
         historyHTML += '<div class="col-md-4"><strong>Statement Period:</strong> ' + result.statementPeriod + '</div>';
         historyHTML += '<div class="col-md-4"><strong>Matches Found:</strong> ' + result.matchesFound + ' transactions</div>';
         historyHTML += '</div>';
+        if (result.deferredJobId) {
+            historyHTML += '<small class="text-muted"><span class="spinner-border spinner-border-sm me-1"></span>Fuzzy matching continues in the background...</small>';
+        } else if (result.deferredError) {
+            historyHTML += '<small class="text-danger">Background fuzzy matching failed: ' + result.deferredError + '</small>';
+        }
         historyHTML += '</div>';
         historyHTML += '<div class="ms-3">';
         historyHTML += '<button type="button" class="btn btn-sm btn-outline-success me-2" onclick="viewReconciliationResults(\'' + result.companyPair + '\', \'' + result.statementPeriod + '\')">View Results</button>';
@@ -0,0 +1,121 @@
+"""
+Amount tolerance: run_tolerance_pass picks the nearest amount first,
+amount_tolerance_for honours per-pair overrides, and the excluded passes
+never match under a tolerance.
+"""
+import datetime
+import random
+from decimal import Decimal
+
+from core import matching
+from core.matching import amount_tolerance_for, extract_record_features, find_matches, run_tolerance_pass
+
+
+def record(uid, debit, credit, particulars, lender='GeoTex', borrower='Steel', entered_by=None):
+    return {'uid': uid, 'Debit': debit, 'Credit': credit, 'Particulars': particulars, 'entered_by': entered_by,
+            'Date': datetime.date(2024, 1, 10), 'lender': lender, 'borrower': borrower,
+            'statement_month': 'January', 'statement_year': 2024}
+
+
+def accept(lender, borrower):
+    return {'match_type': 'TEST'}
+
+
+def features(uid, amount, role):
+    debit, credit = (amount, None) if role == 'lender' else (None, amount)
+    return extract_record_features(record(uid, debit, credit, ''), role)
+
+
+def brute_force_nearest(lenders, borrowers, limit):
+    """Each lender in turn takes the unmatched borrower with the smallest non-zero difference, lower amount on ties."""
+    taken = set()
+    pairs = {}
+    for lender in lenders:
+        options = [(abs(lender.amount - borrower.amount), borrower.amount, borrower.uid) for borrower in borrowers
+                   if borrower.uid not in taken and 0 < abs(lender.amount - borrower.amount) <= limit]
+        if options:
+            uid = min(options)[2]
+            taken.add(uid)
+            pairs[lender.uid] = uid
+    return pairs
+
+
+def test_nearest_amount_first():
+    lender = features('L1', 1000, 'lender')
+    borrowers = [features('B1', 1004, 'borrower'), features('B2', 998, 'borrower'),
+                 features('B3', 1009, 'borrower'), features('B4', 1000, 'borrower')]
+    matches = run_tolerance_pass([lender], borrowers, accept, (1000, Decimal('0')))
+
+    assert [(match['lender_uid'], match['borrower_uid']) for match in matches] == [('L1', 'B2')]
+    assert matches[0]['amount_difference'] == 200
+    assert matches[0]['amount_tolerance'] is True
+
+
+def test_lower_amount_wins_ties():
+    lender = features('L1', 1000, 'lender')
+    borrowers = [features('B1', 1003, 'borrower'), features('B2', 997, 'borrower')]
+    matches = run_tolerance_pass([lender], borrowers, accept, (500, Decimal('0')))
+    assert matches[0]['borrower_uid'] == 'B2'
+
+
+def test_nearest_first_matches_brute_force():
+    rng = random.Random(17)
+    for _ in range(300):
+        lender_amounts = rng.sample(range(1, 200), rng.randint(1, 8))
+        borrower_amounts = rng.sample(range(1, 200), rng.randint(1, 8))
+        lenders = [features(f"L{i}", amount, 'lender') for i, amount in enumerate(lender_amounts)]
+        borrowers = [features(f"B{i}", amount, 'borrower') for i, amount in enumerate(borrower_amounts)]
+        limit = rng.randint(1, 30)
+        matches = run_tolerance_pass(lenders, borrowers, accept, (limit * 100, Decimal('0')))
+        pairs = {match['lender_uid']: match['borrower_uid'] for match in matches}
+        assert pairs == brute_force_nearest(lenders, borrowers, limit * 100)
+
+
+def test_per_pair_override(monkeypatch):
+    monkeypatch.setattr(matching, 'MATCH_AMOUNT_TOLERANCE_ENABLED', False)
+    monkeypatch.setattr(matching, 'MATCH_AMOUNT_TOLERANCE_BY_PAIR', {('GeoTex', 'Steel'): {'absolute': 5}})
+
+    assert amount_tolerance_for('GeoTex', 'Steel') == (500, Decimal('0'))
+    assert amount_tolerance_for('Steel', 'GeoTex') == (500, Decimal('0'))
+    assert amount_tolerance_for('GeoTex', 'Pharma') is None
+
+    data = [
+        record('L1', 1000, None, 'Payment against GTL/PO/123/4'),
+        record('B1', None, 997, 'Received against GTL/PO/123/4'),
+        record('L2', 1000, None, 'Payment against GTL/PO/555/4', borrower='Pharma'),
+        record('B2', None, 997, 'Received against GTL/PO/555/4', borrower='Pharma'),
+    ]
+    matches = find_matches(data)
+    assert [(match['lender_uid'], match['borrower_uid']) for match in matches] == [('L1', 'B1')]
+    assert matches[0]['amount_difference'] == 300
+
+
+def test_override_replaces_default(monkeypatch):
+    monkeypatch.setattr(matching, 'MATCH_AMOUNT_TOLERANCE_ENABLED', True)
+    monkeypatch.setattr(matching, 'MATCH_AMOUNT_TOLERANCE_ABSOLUTE', 10)
+    monkeypatch.setattr(matching, 'MATCH_AMOUNT_TOLERANCE_PERCENT', 0.0)
+    monkeypatch.setattr(matching, 'MATCH_AMOUNT_TOLERANCE_BY_PAIR',
+                        {('GeoTex', 'Steel'): {'absolute': 0, 'percent': 0.5}})
+
+    assert amount_tolerance_for('GeoTex', 'Steel') == (0, Decimal('0.5'))
+    assert amount_tolerance_for('GeoTex', 'Pharma') == (1000, Decimal('0.0'))
+
+
+def test_excluded_passes_need_exact_amounts(monkeypatch):
+    monkeypatch.setattr(matching, 'MATCH_AMOUNT_TOLERANCE_ENABLED', True)
+    monkeypatch.setattr(matching, 'MATCH_AMOUNT_TOLERANCE_ABSOLUTE', 100)
+    monkeypatch.setattr(matching, 'MATCH_AMOUNT_TOLERANCE_BY_PAIR', {})
+
+    data = [
+        record('L1', 4000, None, 'Salary of Md. Karim for January 2024'),
+        record('B1', None, 3990, 'Salary of Md. Karim for January 2024'),
+        record('L2', 2000, None, 'Amount paid as Inter Unit Loan for staff (Md. Karim-ID : 101)'),
+        record('B2', None, 1990, 'Adjustment against staff dues'),
+        record('L3', 3000, None, 'Office rent adjustment', entered_by='alice'),
+        record('B3', None, 2990, 'Rent received', entered_by='alice'),
+        record('L4', 5000, None, 'Payment against GTL/PO/123/4'),
+        record('B4', None, 4990, 'Received against GTL/PO/123/4'),
+    ]
+    matches = find_matches(data)
+    assert [(match['lender_uid'], match['borrower_uid']) for match in matches] == [('L4', 'B4')]
+    assert matches[0]['amount_tolerance'] is True
@@ -0,0 +1,54 @@
+"""
+Optimal scoring mode: solve_assignment (Hungarian algorithm) against a
+brute-force search over every assignment of small matrices.
+"""
+import itertools
+import random
+
+from core.matching import solve_assignment
+
+
+def brute_force_weight(weights):
+    """Best total weight of any one-to-one assignment, zero-weight cells left out."""
+    rows, cols = len(weights), len(weights[0])
+    best = 0
+    if rows <= cols:
+        for columns in itertools.permutations(range(cols), rows):
+            best = max(best, sum(weights[row][col] for row, col in enumerate(columns)))
+    else:
+        for row_order in itertools.permutations(range(rows), cols):
+            best = max(best, sum(weights[row][col] for col, row in enumerate(row_order)))
+    return best
+
+
+def random_matrices(seed, count, max_size=6):
+    rng = random.Random(seed)
+    for _ in range(count):
+        rows, cols = rng.randint(1, max_size), rng.randint(1, max_size)
+        zero_share = rng.choice([0.0, 0.3, 0.7, 1.0])
+        yield [[0 if rng.random() < zero_share else rng.randint(1, 20) for _ in range(cols)]
+               for _ in range(rows)]
+
+
+def test_assignment_matches_brute_force():
+    for weights in random_matrices(seed=3, count=500):
+        pairs = solve_assignment(weights)
+        assert pairs == sorted(pairs)
+        assert len({row for row, _ in pairs}) == len(pairs)
+        assert len({col for _, col in pairs}) == len(pairs)
+        assert all(weights[row][col] > 0 for row, col in pairs)
+        assert sum(weights[row][col] for row, col in pairs) == brute_force_weight(weights)
+
+
+def test_fractional_weights():
+    rng = random.Random(4)
+    for _ in range(200):
+        size = rng.randint(1, 5)
+        weights = [[round(rng.random() * 3, 3) for _ in range(size)] for _ in range(size)]
+        pairs = solve_assignment(weights)
+        assert abs(sum(weights[row][col] for row, col in pairs) - brute_force_weight(weights)) < 1e-9
+
+
+def test_empty_matrix():
+    assert solve_assignment([]) == []
+    assert solve_assignment([[]]) == []
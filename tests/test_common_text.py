@@ -0,0 +1,88 @@
+"""
+COMMON_TEXT phrase matching: the token-run search against the phrase-set
+approach it replaced (intersecting every 20-50 word phrase of both texts).
+"""
+import random
+
+from core.matching import PHRASE_TOKEN_PATTERN, extract_common_text, extract_phrases, find_common_token_runs
+
+VOCABULARY = ['being', 'the', 'amount', 'paid', 'for', 'insurance', 'premium', 'of', 'vehicle', 'no',
+              'dhaka', 'metro', 'ga', '11-2233', 'policy', 'pbl/ins/2024/0098', '01-01-2024', '#5', '-', 'a/c']
+
+
+def common_phrases(text1, text2):
+    """Common phrases the way the phrase-set implementation found them."""
+    return extract_phrases(text1.lower()) & extract_phrases(text2.lower())
+
+
+def brute_force_runs(tokens1, tokens2, min_words):
+    """Every maximal shared run of at least min_words tokens, by direct comparison."""
+    runs = []
+    for start1 in range(len(tokens1)):
+        for start2 in range(len(tokens2)):
+            if start1 > 0 and start2 > 0 and tokens1[start1 - 1] == tokens2[start2 - 1]:
+                continue
+            length = 0
+            while (start1 + length < len(tokens1) and start2 + length < len(tokens2) and
+                   tokens1[start1 + length] == tokens2[start2 + length]):
+                length += 1
+            if length >= min_words:
+                runs.append((start1, start2, length))
+    return sorted(runs)
+
+
+def text_pairs(seed, count):
+    """Narration pairs sharing long runs: a common base with edits, prefixes and repeats on each side."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        base = [rng.choice(VOCABULARY) for _ in range(rng.randint(0, 90))]
+        sides = []
+        for _ in range(2):
+            tokens = list(base)
+            for _ in range(rng.randint(0, 4)):
+                if tokens:
+                    tokens[rng.randrange(len(tokens))] = rng.choice(VOCABULARY)
+            if rng.random() < 0.3:
+                tokens[:0] = [rng.choice(VOCABULARY) for _ in range(rng.randint(0, 30))]
+            if rng.random() < 0.3:
+                tokens += tokens[:rng.randint(0, len(tokens))]
+            sides.append(' '.join(tokens))
+        yield sides
+
+
+def test_token_runs_match_brute_force():
+    rng = random.Random(7)
+    for _ in range(300):
+        tokens1 = [rng.choice('abc') for _ in range(rng.randint(0, 25))]
+        tokens2 = [rng.choice('abc') for _ in range(rng.randint(0, 25))]
+        min_words = rng.randint(1, 5)
+        assert sorted(find_common_token_runs(tokens1, tokens2, min_words)) == \
+            brute_force_runs(tokens1, tokens2, min_words)
+
+
+def test_token_runs_cover_the_common_phrase_set():
+    for text1, text2 in text_pairs(seed=1, count=400):
+        tokens1 = PHRASE_TOKEN_PATTERN.findall(text1.lower())
+        tokens2 = PHRASE_TOKEN_PATTERN.findall(text2.lower())
+        from_runs = set()
+        for start1, _, run_length in find_common_token_runs(tokens1, tokens2):
+            for start in range(start1, start1 + run_length - 20 + 1):
+                for length in range(20, min(50, start1 + run_length - start) + 1):
+                    phrase = ' '.join(tokens1[start:start + length])
+                    if len(phrase) >= 50:
+                        from_runs.add(phrase)
+        assert from_runs == common_phrases(text1, text2)
+
+
+def test_extract_common_text_reports_the_longest_common_phrase():
+    for text1, text2 in text_pairs(seed=2, count=400):
+        expected = common_phrases(text1, text2)
+        result = extract_common_text(text1, text2)
+        if not expected:
+            assert result is None
+            continue
+        longest = max(expected, key=len)
+        first = result.split(' | ')[0]
+        assert first.startswith(f"{len(longest.split())} words: ")
+        assert len(first.split(' words: ', 1)[1]) == len(longest)
+        assert first.split(' words: ', 1)[1] in expected
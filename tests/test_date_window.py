@@ -0,0 +1,95 @@
+"""
+Date-window candidates: date_window_candidates over build_date_index
+against a linear within_date_window filter, window boundaries and
+undated records.
+"""
+import datetime
+import random
+
+from core import matching
+from core.matching import (build_date_index, date_window_candidates, date_window_for, extract_record_features,
+                           find_matches, within_date_window)
+
+JAN_10 = datetime.date(2024, 1, 10)
+
+
+def record(uid, debit, credit, date, particulars=''):
+    return {'uid': uid, 'Debit': debit, 'Credit': credit, 'Particulars': particulars, 'entered_by': None,
+            'Date': date, 'lender': 'GeoTex', 'borrower': 'Steel',
+            'statement_month': 'January', 'statement_year': 2024}
+
+
+def lender(uid, date):
+    return extract_record_features(record(uid, 1000, None, date), 'lender')
+
+
+def borrower(uid, date):
+    return extract_record_features(record(uid, None, 1000, date), 'borrower')
+
+
+def uids(records):
+    return [features.uid for features in records]
+
+
+def test_window_boundaries_are_inclusive():
+    bucket = [borrower(f"B{offset}", JAN_10 + datetime.timedelta(days=offset)) for offset in range(-5, 6)]
+    candidates = date_window_candidates(build_date_index(bucket), lender('L1', JAN_10), 3)
+    assert uids(candidates) == ['B-3', 'B-2', 'B-1', 'B0', 'B1', 'B2', 'B3']
+
+
+def test_zero_day_window_keeps_same_day_only():
+    bucket = [borrower('B1', JAN_10), borrower('B2', JAN_10 + datetime.timedelta(days=1))]
+    assert uids(date_window_candidates(build_date_index(bucket), lender('L1', JAN_10), 0)) == ['B1']
+
+
+def test_undated_records_are_not_constrained():
+    bucket = [borrower('B1', None), borrower('B2', datetime.date(2024, 3, 1)), borrower('B3', 'not a date'),
+              borrower('B4', JAN_10)]
+    index = build_date_index(bucket)
+
+    # Undated borrowers stay candidates, in bucket order
+    assert uids(date_window_candidates(index, lender('L1', JAN_10), 2)) == ['B1', 'B3', 'B4']
+    # An undated lender sees the whole bucket
+    assert uids(date_window_candidates(index, lender('L2', None), 2)) == ['B1', 'B2', 'B3', 'B4']
+
+    assert within_date_window(lender('L1', None), borrower('B2', datetime.date(2024, 3, 1)), 2)
+    assert within_date_window(lender('L1', JAN_10), borrower('B1', None), 2)
+    assert within_date_window(lender('L1', JAN_10), borrower('B2', datetime.date(2024, 3, 1)), None)
+
+
+def test_candidates_match_linear_filter():
+    rng = random.Random(18)
+    for _ in range(500):
+        bucket = []
+        for position in range(rng.randint(0, 12)):
+            date = None if rng.random() < 0.2 else JAN_10 + datetime.timedelta(days=rng.randint(-20, 20))
+            bucket.append(borrower(f"B{position}", date))
+        probe = lender('L1', None if rng.random() < 0.1 else JAN_10 + datetime.timedelta(days=rng.randint(-20, 20)))
+        window = rng.randint(0, 10)
+        expected = [features for features in bucket if within_date_window(probe, features, window)]
+        assert uids(date_window_candidates(build_date_index(bucket), probe, window)) == uids(expected)
+
+
+def test_window_per_rule(monkeypatch):
+    monkeypatch.setattr(matching, 'MATCH_DATE_WINDOW_DAYS', 5)
+    monkeypatch.setattr(matching, 'MATCH_DATE_WINDOW_BY_RULE', {'SALARY': 7, 'PO': None})
+
+    assert date_window_for('SALARY') == 7
+    assert date_window_for('TOLERANCE_PO') is None
+    assert date_window_for('LC') == 5
+
+
+def test_window_limits_matches(monkeypatch):
+    monkeypatch.setattr(matching, 'MATCH_DATE_WINDOW_DAYS', 3)
+    monkeypatch.setattr(matching, 'MATCH_DATE_WINDOW_BY_RULE', {})
+
+    data = [
+        record('L1', 1000, None, JAN_10, 'Payment against GTL/PO/123/4'),
+        record('B1', None, 1000, JAN_10 + datetime.timedelta(days=4), 'Received against GTL/PO/123/4'),
+        record('L2', 2000, None, JAN_10, 'Payment against GTL/PO/555/4'),
+        record('B2', None, 2000, JAN_10 + datetime.timedelta(days=3), 'Received against GTL/PO/555/4'),
+        record('L3', 3000, None, None, 'Payment against GTL/PO/777/4'),
+        record('B3', None, 3000, JAN_10 + datetime.timedelta(days=30), 'Received against GTL/PO/777/4'),
+    ]
+    pairs = {(match['lender_uid'], match['borrower_uid']) for match in find_matches(data)}
+    assert pairs == {('L2', 'B2'), ('L3', 'B3')}
@@ -0,0 +1,51 @@
+"""
+Incremental matching: only pairs with a record uploaded after the
+pair-period's watermark are tried, and MatchStats.new_records reports how
+many records were new.
+"""
+import datetime
+
+from core.matching import MatchStats, find_matches, shard_key
+
+
+def record(uid, debit, credit, particulars, input_date):
+    return {'uid': uid, 'Debit': debit, 'Credit': credit, 'Particulars': particulars, 'entered_by': None,
+            'Date': datetime.date(2024, 1, 10), 'lender': 'GeoTex', 'borrower': 'Steel',
+            'statement_month': 'January', 'statement_year': 2024, 'input_date': input_date}
+
+
+DATA = [
+    record('L1', 1000, None, 'Payment against GTL/PO/123/4', '2024-02-01 10:00:00'),
+    record('B1', None, 1000, 'Received against GTL/PO/123/4', '2024-02-01 10:00:00'),
+]
+WATERMARK_KEY = shard_key(DATA[0])
+
+
+def test_no_new_records_is_reported_in_stats():
+    stats = MatchStats()
+    assert find_matches(DATA, {WATERMARK_KEY: '2024-02-02 00:00:00'}, stats) == []
+    assert stats.new_records == 0
+    assert stats.to_dict()['new_records'] == 0
+
+
+def test_new_records_are_counted_and_matched():
+    stats = MatchStats()
+    data = DATA[:1] + [dict(DATA[1], input_date='2024-02-03 09:00:00')]
+    matches = find_matches(data, {WATERMARK_KEY: '2024-02-02 00:00:00'}, stats)
+    assert [(match['lender_uid'], match['borrower_uid']) for match in matches] == [('L1', 'B1')]
+    assert stats.new_records == 1
+
+
+def test_full_run_leaves_new_records_unset():
+    stats = MatchStats()
+    assert len(find_matches(DATA, stats=stats)) == 1
+    assert stats.new_records is None
+
+    merged = MatchStats()
+    shard = MatchStats()
+    shard.new_records = 2
+    merged.merge(MatchStats())
+    assert merged.new_records is None
+    merged.merge(shard)
+    merged.merge(shard)
+    assert merged.new_records == 4
@@ -0,0 +1,102 @@
+"""
+Keyword scanning: scan_narration masks against the `keyword in text`
+checks they replaced, KeywordAutomaton against substring search, and
+get_bank_name's alias fallback.
+"""
+import random
+
+from core import bank_config, matching
+from core.keyword_scanner import KeywordAutomaton
+from core.matching import NARRATION_BITS, scan_narration
+
+KEYWORD_LISTS = {
+    'salary': matching.SALARY_PRIMARY_KEYWORDS + matching.SALARY_SECONDARY_KEYWORDS,
+    'non_salary': matching.NON_SALARY_INDICATORS,
+    'final_settlement': (matching.LENDER_PERSON_TRIGGER,) + matching.BORROWER_PERSON_TRIGGERS,
+    'interunit': matching.INTERUNIT_KEYWORDS + tuple(matching.INTERUNIT_SIDE_PHRASES.values()),
+    'time_loan': matching.TIME_LOAN_PHRASE_VARIANTS + (matching.TIME_LOAN_PREFILTER,),
+}
+
+NARRATIONS = [
+    'Salary of Md. Karim for January 2024',
+    'Amount paid as Inter Unit Loan for staff (Md. Karim-ID : 101)',
+    'Final Settlement payable to Md. Rahim',
+    'Midland Bank PLC-CD-A/C-0011-1050011026 Interbank Fund transfer as Interunit Loan A/C-Steel Unit, PBL#1833',
+    'Amount received as Interunit Loan from GeoTex',
+    'Amount being paid as Principal & Interest Repayment of Time Loan LD-1234567',
+    'Payment for office rent, invoice no 55',
+    'Consalary wagemonthly',
+    '',
+]
+
+
+def random_narration(rng):
+    """Narration stitched from keywords, keyword fragments and filler, with random case."""
+    keywords = [keyword for keywords in KEYWORD_LISTS.values() for keyword in keywords]
+    parts = []
+    for _ in range(rng.randint(0, 6)):
+        choice = rng.random()
+        if choice < 0.4:
+            parts.append(rng.choice(keywords))
+        elif choice < 0.7:
+            keyword = rng.choice(keywords)
+            start = rng.randint(0, len(keyword) - 1)
+            parts.append(keyword[start:rng.randint(start + 1, len(keyword))])
+        else:
+            parts.append(rng.choice(['of', 'A/C', 'Md.', '2024', '-', 'unit', 'xyz']))
+    text = rng.choice(['', ' ']).join(parts)
+    return ''.join(char.upper() if rng.random() < 0.3 else char for char in text)
+
+
+def assert_agrees_with_substring_checks(particulars):
+    mask = scan_narration(particulars).mask
+    lowered = particulars.lower()
+    for keywords in KEYWORD_LISTS.values():
+        for keyword in keywords:
+            assert bool(mask & NARRATION_BITS[keyword]) == (keyword in lowered), (keyword, particulars)
+        assert bool(mask & matching._keyword_mask(keywords)) == any(keyword in lowered for keyword in keywords)
+
+
+def test_scan_narration_matches_substring_checks():
+    for particulars in NARRATIONS:
+        assert_agrees_with_substring_checks(particulars)
+    rng = random.Random(15)
+    for _ in range(2000):
+        assert_agrees_with_substring_checks(random_narration(rng))
+
+
+def test_automaton_matches_substring_search():
+    rng = random.Random(150)
+    for _ in range(300):
+        keywords = [''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))]
+        automaton = KeywordAutomaton(keywords)
+        text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 30)))
+        mask = automaton.scan(text)
+        assert automaton.found(mask) == [keyword for keyword in automaton.keywords if keyword in text]
+
+
+def test_get_bank_name_exact_code():
+    assert bank_config.get_bank_name('mdbl') == 'MIDLAND BANK'
+    assert bank_config.get_bank_name('Prime Bank PLC') == 'PRIME BANK'
+    assert bank_config.get_bank_name('') is None
+    assert bank_config.get_bank_name(None) is None
+
+
+def test_get_bank_name_alias_fallback():
+    # Longer references resolve through an alias inside them, the first and longest one winning
+    assert bank_config.get_bank_name('Midland Bank PLC-CD') == 'MIDLAND BANK'
+    assert bank_config.get_bank_name('Fund transfer MDBL') == 'MIDLAND BANK'
+    assert bank_config.get_bank_name('BBL to Dutch Bangla Bank PLC') == 'BRAC BANK'
+    # Aliases only count as whole words; anything else comes back unchanged
+    assert bank_config.get_bank_name('PBLX Securities') == 'PBLX Securities'
+    assert bank_config.get_bank_name('Unknown Finance') == 'Unknown Finance'
+
+
+def test_get_bank_name_sees_mapping_edits():
+    bank_config.add_bank_mapping('SJIBL', 'Shahjalal Islami Bank')
+    try:
+        assert bank_config.get_bank_name('Transfer via SJIBL-0123') == 'SHAHJALAL ISLAMI BANK'
+        assert 'SHAHJALAL ISLAMI BANK' in scan_narration('Transfer via SJIBL-0123').banks()
+    finally:
+        bank_config.remove_bank_mapping('SJIBL')
+    assert bank_config.get_bank_name('Transfer via SJIBL-0123') == 'Transfer via SJIBL-0123'
@@ -0,0 +1,56 @@
+"""
+Integer paisa conversion: to_minor_units over every type Debit/Credit
+arrive as, and from_minor_units back to two-place Decimals.
+"""
+import math
+import random
+from decimal import Decimal
+
+from core.matching import from_minor_units, to_minor_units
+
+
+def test_float_uses_shortest_repr():
+    assert to_minor_units(0.1 + 0.2) == 30
+    assert to_minor_units(1234.1) == 123410
+    assert to_minor_units(1234.005) == 123401
+    assert to_minor_units(0.07) == 7
+
+
+def test_int_and_decimal():
+    assert to_minor_units(1234) == 123400
+    assert to_minor_units(0) == 0
+    assert to_minor_units(Decimal('1234.50')) == 123450
+    assert to_minor_units(Decimal('1234.505')) == 123451
+    assert to_minor_units(Decimal('-10.25')) == -1025
+
+
+def test_str_with_commas_and_blanks():
+    assert to_minor_units('1234.50') == 123450
+    assert to_minor_units('1,234.50') == 123450
+    assert to_minor_units(' 12,34,567.8 ') == 123456780
+    assert to_minor_units('') is None
+    assert to_minor_units('   ') is None
+
+
+def test_missing_values():
+    assert to_minor_units(None) is None
+    assert to_minor_units(float('nan')) is None
+    assert to_minor_units(math.nan) is None
+
+
+def test_from_minor_units():
+    assert from_minor_units(None) is None
+    assert from_minor_units(123450) == Decimal('1234.50')
+    assert str(from_minor_units(123450)) == '1234.50'
+    assert str(from_minor_units(5)) == '0.05'
+    assert str(from_minor_units(-1025)) == '-10.25'
+
+
+def test_round_trip_two_place_values():
+    rng = random.Random(16)
+    for _ in range(2000):
+        units = rng.randint(-10 ** 9, 10 ** 9)
+        text = str(from_minor_units(units))
+        assert to_minor_units(text) == units
+        assert to_minor_units(Decimal(text)) == units
+        assert to_minor_units(float(text)) == units
@@ -0,0 +1,81 @@
+"""
+Split settlements: find_split_subset against exhaustive subset enumeration,
+and run_split_pass's part limit and date bound.
+"""
+import datetime
+import itertools
+import random
+
+from core import matching
+from core.matching import extract_record_features, find_split_subset, run_split_pass
+
+
+def brute_force_subset(target, amounts, max_parts):
+    """Fewest parts, then earliest positions: the first exact-sum combination in enumeration order."""
+    for parts in range(2, max_parts + 1):
+        for positions in itertools.combinations(range(len(amounts)), parts):
+            if sum(amounts[position] for position in positions) == target:
+                return list(positions)
+    return None
+
+
+def test_subset_matches_brute_force():
+    rng = random.Random(5)
+    for _ in range(2000):
+        amounts = [rng.randint(1, 30) for _ in range(rng.randint(0, 9))]
+        max_parts = rng.randint(2, 5)
+        target = rng.randint(2, 90)
+        assert find_split_subset(target, amounts, max_parts) == brute_force_subset(target, amounts, max_parts)
+
+
+def test_subset_respects_the_part_limit():
+    # Only four equal parts reach the target
+    assert find_split_subset(400, [100, 100, 100, 100], 3) is None
+    assert find_split_subset(400, [100, 100, 100, 100], 4) == [0, 1, 2, 3]
+    # A single amount equal to the target is not a split
+    assert find_split_subset(100, [100, 7], 3) is None
+
+
+def record(uid, debit, credit, day):
+    return {'uid': uid, 'Debit': debit, 'Credit': credit, 'Particulars': 'PO/1', 'entered_by': None,
+            'Date': datetime.date(2024, 3, 1) + datetime.timedelta(days=day) if day is not None else None}
+
+
+def split_pass(lender, borrowers):
+    return run_split_pass([extract_record_features(lender, 'lender')],
+                          [extract_record_features(borrower, 'borrower') for borrower in borrowers],
+                          key_func=lambda features: 'PO/1', details_for=lambda key: {'match_type': 'PO', 'po': key})
+
+
+def test_split_pass_matches_brute_force_within_the_date_bound(monkeypatch):
+    monkeypatch.setattr(matching, 'MATCH_SPLIT_MAX_PARTS', 3)
+    monkeypatch.setattr(matching, 'MATCH_SPLIT_DATE_WINDOW_DAYS', 5)
+    rng = random.Random(6)
+    for _ in range(300):
+        lender = record('L', rng.randint(2, 25), 0, 10)
+        borrowers = [record(f'B{index}', 0, rng.randint(1, 12), rng.choice([None] + list(range(0, 21))))
+                     for index in range(rng.randint(0, 10))]
+        matches, _ = split_pass(lender, borrowers)
+
+        # Candidates: cheaper than the lender and dated within 5 days of it, or undated
+        candidates = [borrower for borrower in borrowers if borrower['Credit'] < lender['Debit'] and
+                      (borrower['Date'] is None or abs((borrower['Date'] - lender['Date']).days) <= 5)]
+        positions = None
+        if len(candidates) >= 2:
+            positions = brute_force_subset(lender['Debit'], [borrower['Credit'] for borrower in candidates], 3)
+        if positions is None:
+            assert matches == []
+        else:
+            assert len(matches) == 1
+            assert matches[0]['lender_uids'] == ['L']
+            assert matches[0]['borrower_uids'] == [candidates[position]['uid'] for position in positions]
+
+
+def test_split_pass_ignores_parts_outside_the_date_bound(monkeypatch):
+    monkeypatch.setattr(matching, 'MATCH_SPLIT_DATE_WINDOW_DAYS', 7)
+    borrowers = [record('B1', 0, 60, 0), record('B2', 0, 40, 8)]
+    assert split_pass(record('L', 100, 0, 0), borrowers)[0] == []
+
+    monkeypatch.setattr(matching, 'MATCH_SPLIT_DATE_WINDOW_DAYS', None)
+    matches, _ = split_pass(record('L', 100, 0, 0), borrowers)
+    assert [match['borrower_uids'] for match in matches] == [['B1', 'B2']]
@@ -0,0 +1,64 @@
+"""
+Time-budgeted reconcile: only the fuzzy passes are deferred, and the
+deferred passes finish the job over what the budgeted run left.
+"""
+import datetime
+
+from core.matching import TimeBudget, find_matches, iter_matches
+
+INSURANCE = ("being the amount paid for insurance premium of vehicle registration dhaka metro ga 11-2233 "
+             "chassis no mh4kc1234 engine no 4d56 policy no pbl/ins/2024/0098 certificate issued by pragati "
+             "insurance ltd")
+
+
+def record(uid, debit, credit, particulars, entered_by=None):
+    return {'uid': uid, 'Debit': debit, 'Credit': credit, 'Particulars': particulars, 'entered_by': entered_by,
+            'Date': datetime.date(2024, 1, 10), 'lender': 'GeoTex', 'borrower': 'Steel',
+            'statement_month': 'January', 'statement_year': 2024}
+
+
+DATA = [
+    record('L1', 1000, None, 'Midland Bank PLC-CD-A/C-0011-1050011026 Interbank Fund transfer as '
+                             'Interunit Loan A/C-Steel Unit, PBL#1833'),
+    record('B1', None, 1000, 'Dhaka Bank-STD-2051501833-CIL Inter unit fund transfer as Interunit Loan '
+                             'A/C-Geo Textile Unit., MTBL#11026'),
+    record('L2', 2000, None, 'Amount paid as Inter Unit Loan for staff (Md. Karim-ID : 101)'),
+    record('B2', None, 2000, 'Adjustment against staff dues'),
+    record('L3', 3000, None, 'Office rent adjustment', 'alice'),
+    record('B3', None, 3000, 'Rent received', 'alice'),
+    record('L4', 4000, None, 'Salary of Md. Karim for January 2024'),
+    record('B4', None, 4000, 'Salary of Md. Karim for January 2024'),
+    record('L5', 5000, None, INSURANCE),
+    record('B5', None, 5000, 'received ' + INSURANCE),
+]
+
+
+def match_types(matches):
+    return {match['lender_uid']: match['match_type'] for match in matches}
+
+
+def test_zero_budget_still_runs_the_exact_passes():
+    budget = TimeBudget(0)
+    matches = [match for batch in iter_matches(DATA, budget=budget) for match in batch]
+
+    assert match_types(matches) == {'L1': 'INTERUNIT_LOAN', 'L2': 'FINAL_SETTLEMENT', 'L3': 'MANUAL_VERIFICATION'}
+    assert budget.deferred == ['SALARY', 'COMMON_TEXT']
+    assert budget.deferred_passes() == ['SALARY', 'COMMON_TEXT']
+
+
+def test_deferred_passes_finish_the_rest():
+    budget = TimeBudget(0)
+    first = [match for batch in iter_matches(DATA, budget=budget) for match in batch]
+    matched = {uid for match in first for uid in (match['lender_uid'], match['borrower_uid'])}
+    rest = [row for row in DATA if row['uid'] not in matched]
+    second = [match for batch in iter_matches(rest, passes=budget.deferred_passes()) for match in batch]
+
+    assert match_types(second) == {'L4': 'SALARY', 'L5': 'COMMON_TEXT'}
+    assert match_types(first + second) == match_types(find_matches(DATA))
+
+
+def test_ample_budget_defers_nothing():
+    budget = TimeBudget(3600)
+    matches = [match for batch in iter_matches(DATA, budget=budget) for match in batch]
+    assert budget.deferred == []
+    assert match_types(matches) == match_types(find_matches(DATA))